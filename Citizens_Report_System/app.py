@@ -1,364 +1,1117 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-from functools import wraps
-from werkzeug.utils import secure_filename
-import os
-from database import (
-    init_db, crear_usuario, buscar_usuario_por_correo, verificar_contrasena,
-    crear_reporte, obtener_reportes, obtener_reporte_por_id,
-    actualizar_estado_reporte, actualizar_categoria_reporte, eliminar_reporte, obtener_estadisticas
-)
-
-app = Flask(__name__)
-
-# Clave secreta para firmar las cookies de sesión
-app.secret_key = 'cambiar_esto_en_produccion_por_una_clave_segura'
-app.config['PROPAGATE_EXCEPTIONS'] = True
-
-# Configuracion de uploads
-UPLOAD_FOLDER = 'static/uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
-MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
-
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
-
-# Crear carpeta de uploads si no existe
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-
-def allowed_file(filename):
-    """Verifica si el archivo tiene una extensión permitida."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-
-# ─── DECORADORES DE PROTECCIÓN ────────────────────────────────────────────
-
-def login_requerido(f):
-    """Redirige a login si el usuario no está autenticado."""
-    @wraps(f)
-    def decorado(*args, **kwargs):
-        if 'correo' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorado
-
-
-def rol_admin_requerido(f):
-    """Solo permite acceso si el usuario tiene rol 'admin'."""
-    @wraps(f)
-    def decorado(*args, **kwargs):
-        if 'correo' not in session:
-            return redirect(url_for('login'))
-        if session.get('rol') != 'admin':
-            return jsonify({'error': 'Sin permiso'}), 403
-        return f(*args, **kwargs)
-    return decorado
-
-
-# ─── RUTAS DE AUTENTICACIÓN ────────────────────────────────────────────────
-
-@app.route('/')
-def home():
-    return redirect(url_for('index_publico'))
-
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    error = None
-
-    if request.method == 'POST':
-        correo     = request.form.get('correo', '').strip()
-        contrasena = request.form.get('contrasena', '')
-
-        # buscar usuario en la BD
-        usuario = buscar_usuario_por_correo(correo)
-
-        if usuario and verificar_contrasena(contrasena, usuario['contrasena']):
-            # ─── LOGIN EXITOSO ───
-            session['correo'] = usuario['correo']
-            session['rol']    = usuario['rol']
-            session.permanent = True
-
-            # redirigir según rol
-            if usuario['rol'] == 'admin':
-                return redirect(url_for('admin'))
-            return redirect(url_for('dashboard'))
-        else:
-            error = 'Correo o contraseña incorrectos.'
-
-    return render_template('login.html', error=error)
-
-
-@app.route('/register', methods=['GET', 'POST'])
-def register():
-    """Página de registro de nuevos usuarios."""
-    error = None
-    mensaje = None
-
-    if request.method == 'POST':
-        correo = request.form.get('correo', '').strip()
-        contrasena = request.form.get('contrasena', '')
-        confirmar_contrasena = request.form.get('confirmar_contrasena', '')
-
-        # Validaciones
-        if not correo or not contrasena:
-            error = 'Todos los campos son obligatorios.'
-        elif len(contrasena) < 6:
-            error = 'La contraseña debe tener al menos 6 caracteres.'
-        elif contrasena != confirmar_contrasena:
-            error = 'Las contraseñas no coinciden.'
-        elif '@' not in correo or '.' not in correo:
-            error = 'El correo no es válido.'
-        else:
-            # Intentar crear el usuario
-            exito = crear_usuario(correo, contrasena, rol='usuario')
-            
-            if exito:
-                mensaje = '✅ Cuenta creada exitosamente. Ahora puedes iniciar sesión.'
-                # Redirigir al login después de 2 segundos
-                return render_template('register.html', mensaje=mensaje, redirect_login=True)
-            else:
-                error = 'Este correo ya está registrado. Intenta con otro.'
-
-    return render_template('register.html', error=error, mensaje=mensaje)
-
-
-@app.route('/logout')
-@login_requerido
-def logout():
-    session.clear()
-    return redirect(url_for('index_publico'))
-
-@app.route('/index')
-def index_publico():
-    return render_template(
-        'index.html',
-        correo=session.get('correo'),
-        rol=session.get('rol')
-    )
-
-@app.route('/dashboard')
-@login_requerido
-def dashboard():
-    """Pagina principal para cualquier usuario autenticado."""
-    return render_template('index.html', correo=session['correo'], rol=session['rol'])
-
-
-@app.route('/admin')
-@rol_admin_requerido
-def admin():
-    """Pagina exclusiva para administradores."""
-    return render_template('index.html', correo=session['correo'], rol=session['rol'])
-
-
-# ─── RUTAS DE REPORTES (API) ────────────────────────────────────────────────
-
-@app.route('/api/reportes', methods=['GET'])
-def listar_reportes():
-    """Obtiene todos los reportes, opcionalmente filtrados por estado."""
-    estado = request.args.get('estado', 'Todos')
-    reportes = obtener_reportes(estado)
-    
-    # Si no es admin, ocultar emails
-    if session.get('rol') != 'admin':
-        for reporte in reportes:
-            if 'email' in reporte:
-                reporte['email'] = None
-    
-    return jsonify(reportes)
-
-
-@app.route('/api/reportes', methods=['POST'])
-@login_requerido
-def crear_nuevo_reporte():
-    try:
-        # ─── CAMPOS DE TEXTO ───
-        ubicacion  = request.form.get('ubicacion', '').strip()
-        direccion  = request.form.get('direccion', '').strip()
-        comentario = request.form.get('comentario', '').strip()
-        categoria  = request.form.get('categoria', 'Otros').strip()
-
-        # ─── COORDENADAS (MAPA) ───
-        lat = request.form.get('lat')
-        lng = request.form.get('lng')
-
-        if not lat or not lng:
-            return jsonify({'error': 'Debe marcar la ubicación en el mapa'}), 400
-
-        # ─── VALIDACIONES ───
-        if not comentario or len(comentario) < 10:
-            return jsonify({'error': 'El comentario debe tener al menos 10 caracteres'}), 400
-
-        # ─── FOTO ───
-        if 'foto' not in request.files:
-            return jsonify({'error': 'Falta la foto'}), 400
-
-        foto = request.files['foto']
-
-        if foto.filename == '':
-            return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
-
-        if not allowed_file(foto.filename):
-            return jsonify({'error': 'Tipo de archivo no permitido'}), 400
-
-        filename = secure_filename(foto.filename)
-        from datetime import datetime
-        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-
-        foto.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-
-        # ------- BD --------
-        reporte_id = crear_reporte(
-            ubicacion=ubicacion,
-            direccion=direccion,
-            comentario=comentario,
-            foto=filename,
-            categoria=categoria,
-            lat=float(lat),
-            lng=float(lng),
-            usuario_correo=session.get('correo')
-        )
-
-        return jsonify({'success': True, 'message': 'Reporte enviado correctamente', 'id': reporte_id}), 201
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-@app.route('/api/reportes/<int:reporte_id>', methods=['GET'])
-def obtener_reporte(reporte_id):
-    """Obtiene un reporte específico por ID."""
-    reporte = obtener_reporte_por_id(reporte_id)
-    if reporte:
-        # Si no es admin, ocultar email
-        if session.get('rol') != 'admin' and 'email' in reporte:
-            reporte['email'] = None
-        return jsonify(reporte)
-    return jsonify({'error': 'Reporte no encontrado'}), 404
-
-
-@app.route('/api/reportes/<int:reporte_id>/estado', methods=['PUT'])
-@rol_admin_requerido
-def cambiar_estado_reporte(reporte_id):
-    """Cambia el estado de un reporte (solo admin)."""
-    try:
-        data = request.get_json()
-        nuevo_estado = data.get('estado')
-        razon_rechazo = data.get('razon_rechazo')
-        
-        # Validar estado
-        estados_validos = ['Pendiente', 'Verificando', 'Solucionado', 'Rechazado']
-        if nuevo_estado not in estados_validos:
-            return jsonify({'error': 'Estado no válido'}), 400
-        
-        # Si es rechazado, verificar que haya razón
-        if nuevo_estado == 'Rechazado':
-            if not razon_rechazo or len(razon_rechazo.strip()) < 10:
-                return jsonify({'error': 'Debe proporcionar una razón de rechazo de al menos 10 caracteres'}), 400
-        
-        # Actualizar estado
-        actualizar_estado_reporte(reporte_id, nuevo_estado, razon_rechazo)
-        
-        return jsonify({
-            'success': True,
-            'message': f'Estado actualizado a {nuevo_estado}'
-        })
-        
-    except Exception as e:
-        return jsonify({'error': f'Error al actualizar estado: {str(e)}'}), 500
-
-
-@app.route('/api/reportes/<int:reporte_id>/categoria', methods=['PUT'])
-@rol_admin_requerido
-def cambiar_categoria_reporte(reporte_id):
-    """Cambia la categoría de un reporte (solo admin)."""
-    try:
-        data = request.get_json()
-        nueva_categoria = data.get('categoria')
-        
-        # Validar categoría
-        categorias_validas = [
-            'Vías y Tránsito',
-            'Alumbrado Público',
-            'Agua y Saneamiento',
-            'Residuos y Limpieza',
-            'Parques y Espacios Públicos',
-            'Electricidad y Telecomunicaciones',
-            'Edificaciones Públicas',
-            'Seguridad Urbana',
-            'Transporte Público',
-            'Otros'
-        ]
-        
-        if nueva_categoria not in categorias_validas:
-            return jsonify({'error': 'Categoría no válida'}), 400
-        
-        # Actualizar categoría
-        actualizar_categoria_reporte(reporte_id, nueva_categoria)
-        
-        return jsonify({
-            'success': True,
-            'message': f'Categoría actualizada a {nueva_categoria}'
-        })
-        
-    except Exception as e:
-        return jsonify({'error': f'Error al actualizar categoría: {str(e)}'}), 500
-
-
-@app.route('/api/reportes/<int:reporte_id>', methods=['DELETE'])
-@rol_admin_requerido
-def eliminar_reporte_ruta(reporte_id):
-    """Elimina un reporte (solo admin, requiere comentario)."""
-    try:
-        data = request.get_json()
-        comentario = data.get('comentario', '').strip()
-        
-        # Validar que haya comentario
-        if not comentario or len(comentario) < 10:
-            return jsonify({'error': 'Debe proporcionar un comentario de al menos 10 caracteres explicando por qué elimina este reporte'}), 400
-        
-        # Verificar que el reporte existe
-        reporte = obtener_reporte_por_id(reporte_id)
-        if not reporte:
-            return jsonify({'error': 'Reporte no encontrado'}), 404
-        
-        # Eliminar reporte
-        eliminado = eliminar_reporte(reporte_id)
-        
-        if eliminado:
-            return jsonify({
-                'success': True,
-                'message': f'Reporte eliminado. Razón: {comentario}'
-            })
-        else:
-            return jsonify({'error': 'No se pudo eliminar el reporte'}), 500
-        
-    except Exception as e:
-        return jsonify({'error': f'Error al eliminar reporte: {str(e)}'}), 500
-
-
-@app.route('/api/estadisticas', methods=['GET'])
-@rol_admin_requerido
-def obtener_estadisticas_reportes():
-    """Obtiene estadísticas de reportes (solo admin)."""
-    stats = obtener_estadisticas()
-    return jsonify(stats)
-
-
-# ─── INICIALIZACIÓN ────────────────────────────────────────────────────────
-
-# Crear tabla al importar
-init_db()
-crear_usuario('admin@ejemplo.com',  'admin123', rol='admin')
-crear_usuario('usuario@ejemplo.com','usuario123', rol='usuario')
-
-if __name__ == '__main__':
-    from database import DB_PATH
-    print("=" * 50)
-    print(f" DB usada: {DB_PATH}")
-    print(" Usuarios de prueba:")
-    print("   admin   â†’ admin@ejemplo.com / admin123")
-    print("   normal  â†’ usuario@ejemplo.com / usuario123")
-    print("=" * 50)
-
+from flask import Flask, Blueprint, current_app, g, render_template, request, redirect, url_for, session, jsonify, make_response, stream_with_context
+from functools import wraps
+import click
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+import base64
+import binascii
+import csv
+import io
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from datetime import date, datetime, timezone
+from database import (
+    init_db, cerrar_db, crear_usuario, buscar_usuario_por_correo, verificar_contrasena,
+    actualizar_hash_contrasena,
+    crear_reporte, obtener_reportes, obtener_reportes_en_bbox, obtener_clusters, obtener_reporte_por_id,
+    buscar_reportes,
+    actualizar_estado_reporte, actualizar_categoria_reporte, eliminar_reporte, obtener_estadisticas,
+    reconstruir_contadores, verificar_contadores, obtener_tareas_reporte,
+    obtener_fotos_liberadas, eliminar_foto_si_liberada, obtener_version_datos, obtener_eventos,
+    obtener_cambios, exportar_reportes, insertar_reportes_masivo, CAMPOS_REPORTES, CLUSTER_ZOOM_MAX
+)
+from imagenes import generar_variantes, es_variante, nombre_variante, urls_foto, VARIANTES
+from tareas import correr_worker, encolar_variantes_foto
+from cache import obtener_cache
+from datos_sinteticos import crear_fotos_de_ejemplo, generar_reportes
+from contrasenas import SistemaOcupado, necesita_rehash
+from limites import instalar_limites, limitar
+from compresion import instalar_compresion, precomprimir_estaticos
+from subidas import RequestConSubidas, FotoDemasiadoGrande, guardar_subida, ruta_por_contenido
+
+# Rutas y comandos de la aplicación; create_app() los registra.
+# Importar este módulo no toca la base ni el disco.
+bp = Blueprint('web', __name__, cli_group=None)
+
+# Configuracion de uploads
+UPLOAD_FOLDER = 'static/uploads'
+UPLOAD_URL = '/static/uploads'
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
+
+# Usuarios de prueba que crea `flask sembrar` (y `python app.py`)
+USUARIOS_DE_PRUEBA = (
+    ('admin@ejemplo.com', 'admin123', 'admin'),
+    ('usuario@ejemplo.com', 'usuario123', 'usuario'),
+)
+
+
+# Paginación de /api/reportes
+LIMITE_POR_DEFECTO = 24
+LIMITE_MAXIMO = 100
+
+# Máximo de puntos que devuelve /api/reportes/mapa por petición
+LIMITE_MAPA = 5000
+# Con más reportes que esto en pantalla se envían clusters en vez de puntos
+UMBRAL_PUNTOS_MAPA = 300
+
+# Máximo de cambios por respuesta de /api/reportes/cambios
+LIMITE_CAMBIOS = 500
+
+# Stream de eventos (/api/eventos): cada cuánto se buscan eventos nuevos,
+# cada cuánto se manda un comentario para mantener viva la conexión y
+# cuánto dura una conexión antes de que el navegador reconecte solo
+EVENTOS_INTERVALO = float(os.environ.get('EVENTOS_INTERVALO', 1.0))
+EVENTOS_LATIDO = 15
+EVENTOS_DURACION = int(os.environ.get('EVENTOS_DURACION', 300))
+# Cada stream ocupa un hilo del worker mientras dura: como mucho
+# EVENTOS_MAX_CONEXIONES por proceso; los demás reciben 503 y reintentan
+# en EVENTOS_REINTENTO_OCUPADO segundos
+EVENTOS_MAX_CONEXIONES = int(os.environ.get('EVENTOS_MAX_CONEXIONES', 8))
+EVENTOS_REINTENTO_OCUPADO = 30
+_streams_eventos = threading.BoundedSemaphore(EVENTOS_MAX_CONEXIONES)
+
+# Exportación (/api/reportes/exportar): filas por bloque enviado al cliente
+EXPORTAR_LOTE = 500
+FORMATOS_EXPORTACION = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def allowed_file(filename):
+    """Verifica si el archivo tiene una extensión permitida."""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def agregar_urls_foto(reporte):
+    """Agrega las URLs de la foto original y sus variantes reducidas."""
+    reporte['foto_urls'] = urls_foto(reporte['foto'], UPLOAD_URL)
+    return reporte
+
+
+def codificar_cursor(reporte):
+    """Cursor opaco (base64) con la posición (fecha_creacion, id) de un reporte."""
+    datos = json.dumps([reporte['fecha_creacion'], reporte['id']])
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def leer_campos(valor):
+    """
+    Lista de campos pedida en `fields` (sin repetidos, en orden), None si no
+    se pidió ninguno o False si alguno no es una columna de reportes.
+    """
+    if not valor:
+        return None
+    campos = list(dict.fromkeys(c.strip() for c in valor.split(',') if c.strip()))
+    if any(c not in CAMPOS_REPORTES for c in campos):
+        return False
+    return campos or None
+
+
+def decodificar_cursor(cursor):
+    """Retorna la tupla (fecha_creacion, id) o None si el cursor no es válido."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        fecha, reporte_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return str(fecha), int(reporte_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+# ─── DECORADORES DE PROTECCIÓN ────────────────────────────────────────────
+
+def login_requerido(f):
+    """Redirige a login si el usuario no está autenticado."""
+    @wraps(f)
+    def decorado(*args, **kwargs):
+        if 'correo' not in session:
+            return redirect(url_for('.login'))
+        return f(*args, **kwargs)
+    return decorado
+
+
+def rol_admin_requerido(f):
+    """Solo permite acceso si el usuario tiene rol 'admin'."""
+    @wraps(f)
+    def decorado(*args, **kwargs):
+        if 'correo' not in session:
+            return redirect(url_for('.login'))
+        if session.get('rol') != 'admin':
+            return jsonify({'error': 'Sin permiso'}), 403
+        return f(*args, **kwargs)
+    return decorado
+
+
+# ─── CACHÉ HTTP (ETag / Last-Modified) ────────────────────────────────────
+
+def cache_http(f):
+    """
+    Respuestas condicionales para GET: el ETag es la versión de los datos
+    (ver database.obtener_version_datos) más el rol, porque admins y
+    visitantes reciben contenidos distintos, y la fecha, porque las
+    estadísticas por día cambian a medianoche sin que haya escrituras.
+    Si el cliente ya tiene esa versión se responde 304 sin ejecutar la
+    vista: solo se lee la fila de la versión. Esa lectura se hace en cada
+    petición, 304 incluidos; no se guarda en memoria porque las escrituras
+    de otros workers no la actualizarían.
+    """
+    @wraps(f)
+    def decorado(*args, **kwargs):
+        version, actualizado_en = obtener_version_datos()
+        # cache_respuesta usa la misma versión en su clave
+        g.version_datos = version
+        rol = session.get('rol', 'publico')
+        etag = f'{version}-{rol}-{date.today().isoformat()}'
+        ultima_modificacion = datetime.fromtimestamp(int(actualizado_en), timezone.utc)
+
+        # If-None-Match manda; Last-Modified tiene resolución de segundos
+        if request.if_none_match:
+            sin_cambios = request.if_none_match.contains_weak(etag)
+        else:
+            sin_cambios = (request.if_modified_since is not None
+                           and ultima_modificacion <= request.if_modified_since)
+
+        if sin_cambios:
+            respuesta = current_app.response_class(status=304)
+        else:
+            respuesta = make_response(f(*args, **kwargs))
+            if respuesta.status_code != 200:
+                return respuesta
+
+        respuesta.set_etag(etag, weak=True)
+        respuesta.last_modified = ultima_modificacion
+        # el navegador guarda la respuesta pero revalida en cada petición
+        respuesta.cache_control.no_cache = True
+        respuesta.vary.add('Cookie')
+        return respuesta
+    return decorado
+
+
+def cache_respuesta(etiquetas):
+    """
+    Guarda en la caché de respuestas (cache.py) el JSON ya serializado de
+    la vista. La clave incluye el endpoint, el rol, los parámetros y la
+    fecha; `etiquetas(**kwargs)` indica qué escrituras la invalidan. Solo
+    con la caché local y varios workers (cache.versionada) la clave lleva
+    también la versión de los datos, porque ahí la invalidación por
+    etiquetas no llega a los otros procesos.
+    """
+    def decorador(f):
+        @wraps(f)
+        def decorado(*args, **kwargs):
+            cache = obtener_cache()
+            partes = [
+                request.endpoint,
+                session.get('rol', 'publico'),
+                sorted(request.args.items(multi=True)),
+                sorted(kwargs.items()),
+                date.today().isoformat(),
+            ]
+            if cache.versionada:
+                if 'version_datos' not in g:
+                    g.version_datos = obtener_version_datos()[0]
+                partes.append(g.version_datos)
+            # texto: los backends compartidos (cache.py) guardan claves str
+            clave = json.dumps(partes)
+
+            respuesta = None
+
+            def calcular():
+                nonlocal respuesta
+                respuesta = make_response(f(*args, **kwargs))
+                # solo se guardan las respuestas correctas
+                if respuesta.status_code == 200 and respuesta.is_json:
+                    return respuesta.get_data()
+                return None
+
+            cuerpo, acierto = cache.obtener_o_calcular(
+                clave, etiquetas(**kwargs), calcular
+            )
+            if respuesta is None:
+                respuesta = current_app.response_class(cuerpo, mimetype='application/json')
+            respuesta.headers['X-Cache'] = 'HIT' if acierto else 'MISS'
+            return respuesta
+        return decorado
+    return decorador
+
+
+# ─── RUTAS DE AUTENTICACIÓN ────────────────────────────────────────────────
+
+@bp.route('/')
+def home():
+    return redirect(url_for('.index_publico'))
+
+
+def sistema_ocupado(plantilla, error):
+    """503 con Retry-After cuando no hay lugar para calcular otro hash."""
+    respuesta = make_response(render_template(
+        plantilla, error='Hay demasiados ingresos en este momento. Intenta de nuevo en unos segundos.'
+    ), 503)
+    respuesta.headers['Retry-After'] = str(error.reintentar_en)
+    return respuesta
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+@limitar('login', plantilla='login.html')
+def login():
+    error = None
+
+    if request.method == 'POST':
+        correo     = request.form.get('correo', '').strip()
+        contrasena = request.form.get('contrasena', '')
+
+        # buscar usuario en la BD
+        usuario = buscar_usuario_por_correo(correo)
+
+        try:
+            valida = usuario is not None and verificar_contrasena(contrasena, usuario['contrasena'])
+            # hash guardado con parámetros viejos: se recalcula con los actuales
+            if valida and necesita_rehash(usuario['contrasena']):
+                actualizar_hash_contrasena(correo, contrasena)
+        except SistemaOcupado as e:
+            return sistema_ocupado('login.html', e)
+
+        if valida:
+            # ─── LOGIN EXITOSO ───
+            session['correo'] = usuario['correo']
+            session['rol']    = usuario['rol']
+            session.permanent = True
+
+            # redirigir según rol
+            if usuario['rol'] == 'admin':
+                return redirect(url_for('.admin'))
+            return redirect(url_for('.dashboard'))
+        else:
+            error = 'Correo o contraseña incorrectos.'
+
+    return render_template('login.html', error=error)
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+@limitar('registro', plantilla='register.html')
+def register():
+    """Página de registro de nuevos usuarios."""
+    error = None
+    mensaje = None
+
+    if request.method == 'POST':
+        correo = request.form.get('correo', '').strip()
+        contrasena = request.form.get('contrasena', '')
+        confirmar_contrasena = request.form.get('confirmar_contrasena', '')
+
+        # Validaciones
+        if not correo or not contrasena:
+            error = 'Todos los campos son obligatorios.'
+        elif len(contrasena) < 6:
+            error = 'La contraseña debe tener al menos 6 caracteres.'
+        elif contrasena != confirmar_contrasena:
+            error = 'Las contraseñas no coinciden.'
+        elif '@' not in correo or '.' not in correo:
+            error = 'El correo no es válido.'
+        else:
+            # Intentar crear el usuario
+            try:
+                exito = crear_usuario(correo, contrasena, rol='usuario')
+            except SistemaOcupado as e:
+                return sistema_ocupado('register.html', e)
+            
+            if exito:
+                mensaje = '✅ Cuenta creada exitosamente. Ahora puedes iniciar sesión.'
+                # Redirigir al login después de 2 segundos
+                return render_template('register.html', mensaje=mensaje, redirect_login=True)
+            else:
+                error = 'Este correo ya está registrado. Intenta con otro.'
+
+    return render_template('register.html', error=error, mensaje=mensaje)
+
+
+@bp.route('/logout')
+@login_requerido
+def logout():
+    session.clear()
+    return redirect(url_for('.index_publico'))
+
+@bp.route('/index')
+def index_publico():
+    return render_template(
+        'index.html',
+        correo=session.get('correo'),
+        rol=session.get('rol')
+    )
+
+@bp.route('/dashboard')
+@login_requerido
+def dashboard():
+    """Pagina principal para cualquier usuario autenticado."""
+    return render_template('index.html', correo=session['correo'], rol=session['rol'])
+
+
+@bp.route('/admin')
+@rol_admin_requerido
+def admin():
+    """Pagina exclusiva para administradores."""
+    return render_template('index.html', correo=session['correo'], rol=session['rol'])
+
+
+# ─── RUTAS DE REPORTES (API) ────────────────────────────────────────────────
+
+@bp.route('/api/reportes', methods=['GET'])
+@cache_http
+@cache_respuesta(lambda: [f"listado:{request.args.get('estado', 'Todos')}"])
+def listar_reportes():
+    """
+    Obtiene los reportes, opcionalmente filtrados por estado.
+    Con `limit` y/o `cursor` responde una página:
+    {"reportes": [...], "siguiente": <cursor o null>}.
+    Sin esos parámetros responde la lista completa (compatibilidad).
+
+    `fields` (lista separada por comas) limita las columnas leídas y
+    devueltas. `formato=compacto` responde en columnas:
+    {"columnas": {campo: [valores...]}, "cantidad": n, "siguiente": ...}.
+    """
+    estado = request.args.get('estado', 'Todos')
+    limite = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    compacto = request.args.get('formato') == 'compacto'
+    paginado = limite is not None or cursor is not None or compacto
+
+    campos = leer_campos(request.args.get('fields'))
+    if campos is False:
+        return jsonify({
+            'error': 'Campos no válidos',
+            'campos_validos': list(CAMPOS_REPORTES)
+        }), 400
+    consulta = campos
+    if campos and paginado:
+        # el cursor necesita la posición aunque no se haya pedido
+        consulta = campos + [c for c in ('fecha_creacion', 'id') if c not in campos]
+
+    if paginado:
+        limite = min(max(limite or LIMITE_POR_DEFECTO, 1), LIMITE_MAXIMO)
+        despues_de = None
+        if cursor:
+            despues_de = decodificar_cursor(cursor)
+            if despues_de is None:
+                return jsonify({'error': 'Cursor no válido'}), 400
+        # se pide una fila extra para saber si hay otra página
+        reportes = obtener_reportes(estado, limite=limite + 1,
+                                    despues_de=despues_de, campos=consulta)
+        hay_mas = len(reportes) > limite
+        reportes = reportes[:limite]
+        siguiente = codificar_cursor(reportes[-1]) if hay_mas else None
+    else:
+        reportes = obtener_reportes(estado, campos=consulta)
+
+    if campos and consulta != campos:
+        for reporte in reportes:
+            for campo in consulta[len(campos):]:
+                del reporte[campo]
+
+    # Si no es admin, ocultar emails
+    if session.get('rol') != 'admin':
+        for reporte in reportes:
+            if 'email' in reporte:
+                reporte['email'] = None
+
+    if 'foto' in (campos or CAMPOS_REPORTES):
+        for reporte in reportes:
+            agregar_urls_foto(reporte)
+
+    if compacto:
+        nombres = list(reportes[0]) if reportes else list(campos or CAMPOS_REPORTES)
+        return jsonify({
+            'columnas': {n: [r[n] for r in reportes] for n in nombres},
+            'cantidad': len(reportes),
+            'siguiente': siguiente
+        })
+
+    if paginado:
+        return jsonify({
+            'reportes': reportes,
+            'siguiente': siguiente
+        })
+    
+    return jsonify(reportes)
+
+
+@bp.route('/api/reportes/buscar', methods=['GET'])
+@cache_http
+def buscar_reportes_ruta():
+    """
+    Busca reportes por texto (comentario, dirección y ubicación), ordenados
+    por relevancia. Parámetros: q, estado, limit y cursor (el "siguiente"
+    de la página anterior). Responde {"reportes": [...], "siguiente": ...,
+    "truncado": ...}; truncado indica que solo se ordenaron las
+    BUSQUEDA_MAX_CANDIDATOS coincidencias más recientes.
+    """
+    texto = request.args.get('q', '').strip()
+    if not texto:
+        return jsonify({'error': 'Falta el texto a buscar (q)'}), 400
+
+    estado = request.args.get('estado', 'Todos')
+    limite = min(max(request.args.get('limit', LIMITE_POR_DEFECTO, type=int), 1), LIMITE_MAXIMO)
+    # en la búsqueda el cursor es la cantidad de resultados ya enviados
+    desplazamiento = request.args.get('cursor', '0')
+    if not desplazamiento.isdigit():
+        return jsonify({'error': 'Cursor no válido'}), 400
+    desplazamiento = int(desplazamiento)
+
+    reportes, truncado = buscar_reportes(texto, estado, limite=limite + 1, desplazamiento=desplazamiento)
+    hay_mas = len(reportes) > limite
+    reportes = reportes[:limite]
+
+    for reporte in reportes:
+        if session.get('rol') != 'admin':
+            reporte['email'] = None
+        agregar_urls_foto(reporte)
+
+    return jsonify({
+        'reportes': reportes,
+        'siguiente': str(desplazamiento + limite) if hay_mas else None,
+        'truncado': truncado,
+    })
+
+
+@bp.route('/api/reportes/cambios', methods=['GET'])
+@cache_http
+def cambios_reportes():
+    """
+    Sincronización incremental: reportes creados o modificados y ids de
+    reportes eliminados después de la versión `desde`. Responde
+    {"version", "reportes", "eliminados", "hay_mas"}; el cliente guarda
+    "version" y la manda como `desde` en la próxima petición.
+    """
+    desde = request.args.get('desde', '0')
+    if not desde.isdigit():
+        return jsonify({'error': 'El parámetro desde debe ser una versión (entero)'}), 400
+    limite = min(max(request.args.get('limit', LIMITE_CAMBIOS, type=int), 1), LIMITE_CAMBIOS)
+
+    reportes, eliminados, version, hay_mas = obtener_cambios(int(desde), limite)
+
+    for reporte in reportes:
+        if session.get('rol') != 'admin':
+            reporte['email'] = None
+        agregar_urls_foto(reporte)
+
+    return jsonify({
+        'version': version,
+        'reportes': reportes,
+        'eliminados': eliminados,
+        'hay_mas': hay_mas,
+    })
+
+
+@bp.route('/api/reportes/exportar', methods=['GET'])
+@rol_admin_requerido
+def exportar_reportes_ruta():
+    """
+    Exporta todos los reportes que cumplen los filtros (estado, categoria,
+    desde, hasta) como NDJSON (una fila JSON por línea) o CSV. La respuesta
+    se genera mientras se lee el cursor, sin armar la lista completa en
+    memoria. Con gzip=1 el cuerpo va comprimido (Content-Encoding: gzip).
+    """
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({'error': f'Formato no válido, usar: {", ".join(FORMATOS_EXPORTACION)}'}), 400
+
+    fechas = {}
+    for parametro in ('desde', 'hasta'):
+        valor = request.args.get(parametro)
+        if valor:
+            try:
+                fechas[parametro] = date.fromisoformat(valor).isoformat()
+            except ValueError:
+                return jsonify({'error': f'{parametro} debe ser una fecha AAAA-MM-DD'}), 400
+
+    comprimir = request.args.get('gzip') in ('1', 'true')
+    filas = exportar_reportes(
+        estado=request.args.get('estado'),
+        categoria=request.args.get('categoria'),
+        lote=EXPORTAR_LOTE,
+        **fechas,
+    )
+
+    def bloques():
+        buffer = io.StringIO()
+        if formato == 'csv':
+            escritor = csv.writer(buffer)
+            escritor.writerow(CAMPOS_REPORTES)
+        pendientes = 0
+        for reporte in filas:
+            if formato == 'csv':
+                escritor.writerow([reporte.get(c) for c in CAMPOS_REPORTES])
+            else:
+                buffer.write(json.dumps(reporte, ensure_ascii=False, separators=(',', ':')))
+                buffer.write('\n')
+            pendientes += 1
+            if pendientes >= EXPORTAR_LOTE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pendientes = 0
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def comprimidos():
+        # wbits=31: formato gzip; cada bloque se entrega apenas zlib lo suelta
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for bloque in bloques():
+            datos = compresor.compress(bloque.encode())
+            if datos:
+                yield datos
+        yield compresor.flush()
+
+    nombre = f'reportes.{formato}'
+    cabeceras = {
+        'Content-Disposition': f'attachment; filename="{nombre}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    }
+    if comprimir:
+        cabeceras['Content-Encoding'] = 'gzip'
+
+    return current_app.response_class(
+        stream_with_context(comprimidos() if comprimir else bloques()),
+        mimetype=FORMATOS_EXPORTACION[formato],
+        headers=cabeceras,
+    )
+
+
+@bp.route('/api/eventos', methods=['GET'])
+def stream_eventos():
+    """
+    Server-Sent Events con los cambios de reportes: creado, estado,
+    categoria y eliminado. El id de cada evento es la versión de los datos;
+    al reconectar, el navegador manda Last-Event-ID y recibe lo que se
+    perdió. Si eso ya no está disponible se envía "recargar". Con
+    EVENTOS_MAX_CONEXIONES streams abiertos en el proceso responde 503.
+    """
+    desde = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    if desde is not None and not desde.isdigit():
+        return jsonify({'error': 'Last-Event-ID no válido'}), 400
+
+    if not _streams_eventos.acquire(blocking=False):
+        respuesta = current_app.response_class(
+            f'retry: {EVENTOS_REINTENTO_OCUPADO * 1000}\n\n',
+            status=503, mimetype='text/event-stream',
+        )
+        respuesta.headers['Retry-After'] = str(EVENTOS_REINTENTO_OCUPADO)
+        return respuesta
+
+    def mensaje(evento, datos, version=None):
+        lineas = f'id: {version}\n' if version is not None else ''
+        return f'{lineas}event: {evento}\ndata: {json.dumps(datos, separators=(",", ":"))}\n\n'
+
+    def generar():
+        ultima = int(desde) if desde is not None else obtener_version_datos()[0]
+        yield 'retry: 3000\n\n'
+        # id inicial: si el cliente reconecta sin haber recibido eventos
+        yield mensaje('conectado', {}, ultima)
+
+        fin = time.monotonic() + EVENTOS_DURACION
+        ultimo_envio = time.monotonic()
+        while time.monotonic() < fin:
+            eventos, completos = obtener_eventos(ultima)
+            if not completos:
+                ultima = obtener_version_datos()[0]
+                yield mensaje('recargar', {}, ultima)
+                ultimo_envio = time.monotonic()
+                continue
+            for evento in eventos:
+                datos = {'id': evento['reporte_id'], **evento['datos']}
+                if evento['tipo'] == 'creado':
+                    agregar_urls_foto(datos)
+                ultima = evento['version']
+                yield mensaje(evento['tipo'], datos, ultima)
+                ultimo_envio = time.monotonic()
+            if len(eventos) == 0:
+                if time.monotonic() - ultimo_envio >= EVENTOS_LATIDO:
+                    yield ': latido\n\n'
+                    ultimo_envio = time.monotonic()
+                # la conexión vuelve al pool mientras se espera
+                cerrar_db()
+                time.sleep(EVENTOS_INTERVALO)
+
+    respuesta = current_app.response_class(
+        stream_with_context(generar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # el lugar se libera cuando el servidor cierra la respuesta
+    respuesta.call_on_close(_streams_eventos.release)
+    return respuesta
+
+
+@bp.route('/api/reportes/mapa', methods=['GET'])
+@cache_http
+def reportes_en_mapa():
+    """
+    Reportes visibles en el mapa: bbox=minLng,minLat,maxLng,maxLat.
+    Responde tuplas compactas [id, lat, lng, estado, categoria]. Si se
+    indica `zoom` y hay demasiados reportes en pantalla, responde en su
+    lugar clusters precalculados para ese zoom.
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = (
+            float(v) for v in request.args.get('bbox', '').split(',')
+        )
+    except ValueError:
+        return jsonify({'error': 'bbox debe ser minLng,minLat,maxLng,maxLat'}), 400
+
+    # float() acepta 'nan' e 'inf', que después rompen el cálculo de celdas
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        return jsonify({'error': 'bbox no válido'}), 400
+    if min_lng > max_lng or min_lat > max_lat:
+        return jsonify({'error': 'bbox no válido'}), 400
+
+    # el mapa puede pedir más allá de los bordes del mundo al alejar el zoom
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lng, max_lng = max(min_lng, -180.0), min(max_lng, 180.0)
+
+    campos = ['id', 'lat', 'lng', 'estado', 'categoria']
+
+    zoom = request.args.get('zoom', type=int)
+    if zoom is not None and zoom <= CLUSTER_ZOOM_MAX:
+        clusters = obtener_clusters(zoom, min_lng, min_lat, max_lng, max_lat)
+        if sum(c['cantidad'] for c in clusters) > UMBRAL_PUNTOS_MAPA:
+            return jsonify({'campos': campos, 'reportes': [], 'clusters': clusters, 'truncado': False})
+
+    reportes = obtener_reportes_en_bbox(min_lng, min_lat, max_lng, max_lat, limite=LIMITE_MAPA + 1)
+
+    return jsonify({
+        'campos': campos,
+        'reportes': reportes[:LIMITE_MAPA],
+        'clusters': [],
+        'truncado': len(reportes) > LIMITE_MAPA
+    })
+
+
+@bp.route('/api/reportes', methods=['POST'])
+@login_requerido
+@limitar('crear_reporte')
+def crear_nuevo_reporte():
+    try:
+        # ─── CAMPOS DE TEXTO ───
+        ubicacion  = request.form.get('ubicacion', '').strip()
+        direccion  = request.form.get('direccion', '').strip()
+        comentario = request.form.get('comentario', '').strip()
+        categoria  = request.form.get('categoria', 'Otros').strip()
+
+        # ─── COORDENADAS (MAPA) ───
+        lat = request.form.get('lat')
+        lng = request.form.get('lng')
+
+        if not lat or not lng:
+            return jsonify({'error': 'Debe marcar la ubicación en el mapa'}), 400
+
+        # ─── VALIDACIONES ───
+        if not comentario or len(comentario) < 10:
+            return jsonify({'error': 'El comentario debe tener al menos 10 caracteres'}), 400
+
+        # ─── FOTO ───
+        if 'foto' not in request.files:
+            return jsonify({'error': 'Falta la foto'}), 400
+
+        foto = request.files['foto']
+
+        if foto.filename == '':
+            return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
+
+        if not allowed_file(foto.filename):
+            return jsonify({'error': 'Tipo de archivo no permitido'}), 400
+
+        # Nombre según el contenido: la misma foto se guarda una sola vez
+        filename = ruta_por_contenido(foto)
+        ruta_foto = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+
+        # ------- BD --------
+        # Primero la referencia: con ella registrada, limpiar-fotos ya no
+        # puede borrar el archivo que se está por guardar
+        reporte_id = crear_reporte(
+            ubicacion=ubicacion,
+            direccion=direccion,
+            comentario=comentario,
+            foto=filename,
+            categoria=categoria,
+            lat=float(lat),
+            lng=float(lng),
+            usuario_correo=session.get('correo')
+        )
+
+        try:
+            nueva = guardar_subida(foto, ruta_foto)
+        except Exception:
+            eliminar_reporte(reporte_id)
+            raise
+
+        # Miniatura y versión mediana en WebP: las genera el worker
+        # (si la foto ya estaba en disco, sus variantes también)
+        if nueva:
+            encolar_variantes_foto(os.path.abspath(ruta_foto), reporte_id)
+
+        return jsonify({'success': True, 'message': 'Reporte enviado correctamente', 'id': reporte_id}), 201
+
+    except RequestEntityTooLarge:
+        # cuerpo mayor a MAX_CONTENT_LENGTH o foto mayor a MAX_FILE_SIZE
+        return jsonify({'error': FotoDemasiadoGrande.description}), 413
+    except HTTPException as e:
+        # la foto no es una imagen permitida (ver subidas.py)
+        return jsonify({'error': e.description}), e.code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/reportes/<int:reporte_id>', methods=['GET'])
+@cache_http
+@cache_respuesta(lambda reporte_id: [f'reporte:{reporte_id}'])
+def obtener_reporte(reporte_id):
+    """Obtiene un reporte específico por ID."""
+    reporte = obtener_reporte_por_id(reporte_id)
+    if reporte:
+        # Si no es admin, ocultar email
+        if session.get('rol') != 'admin' and 'email' in reporte:
+            reporte['email'] = None
+        return jsonify(agregar_urls_foto(reporte))
+    return jsonify({'error': 'Reporte no encontrado'}), 404
+
+
+@bp.route('/api/reportes/<int:reporte_id>/tareas', methods=['GET'])
+@login_requerido
+def tareas_reporte(reporte_id):
+    """Estado del procesamiento en segundo plano de un reporte."""
+    tareas = obtener_tareas_reporte(reporte_id)
+
+    # el detalle del error solo lo ve el admin
+    if session.get('rol') != 'admin':
+        for tarea in tareas:
+            tarea['error'] = None
+
+    return jsonify(tareas)
+
+
+@bp.route('/api/reportes/<int:reporte_id>/estado', methods=['PUT'])
+@rol_admin_requerido
+def cambiar_estado_reporte(reporte_id):
+    """Cambia el estado de un reporte (solo admin)."""
+    try:
+        data = request.get_json()
+        nuevo_estado = data.get('estado')
+        razon_rechazo = data.get('razon_rechazo')
+        
+        # Validar estado
+        estados_validos = ['Pendiente', 'Verificando', 'Solucionado', 'Rechazado']
+        if nuevo_estado not in estados_validos:
+            return jsonify({'error': 'Estado no válido'}), 400
+        
+        # Si es rechazado, verificar que haya razón
+        if nuevo_estado == 'Rechazado':
+            if not razon_rechazo or len(razon_rechazo.strip()) < 10:
+                return jsonify({'error': 'Debe proporcionar una razón de rechazo de al menos 10 caracteres'}), 400
+        
+        # Actualizar estado
+        actualizar_estado_reporte(reporte_id, nuevo_estado, razon_rechazo)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Estado actualizado a {nuevo_estado}'
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Error al actualizar estado: {str(e)}'}), 500
+
+
+@bp.route('/api/reportes/<int:reporte_id>/categoria', methods=['PUT'])
+@rol_admin_requerido
+def cambiar_categoria_reporte(reporte_id):
+    """Cambia la categoría de un reporte (solo admin)."""
+    try:
+        data = request.get_json()
+        nueva_categoria = data.get('categoria')
+        
+        # Validar categoría
+        categorias_validas = [
+            'Vías y Tránsito',
+            'Alumbrado Público',
+            'Agua y Saneamiento',
+            'Residuos y Limpieza',
+            'Parques y Espacios Públicos',
+            'Electricidad y Telecomunicaciones',
+            'Edificaciones Públicas',
+            'Seguridad Urbana',
+            'Transporte Público',
+            'Otros'
+        ]
+        
+        if nueva_categoria not in categorias_validas:
+            return jsonify({'error': 'Categoría no válida'}), 400
+        
+        # Actualizar categoría
+        actualizar_categoria_reporte(reporte_id, nueva_categoria)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Categoría actualizada a {nueva_categoria}'
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Error al actualizar categoría: {str(e)}'}), 500
+
+
+@bp.route('/api/reportes/<int:reporte_id>', methods=['DELETE'])
+@rol_admin_requerido
+def eliminar_reporte_ruta(reporte_id):
+    """Elimina un reporte (solo admin, requiere comentario)."""
+    try:
+        data = request.get_json()
+        comentario = data.get('comentario', '').strip()
+        
+        # Validar que haya comentario
+        if not comentario or len(comentario) < 10:
+            return jsonify({'error': 'Debe proporcionar un comentario de al menos 10 caracteres explicando por qué elimina este reporte'}), 400
+        
+        # Verificar que el reporte existe
+        reporte = obtener_reporte_por_id(reporte_id)
+        if not reporte:
+            return jsonify({'error': 'Reporte no encontrado'}), 404
+        
+        # Eliminar reporte
+        eliminado = eliminar_reporte(reporte_id)
+        
+        if eliminado:
+            return jsonify({
+                'success': True,
+                'message': f'Reporte eliminado. Razón: {comentario}'
+            })
+        else:
+            return jsonify({'error': 'No se pudo eliminar el reporte'}), 500
+        
+    except Exception as e:
+        return jsonify({'error': f'Error al eliminar reporte: {str(e)}'}), 500
+
+
+@bp.route('/api/estadisticas', methods=['GET'])
+@rol_admin_requerido
+@cache_http
+@cache_respuesta(lambda: ['estadisticas'])
+def obtener_estadisticas_reportes():
+    """Obtiene estadísticas de reportes (solo admin)."""
+    stats = obtener_estadisticas()
+    return jsonify(stats)
+
+
+@bp.route('/api/cache', methods=['GET'])
+@rol_admin_requerido
+def estadisticas_cache():
+    """Tamaño y tasa de aciertos de la caché de respuestas (solo admin)."""
+    return jsonify(obtener_cache().estadisticas())
+
+
+# ─── COMANDOS DE MANTENIMIENTO (flask --app app <comando>) ─────────────────
+
+@bp.cli.command('verificar-contadores')
+@click.option('--reconstruir', is_flag=True, help='Recalcular los contadores si hay diferencias.')
+def verificar_contadores_cmd(reconstruir):
+    """Compara los contadores de estadísticas con un recuento completo."""
+    diferencias = verificar_contadores()
+    if not diferencias:
+        click.echo('✓ Contadores correctos')
+        return
+
+    for tipo, clave, contador, recuento in diferencias:
+        click.echo(f'✗ {tipo}={clave!r}: contador {contador}, recuento {recuento}')
+
+    if reconstruir:
+        reconstruir_contadores()
+        click.echo('✓ Contadores reconstruidos')
+    else:
+        raise SystemExit(1)
+
+
+@bp.cli.command('generar-variantes')
+def generar_variantes_cmd():
+    """Genera miniaturas/medianas de las fotos subidas que no las tengan."""
+    generadas = 0
+    # las fotos nuevas están en subcarpetas (ab/cd/<sha256>.jpg)
+    for raiz, _, nombres in os.walk(current_app.config['UPLOAD_FOLDER']):
+        archivos = set(nombres)
+        for foto in sorted(archivos):
+            if not allowed_file(foto) or es_variante(foto):
+                continue
+            if all(nombre_variante(foto, v) in archivos for v in VARIANTES):
+                continue
+            if generar_variantes(os.path.join(raiz, foto)):
+                generadas += 1
+    click.echo(f'✓ Variantes generadas para {generadas} foto(s)')
+
+
+def _borrar_foto_y_variantes(foto):
+    """Borra del disco una foto y sus variantes WebP (si existen)."""
+    for nombre in [foto] + [nombre_variante(foto, v) for v in VARIANTES]:
+        try:
+            os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], nombre))
+        except FileNotFoundError:
+            pass
+
+
+@bp.cli.command('limpiar-fotos')
+@click.option('--gracia', default=24.0, show_default=True,
+              help='Horas que una foto sin referencias se conserva antes de borrarla.')
+def limpiar_fotos_cmd(gracia):
+    """
+    Borra las fotos que ya no usa ningún reporte (según la tabla fotos, sin
+    listar el disco) y las subidas abandonadas.
+    """
+    limite = time.time() - gracia * 3600
+
+    borradas = 0
+    for foto in obtener_fotos_liberadas(limite):
+        if eliminar_foto_si_liberada(foto, _borrar_foto_y_variantes):
+            borradas += 1
+
+    # temporales de subidas cortadas a mitad de camino (ver subidas.py):
+    # siempre están en la raíz de UPLOAD_FOLDER, no hace falta recorrer
+    # las subcarpetas de las fotos
+    temporales = 0
+    with os.scandir(current_app.config['UPLOAD_FOLDER']) as entradas:
+        for entrada in entradas:
+            if (entrada.name.endswith('.part') and entrada.is_file()
+                    and entrada.stat().st_mtime < limite):
+                os.remove(entrada.path)
+                temporales += 1
+
+    click.echo(f'✓ {borradas} foto(s) sin referencias y {temporales} temporal(es) eliminados')
+
+
+@bp.cli.command('limpiar-cache')
+def limpiar_cache_cmd():
+    """Vacía la caché de respuestas del backend configurado."""
+    cache = obtener_cache()
+    cache.limpiar()
+    click.echo(f'✓ Caché vaciada ({cache.nombre})')
+
+
+@bp.cli.command('precomprimir')
+@click.option('--forzar', is_flag=True, help='Regenerar aunque estén al día.')
+def precomprimir_cmd(forzar):
+    """Genera las versiones .gz/.br de los archivos estáticos."""
+    escritos = precomprimir_estaticos(current_app.static_folder, forzar=forzar)
+    click.echo(f'{escritos} archivo(s) comprimido(s)')
+
+
+@bp.cli.command('init-db')
+def init_db_cmd():
+    """Crea las tablas e índices que falten y aplica las migraciones."""
+    init_db()
+    click.echo('Base de datos lista')
+
+
+def sembrar_usuarios():
+    """
+    Crea los usuarios de prueba que falten. Los que ya existen se saltan
+    antes de calcular el hash de la contraseña, que es lo caro.
+    Retorna la cantidad creada.
+    """
+    creados = 0
+    for correo, contrasena, rol in USUARIOS_DE_PRUEBA:
+        if buscar_usuario_por_correo(correo) is None:
+            creados += crear_usuario(correo, contrasena, rol=rol)
+    return creados
+
+
+@bp.cli.command('sembrar')
+def sembrar_cmd():
+    """Crea los usuarios de prueba (admin y usuario)."""
+    click.echo(f'{sembrar_usuarios()} usuario(s) creado(s)')
+
+
+@bp.cli.command('generar-datos')
+@click.option('--cantidad', default=100000, show_default=True, help='Reportes a insertar.')
+@click.option('--anios', default=3, show_default=True, help='Años hacia atrás que abarcan las fechas.')
+@click.option('--fotos', default=0, show_default=True, help='Fotos de ejemplo a crear y repartir (requiere Pillow).')
+@click.option('--semilla', default=1, show_default=True, help='Semilla: la misma genera los mismos datos.')
+def generar_datos_cmd(cantidad, anios, fotos, semilla):
+    """Llena la base con reportes sintéticos para pruebas de carga."""
+    rutas_fotos = ('sin_foto.jpg',)
+    if fotos:
+        rutas_fotos = crear_fotos_de_ejemplo(current_app.config['UPLOAD_FOLDER'], fotos, semilla)
+    inicio = time.perf_counter()
+    insertados = insertar_reportes_masivo(
+        generar_reportes(cantidad, anios=anios, fotos=rutas_fotos, semilla=semilla),
+        cantidad_estimada=cantidad,
+    )
+    duracion = time.perf_counter() - inicio
+    click.echo(f'{insertados} reportes insertados en {duracion:.1f} s '
+               f'({insertados / duracion:,.0f} por segundo)')
+
+
+@bp.cli.command('worker')
+@click.option('--hilos', default=1, show_default=True, help='Tareas en paralelo.')
+@click.option('--intervalo', default=1.0, show_default=True, help='Segundos de espera con la cola vacía.')
+@click.option('--una-vez', is_flag=True, help='Vaciar la cola y terminar.')
+def worker_cmd(hilos, intervalo, una_vez):
+    """Procesa la cola de tareas en segundo plano (miniaturas, etc.)."""
+    click.echo(f'Worker iniciado ({hilos} hilo(s))')
+    correr_worker(hilos=hilos, intervalo=intervalo, una_vez=una_vez)
+
+
+# ─── INICIALIZACIÓN ────────────────────────────────────────────────────────
+
+def create_app(config=None):
+    """
+    Crea y configura la aplicación. No toca la base de datos: las tablas,
+    migraciones y usuarios de prueba se crean con `flask init-db` y
+    `flask sembrar` (o al correr `python app.py`).
+    """
+    app = Flask(__name__)
+
+    # Los archivos subidos se validan y escriben a disco mientras llegan
+    app.request_class = RequestConSubidas
+
+    # Clave secreta para firmar las cookies de sesión
+    app.secret_key = 'cambiar_esto_en_produccion_por_una_clave_segura'
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+    app.config['MAX_FILE_SIZE'] = MAX_FILE_SIZE
+    if config:
+        app.config.update(config)
+
+    # Devolver la conexión SQLite al pool al terminar cada petición
+    app.teardown_appcontext(cerrar_db)
+
+    # Comprimir respuestas de texto (gzip/br) y servir estáticos precomprimidos
+    instalar_compresion(app)
+
+    # Descartar peticiones con 503 si el proceso ya tiene demasiadas en curso
+    instalar_limites(app)
+
+    app.register_blueprint(bp)
+
+    # Crear carpeta de uploads si no existe
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    return app
+
+
+if __name__ == '__main__':
+    from database import DB_PATH
+    app = create_app()
+    with app.app_context():
+        init_db()
+        sembrar_usuarios()
+    # en producción lo hace `flask precomprimir` al desplegar
+    precomprimir_estaticos(app.static_folder)
+
+    print("=" * 50)
+    print(f" DB usada: {DB_PATH}")
+    print(" Usuarios de prueba:")
+    print("   admin   â†’ admin@ejemplo.com / admin123")
+    print("   normal  â†’ usuario@ejemplo.com / usuario123")
+    print("=" * 50)
+
     app.run(debug=True)
\ No newline at end of file
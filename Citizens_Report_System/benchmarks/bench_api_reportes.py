@@ -0,0 +1,84 @@
+"""
+Benchmark de peticiones por segundo en GET /api/reportes.
+
+Compara la capa de datos sin pool (DB_POOL_SIZE=0, una conexión nueva por
+petición) contra el pool de conexiones. Cada caso corre en un subproceso
+con su propia base temporal. La caché de respuestas se desactiva
+(CACHE_MAX_BYTES=0: ninguna respuesta entra): con ella casi todas las
+peticiones serían aciertos y no llegarían a la base.
+
+Uso:
+    python benchmarks/bench_api_reportes.py --reportes 200 --hilos 8 --peticiones 2000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from comun import preparar_entorno, sembrar_reportes
+
+
+def medir(args):
+    """Ejecuta la carga en este proceso y retorna peticiones/segundo."""
+    # sin caché de respuestas: cada petición consulta la base
+    preparar_entorno(CACHE_MAX_BYTES=0)
+    import database
+    from app import create_app
+
+    database.init_db()
+    app = create_app()
+
+    sembrar_reportes(args.reportes)
+
+    por_hilo = args.peticiones // args.hilos
+
+    def trabajador(_):
+        cliente = app.test_client()
+        for _ in range(por_hilo):
+            respuesta = cliente.get('/api/reportes')
+            assert respuesta.status_code == 200
+            assert respuesta.headers['X-Cache'] == 'MISS'
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as ejecutor:
+        list(ejecutor.map(trabajador, range(args.hilos)))
+    duracion = time.perf_counter() - inicio
+
+    return (por_hilo * args.hilos) / duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reportes', type=int, default=200, help='filas en la tabla reportes')
+    parser.add_argument('--hilos', type=int, default=8, help='hilos concurrentes')
+    parser.add_argument('--peticiones', type=int, default=2000, help='peticiones totales')
+    parser.add_argument('--pool', type=int, default=8, help='tamaño del pool a comparar')
+    parser.add_argument('--interno', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps({'rps': medir(args)}))
+        return
+
+    resultados = {}
+    for etiqueta, tamano in (('sin pool', 0), (f'pool={args.pool}', args.pool)):
+        entorno = dict(os.environ, DB_POOL_SIZE=str(tamano))
+        salida = subprocess.run(
+            [sys.executable, __file__, '--interno',
+             '--reportes', str(args.reportes),
+             '--hilos', str(args.hilos),
+             '--peticiones', str(args.peticiones)],
+            env=entorno, capture_output=True, text=True, check=True
+        )
+        resultados[etiqueta] = json.loads(salida.stdout.strip().splitlines()[-1])['rps']
+
+    print(f"GET /api/reportes  ({args.reportes} reportes, {args.hilos} hilos, {args.peticiones} peticiones)")
+    for etiqueta, rps in resultados.items():
+        print(f"  {etiqueta:<10} {rps:10.1f} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark del tiempo de arranque de un proceso (worker de gunicorn, test).
+
+Cada medición corre en un subproceso nuevo sobre la misma base temporal,
+ya inicializada, como al reiniciar un worker:
+
+- importar:      `import app` (no debe tocar la base)
+- create_app:    importar + create_app()
+- al importar:   lo que hacía antes cada import: init_db() con las
+                 migraciones y crear_usuario() de los usuarios de prueba,
+                 que calcula el hash aunque ya existan
+- init+sembrar:  `flask init-db` + `flask sembrar` (se corren una vez al
+                 desplegar, no en cada worker)
+
+Uso:
+    python benchmarks/bench_arranque.py --repeticiones 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from comun import preparar_entorno
+
+CASOS = ('importar', 'create_app', 'al importar', 'init+sembrar')
+
+
+def medir(caso):
+    """Corre el caso en este proceso; retorna (segundos, segundos de CPU)."""
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+
+    import app
+    if caso == 'create_app':
+        app.create_app()
+    elif caso == 'al importar':
+        import database
+        database.init_db()
+        for correo, contrasena, rol in app.USUARIOS_DE_PRUEBA:
+            database.crear_usuario(correo, contrasena, rol=rol)
+    elif caso == 'init+sembrar':
+        import database
+        database.init_db()
+        app.sembrar_usuarios()
+
+    return time.perf_counter() - inicio, time.process_time() - inicio_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=10, help='procesos por caso')
+    parser.add_argument('--interno', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        preparar_entorno(db_path=os.environ['DB_PATH'])
+        segundos, cpu = medir(args.interno)
+        print(json.dumps({'segundos': segundos, 'cpu': cpu}))
+        return
+
+    db_path = preparar_entorno()
+    # dejar la base creada y sembrada: se mide un reinicio, no la primera vez
+    import database
+    from app import sembrar_usuarios
+    database.init_db()
+    sembrar_usuarios()
+    database.cerrar_conexiones()
+
+    print(f"Arranque de un proceso ({args.repeticiones} repeticiones, mediana / mínimo)")
+    for caso in CASOS:
+        tiempos, cpus = [], []
+        for _ in range(args.repeticiones):
+            salida = subprocess.run(
+                [sys.executable, __file__, '--interno', caso],
+                env=dict(os.environ, DB_PATH=db_path),
+                capture_output=True, text=True, check=True
+            )
+            resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+            tiempos.append(resultado['segundos'] * 1000)
+            cpus.append(resultado['cpu'] * 1000)
+        print(f"  {caso:<13} {statistics.median(tiempos):8.1f} ms / {min(tiempos):8.1f} ms"
+              f"   CPU {statistics.median(cpus):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+Micro-benchmarks de las funciones de database.py con distintos tamaños
+de tabla.
+
+Cada tamaño corre en un subproceso nuevo con su propia base temporal,
+llenada con datos sintéticos (datos_sinteticos.generar_reportes +
+insertar_reportes_masivo). Por función se mide la latencia de cada
+llamada (media, p50, p95, p99, máximo) y la memoria que reserva una
+llamada (pico de tracemalloc); por tamaño, la memoria máxima del proceso.
+
+Las funciones que escriben (crear, actualizar, eliminar) se miden al final
+para que las lecturas vean exactamente `tamaño` reportes. Listar todos los
+reportes sin límite solo se mide hasta --max-completo filas: con 1M ocupa
+varios GB.
+
+Los resultados se guardan en JSON (--salida) y se comparan con una línea
+base (--base): si el p50 o el p95 de alguna función empeora más que
+--tolerancia (y más de --margen-ms, para no marcar ruido en funciones de
+microsegundos), o su memoria crece más que --tolerancia y más de
+--margen-kb, el script termina con código 1. --guardar-base reemplaza la
+línea base con esta corrida.
+
+Uso:
+    python benchmarks/bench_database.py --tamanos 1000,100000,1000000
+    python benchmarks/bench_database.py --tamanos 1000 --base benchmarks/base_database.json
+    python benchmarks/bench_database.py --guardar-base
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from comun import RAIZ, preparar_entorno
+
+BASE_POR_DEFECTO = os.path.join(RAIZ, 'benchmarks', 'base_database.json')
+TAMANOS_POR_DEFECTO = '1000,100000,1000000'
+USUARIOS = 1000
+# eliminar_reporte no puede repetir ids: se borran a lo sumo tantos reportes
+MAX_ELIMINAR = 1000
+ESTADOS = ('Pendiente', 'Verificando', 'Solucionado', 'Rechazado')
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) de una lista ordenada, por el rango más cercano."""
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumir(tiempos):
+    """Distribución de latencias en milisegundos."""
+    ordenados = sorted(tiempos)
+    return {
+        'llamadas': len(ordenados),
+        'media_ms': sum(ordenados) / len(ordenados),
+        'p50_ms': percentil(ordenados, 50),
+        'p95_ms': percentil(ordenados, 95),
+        'p99_ms': percentil(ordenados, 99),
+        'max_ms': ordenados[-1],
+    }
+
+
+def medir_funcion(funcion, argumentos, repeticiones, tiempo_max):
+    """
+    Llama a `funcion(*argumentos())` hasta `repeticiones` veces (o hasta
+    gastar `tiempo_max` segundos, con un mínimo de 5 llamadas). La primera
+    llamada, fuera de la medición de tiempo, mide la memoria con tracemalloc.
+    """
+    tracemalloc.start()
+    funcion(*argumentos())
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tiempos = []
+    limite = time.perf_counter() + tiempo_max
+    for i in range(repeticiones):
+        args = argumentos()
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if i >= 4 and time.perf_counter() > limite:
+            break
+
+    resultado = resumir(tiempos)
+    resultado['memoria_kb'] = pico / 1024
+    return resultado
+
+
+def poblar(tamano):
+    """Llena la base temporal con `tamano` reportes y USUARIOS usuarios."""
+    import database
+    from datos_sinteticos import generar_reportes
+
+    database.init_db()
+    database.insertar_reportes_masivo(generar_reportes(tamano), cantidad_estimada=tamano)
+    for i in range(USUARIOS):
+        database.crear_usuario(f'vecino{i}@ejemplo.com', 'benchmark')
+
+
+def ids_a_eliminar(tamano):
+    """Cantidad de ids distintos que eliminar_reporte puede borrar."""
+    return min(tamano, MAX_ELIMINAR)
+
+
+def casos(tamano, max_completo):
+    """
+    Lista de (nombre, función, generador de argumentos). Los ids se eligen
+    al azar con semilla fija: la misma corrida toca las mismas filas.
+    """
+    import database
+
+    rng = random.Random(1)
+    ids_eliminar = rng.sample(range(1, tamano + 1), ids_a_eliminar(tamano))
+    contador = iter(range(10 ** 9))
+
+    def id_al_azar():
+        return (rng.randint(1, tamano),)
+
+    lista = [
+        ('obtener_reportes(limite=24)', database.obtener_reportes, lambda: (None, 24)),
+    ]
+    lista += [
+        (f'obtener_reportes({estado}, limite=24)', database.obtener_reportes, lambda e=estado: (e, 24))
+        for estado in ESTADOS
+    ]
+    if tamano <= max_completo:
+        lista.append(('obtener_reportes()', database.obtener_reportes, lambda: ()))
+        lista.append(('obtener_reportes(Pendiente)', database.obtener_reportes, lambda: ('Pendiente',)))
+    lista += [
+        ('obtener_reporte_por_id', database.obtener_reporte_por_id, id_al_azar),
+        ('obtener_estadisticas', database.obtener_estadisticas, lambda: ()),
+        ('buscar_usuario_por_correo', database.buscar_usuario_por_correo,
+         lambda: (f'vecino{rng.randrange(USUARIOS)}@ejemplo.com',)),
+        # escrituras, al final
+        ('crear_reporte', database.crear_reporte, lambda: (
+            'Referencia benchmark', f'Reporte de benchmark {next(contador)}', 'sin_foto.jpg',
+            -25.2575 + rng.uniform(-0.05, 0.05), -57.5864 + rng.uniform(-0.05, 0.05),
+            'Otros', 'Calle benchmark, Asunción', None, 'vecino0@ejemplo.com',
+        )),
+        ('actualizar_estado_reporte', database.actualizar_estado_reporte,
+         lambda: (id_al_azar()[0], rng.choice(ESTADOS[:3]))),
+        ('eliminar_reporte', database.eliminar_reporte, lambda: (ids_eliminar.pop(),)),
+    ]
+    return lista
+
+
+def medir_tamano(tamano, args):
+    """Corre todos los casos en este proceso y retorna sus resultados."""
+    # hash barato: los usuarios se crean solo para tener filas que buscar
+    preparar_entorno(CONTRASENA_HASH='pbkdf2:sha256:1000')
+    inicio = time.perf_counter()
+    poblar(tamano)
+    segundos_poblar = time.perf_counter() - inicio
+
+    funciones = {}
+    # eliminar_reporte no puede repetir ids; medir_funcion hace además una
+    # llamada inicial para la memoria, de ahí el - 1
+    max_eliminar = ids_a_eliminar(tamano) - 1
+    for nombre, funcion, argumentos in casos(tamano, args.max_completo):
+        repeticiones = min(args.repeticiones, max_eliminar) if nombre == 'eliminar_reporte' else args.repeticiones
+        funciones[nombre] = medir_funcion(funcion, argumentos, repeticiones, args.tiempo_max)
+
+    return {
+        'poblar_s': segundos_poblar,
+        # ru_maxrss está en KB en Linux
+        'memoria_max_proceso_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'funciones': funciones,
+    }
+
+
+def comparar(resultados, base, tolerancia, margen_ms, margen_kb):
+    """Imprime la comparación con la línea base; retorna la cantidad de regresiones."""
+    regresiones = 0
+    print(f"\nComparación con la línea base ({base.get('fecha', '?')}), tolerancia {tolerancia:.0%}")
+    for tamano, medido in resultados['tamanos'].items():
+        anterior = base.get('tamanos', {}).get(tamano)
+        if anterior is None:
+            print(f'  {tamano}: sin datos en la línea base')
+            continue
+        for nombre, actual in medido['funciones'].items():
+            previo = anterior['funciones'].get(nombre)
+            if previo is None:
+                continue
+            peores = [
+                f"{metrica[:-3]} {previo[metrica]:.3f} -> {actual[metrica]:.3f} ms"
+                for metrica in ('p50_ms', 'p95_ms')
+                if actual[metrica] > previo[metrica] * (1 + tolerancia)
+                and actual[metrica] - previo[metrica] > margen_ms
+            ]
+            if (actual['memoria_kb'] > previo['memoria_kb'] * (1 + tolerancia)
+                    and actual['memoria_kb'] - previo['memoria_kb'] > margen_kb):
+                peores.append(f"memoria {previo['memoria_kb']:.1f} -> {actual['memoria_kb']:.1f} KB")
+            if peores:
+                regresiones += 1
+                print(f"  ✗ {tamano:>8} {nombre}: {', '.join(peores)}")
+    if not regresiones:
+        print('  ✓ sin regresiones')
+    return regresiones
+
+
+def imprimir(tamano, medido):
+    print(f"\n{int(tamano):,} reportes (poblar: {medido['poblar_s']:.1f} s, "
+          f"memoria máxima del proceso: {medido['memoria_max_proceso_kb'] / 1024:.0f} MB)")
+    print(f"  {'función':<40} {'llamadas':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9} {'memoria':>10}")
+    for nombre, r in medido['funciones'].items():
+        print(f"  {nombre:<40} {r['llamadas']:>8} {r['p50_ms']:>7.3f}ms {r['p95_ms']:>7.3f}ms "
+              f"{r['p99_ms']:>7.3f}ms {r['max_ms']:>7.2f}ms {r['memoria_kb']:>8.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', default=TAMANOS_POR_DEFECTO, help='cantidades de reportes, separadas por coma')
+    parser.add_argument('--repeticiones', type=int, default=200, help='llamadas por función')
+    parser.add_argument('--tiempo-max', type=float, default=5.0, help='segundos máximos por función')
+    parser.add_argument('--max-completo', type=int, default=100000,
+                        help='tamaño máximo para medir obtener_reportes sin límite')
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--base', default=BASE_POR_DEFECTO, help='línea base JSON a comparar')
+    parser.add_argument('--guardar-base', action='store_true', help='guardar esta corrida como línea base')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='empeoramiento admitido (0.25 = 25%%)')
+    parser.add_argument('--margen-ms', type=float, default=0.1,
+                        help='diferencia de latencia mínima para contar una regresión')
+    parser.add_argument('--margen-kb', type=float, default=16,
+                        help='diferencia de memoria mínima para contar una regresión')
+    parser.add_argument('--interno', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(medir_tamano(args.interno, args)))
+        return
+
+    resultados = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'parametros': {'repeticiones': args.repeticiones, 'tiempo_max': args.tiempo_max,
+                       'max_completo': args.max_completo},
+        'tamanos': {},
+    }
+    opciones = [f'--repeticiones={args.repeticiones}', f'--tiempo-max={args.tiempo_max}',
+                f'--max-completo={args.max_completo}']
+    for tamano in (int(t) for t in args.tamanos.split(',')):
+        salida = subprocess.run(
+            [sys.executable, __file__, f'--interno={tamano}', *opciones],
+            capture_output=True, text=True, check=True
+        )
+        medido = json.loads(salida.stdout.strip().splitlines()[-1])
+        resultados['tamanos'][str(tamano)] = medido
+        imprimir(tamano, medido)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f'\nResultados guardados en {args.salida}')
+
+    if args.guardar_base:
+        with open(args.base, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f'\nLínea base guardada en {args.base}')
+    elif os.path.exists(args.base):
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        if comparar(resultados, base, args.tolerancia, args.margen_ms, args.margen_kb):
+            sys.exit(1)
+    else:
+        print(f'\nSin línea base en {args.base} (crearla con --guardar-base)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Cada benchmark trabaja sobre una base SQLite temporal para no tocar
+db.sqlite3; por eso DB_PATH se fija antes de importar database/app.
+"""
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar_entorno(db_path=None, **variables):
+    """
+    Configura las variables de entorno y el sys.path para importar la app.
+    Retorna la ruta de la base de datos usada.
+    """
+    if db_path is None:
+        carpeta = tempfile.mkdtemp(prefix='crs_bench_')
+        db_path = os.path.join(carpeta, 'bench.sqlite3')
+
+    os.environ['DB_PATH'] = db_path
+    for nombre, valor in variables.items():
+        os.environ[nombre] = str(valor)
+
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    # app.py usa rutas relativas (static/uploads)
+    os.chdir(RAIZ)
+    return db_path
+
+
+def sembrar_reportes(cantidad):
+    """Inserta `cantidad` reportes de ejemplo usando database.crear_reporte."""
+    from database import crear_reporte
+
+    for i in range(cantidad):
+        crear_reporte(
+            ubicacion=f'Referencia {i}',
+            direccion=f'Calle {i}, Asunción',
+            comentario=f'Reporte de prueba número {i} para benchmark',
+            foto='sin_foto.jpg',
+            categoria='Otros',
+            lat=-25.2575 + (i % 100) * 0.001,
+            lng=-57.5864 + (i % 100) * 0.001,
+            usuario_correo='usuario@ejemplo.com'
+        )
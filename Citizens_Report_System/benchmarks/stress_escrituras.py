@@ -0,0 +1,130 @@
+"""
+Prueba de estrés de concurrencia entre procesos (como workers de gunicorn).
+
+Lanza procesos escritores que llaman a crear_reporte en bucle y procesos
+lectores que llaman a obtener_reportes, todos sobre la misma base temporal,
+y reporta operaciones por segundo y errores "database is locked".
+
+Con --comparar corre además la configuración anterior (journal DELETE,
+sin busy_timeout ni reintentos) para ver la diferencia.
+
+Uso:
+    python benchmarks/stress_escrituras.py --escritores 4 --lectores 4 --segundos 5 --comparar
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from comun import preparar_entorno, sembrar_reportes
+
+CONFIG_ANTERIOR = {
+    'DB_JOURNAL_MODE': 'DELETE',
+    'DB_SYNCHRONOUS': 'FULL',
+    'DB_BUSY_TIMEOUT': '0',
+    'DB_WRITE_RETRIES': '0',
+}
+
+
+def _trabajador(tipo, segundos, resultados):
+    from database import crear_reporte, obtener_reportes
+
+    ok = bloqueos = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        try:
+            if tipo == 'escritor':
+                crear_reporte(
+                    ubicacion='Estrés',
+                    comentario='Reporte generado por la prueba de estrés',
+                    foto='sin_foto.jpg',
+                    lat=-25.2575,
+                    lng=-57.5864
+                )
+            else:
+                obtener_reportes('Pendiente')
+            ok += 1
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            bloqueos += 1
+    resultados.put((tipo, ok, bloqueos))
+
+
+def correr(args):
+    """Ejecuta un escenario con la configuración del entorno actual."""
+    preparar_entorno()
+    import database
+
+    database.init_db()
+    sembrar_reportes(args.reportes)
+    # no heredar conexiones abiertas en los procesos hijos
+    database.cerrar_conexiones()
+
+    ctx = multiprocessing.get_context('fork')
+    resultados = ctx.Queue()
+    procesos = (
+        [ctx.Process(target=_trabajador, args=('escritor', args.segundos, resultados))
+         for _ in range(args.escritores)] +
+        [ctx.Process(target=_trabajador, args=('lector', args.segundos, resultados))
+         for _ in range(args.lectores)]
+    )
+    for p in procesos:
+        p.start()
+    totales = {'escritor': [0, 0], 'lector': [0, 0]}
+    for _ in procesos:
+        tipo, ok, bloqueos = resultados.get()
+        totales[tipo][0] += ok
+        totales[tipo][1] += bloqueos
+    for p in procesos:
+        p.join()
+
+    return {
+        'escrituras_por_seg': totales['escritor'][0] / args.segundos,
+        'lecturas_por_seg': totales['lector'][0] / args.segundos,
+        'errores_escritura': totales['escritor'][1],
+        'errores_lectura': totales['lector'][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--lectores', type=int, default=4)
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--reportes', type=int, default=500, help='filas iniciales')
+    parser.add_argument('--comparar', action='store_true', help='incluir la configuración anterior')
+    parser.add_argument('--interno', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(correr(args)))
+        return
+
+    escenarios = [('actual', {})]
+    if args.comparar:
+        escenarios.insert(0, ('anterior', CONFIG_ANTERIOR))
+
+    print(f"{args.escritores} escritores, {args.lectores} lectores, {args.segundos}s")
+    for etiqueta, variables in escenarios:
+        salida = subprocess.run(
+            [sys.executable, __file__, '--interno',
+             '--escritores', str(args.escritores),
+             '--lectores', str(args.lectores),
+             '--segundos', str(args.segundos),
+             '--reportes', str(args.reportes)],
+            env=dict(os.environ, **variables), capture_output=True, text=True, check=True
+        )
+        r = json.loads(salida.stdout.strip().splitlines()[-1])
+        print(f"  {etiqueta:<9} escrituras {r['escrituras_por_seg']:8.1f}/s "
+              f"(bloqueos {r['errores_escritura']})  "
+              f"lecturas {r['lecturas_por_seg']:8.1f}/s "
+              f"(bloqueos {r['errores_lectura']})")
+
+
+if __name__ == '__main__':
+    main()
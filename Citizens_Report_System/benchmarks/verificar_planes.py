@@ -0,0 +1,105 @@
+"""
+Verifica los planes de consulta de database.py.
+
+Ejecuta cada función de la capa de datos sobre una base temporal, captura
+el SQL que realmente envía a SQLite (set_trace_callback) y corre
+EXPLAIN QUERY PLAN sobre cada SELECT/UPDATE/DELETE. Falla (código 1) si
+alguna consulta recorre la tabla completa sin índice ("SCAN reportes") u
+ordena en un B-tree temporal.
+
+Pensado para correr antes de cada merge que toque database.py:
+    python benchmarks/verificar_planes.py
+"""
+import re
+import sys
+import time
+
+from comun import preparar_entorno, sembrar_reportes
+
+# SCAN de tabla sin índice o un ordenamiento extra
+PLAN_PROHIBIDO = re.compile(r'^SCAN \w+$|TEMP B-TREE')
+
+
+def ejercitar_funciones(database):
+    """Llama a cada función pública de database.py al menos una vez."""
+    database.crear_usuario('planes@ejemplo.com', 'clave123')
+    database.buscar_usuario_por_correo('planes@ejemplo.com')
+
+    reporte_id = database.crear_reporte(
+        ubicacion='Plan', comentario='Reporte para revisar planes',
+        foto='sin_foto.jpg', lat=-25.2575, lng=-57.5864
+    )
+    database.obtener_reportes()
+    database.obtener_reportes('Pendiente')
+    pagina = database.obtener_reportes(limite=5)
+    despues_de = (pagina[-1]['fecha_creacion'], pagina[-1]['id'])
+    database.obtener_reportes(limite=5, despues_de=despues_de)
+    database.obtener_reportes('Pendiente', limite=5, despues_de=despues_de)
+    database.obtener_reportes('Pendiente', limite=5, campos=['id', 'estado', 'fecha_creacion'])
+    list(database.exportar_reportes())
+    list(database.exportar_reportes('Pendiente', desde='2024-01-01', hasta='2024-12-31'))
+    list(database.exportar_reportes(categoria='Baches'))
+    database.obtener_reporte_por_id(reporte_id)
+    database.obtener_version_datos()
+    database.obtener_eventos(0)
+    database.obtener_cambios(0, limite=10)
+    database.buscar_reportes('bache')
+    database.buscar_reportes('bache calle', 'Pendiente', limite=5, desplazamiento=5)
+    database.obtener_reportes_en_bbox(-57.6, -25.3, -57.5, -25.2, limite=100)
+    database.obtener_clusters(12, -57.6, -25.3, -57.5, -25.2)
+    database.actualizar_estado_reporte(reporte_id, 'Verificando')
+    database.actualizar_estado_reporte(reporte_id, 'Rechazado', 'Motivo de prueba')
+    database.actualizar_categoria_reporte(reporte_id, 'Otros')
+    database.obtener_estadisticas()
+    database.obtener_estadisticas(dias=7)
+    database.eliminar_reporte(reporte_id)
+
+    tarea_id = database.encolar_tarea('prueba', {'x': 1}, reporte_id=reporte_id)
+    tarea = database.tomar_tarea()
+    database.fallar_tarea(tarea['id'], 'error de prueba')
+    database.completar_tarea(tarea_id)
+    database.obtener_tareas_reporte(reporte_id)
+
+    for foto in database.obtener_fotos_liberadas(time.time() + 1):
+        database.eliminar_foto_si_liberada(foto, lambda ruta: None)
+
+
+def main():
+    preparar_entorno()
+    import database
+
+    database.init_db()
+    sembrar_reportes(50)
+
+    consultas = []
+    conn = database.get_db()
+    conn.set_trace_callback(consultas.append)
+    ejercitar_funciones(database)
+    conn.set_trace_callback(None)
+
+    fallas = 0
+    vistas = set()
+    for sql in consultas:
+        sql = ' '.join(sql.split())
+        # misma consulta con otros valores -> se revisa una sola vez
+        forma = re.sub(r"'[^']*'|-?\b\d+(\.\d+)?\b", '?', sql)
+        if not re.match(r'(SELECT|UPDATE|DELETE)\b', sql, re.IGNORECASE) or forma in vistas:
+            continue
+        vistas.add(forma)
+
+        plan = [fila[3] for fila in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        malos = [paso for paso in plan if PLAN_PROHIBIDO.search(paso)]
+        fallas += bool(malos)
+
+        print(('✗ ' if malos else '✓ ') + sql)
+        for paso in plan:
+            print('      ' + paso)
+
+    if fallas:
+        print(f'\n{fallas} consulta(s) sin índice adecuado')
+        sys.exit(1)
+    print(f'\n{len(vistas)} consultas revisadas, todas usan índices')
+
+
+if __name__ == '__main__':
+    main()
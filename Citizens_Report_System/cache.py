@@ -0,0 +1,517 @@
+"""
+Caché de respuestas JSON ya serializadas.
+
+Cada entrada guarda los bytes de una respuesta y una lista de etiquetas
+(p. ej. 'listado:Pendiente', 'reporte:15', 'estadisticas'). Las funciones
+de escritura de database.py llaman a invalidar() con las etiquetas que
+afectan, así solo se descartan las respuestas que realmente cambiaron.
+Cuando se supera la cantidad de entradas o de bytes se descartan las
+menos usadas (LRU).
+
+Backends (variable CACHE_BACKEND):
+- local:  en memoria del proceso. Con varios workers de gunicorn cada uno
+          tiene la suya y no ve las escrituras de los demás.
+- sqlite: un archivo SQLite (CACHE_PATH) compartido por todos los workers
+          de la máquina; no necesita ningún servicio externo.
+- redis:  cualquier servidor que hable el protocolo de Redis (CACHE_URL).
+          Requiere el paquete `redis`.
+Con sqlite y redis la caché es una sola, así que invalidar desde un worker
+vale para todos: la invalidación por etiquetas es el único mecanismo y las
+claves no llevan la versión de los datos (una escritura no descarta las
+respuestas que no afecta). Solo la caché local con varios workers la
+agrega (ver CacheLocal.versionada).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# redis es opcional: solo hace falta con CACHE_BACKEND=redis
+try:
+    import redis
+except ImportError:
+    redis = None
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local').lower()
+CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', 512))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+# Junto al código, como DB_PATH: todos los workers usan el mismo archivo
+# aunque arranquen desde otra carpeta
+CACHE_PATH = os.environ.get(
+    'CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache.sqlite3')
+)
+CACHE_URL = os.environ.get('CACHE_URL', 'redis://localhost:6379/0')
+# Los backends compartidos descartan además las entradas con más de
+# CACHE_TTL segundos, por si alguna invalidación no llegó (servidor caído)
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+# Procesos que atienden peticiones (gunicorn también lo usa como -w). Con
+# más de uno, la caché local agrega la versión de los datos a la clave: ver
+# CacheLocal.versionada
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+
+class CacheBase:
+    """
+    Lógica común: obtener_o_calcular y la tasa de aciertos (del proceso).
+    Cada backend implementa _obtener, _guardar, generacion, invalidar,
+    limpiar y _tamano.
+    """
+
+    nombre = None
+    # True si las claves deben incluir la versión de los datos porque las
+    # invalidaciones por etiqueta no llegan a todos los procesos
+    versionada = False
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, max_bytes=CACHE_MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._aciertos = 0
+        self._fallos = 0
+        self._lock_contadores = threading.Lock()
+
+    def obtener(self, clave):
+        """Valor guardado (bytes) o None."""
+        try:
+            valor = self._obtener(clave)
+        except Exception as e:
+            # una caché caída no debe tumbar la API: se calcula sin ella
+            print(f"✗ Error leyendo la caché ({self.nombre}): {e}")
+            valor = None
+        with self._lock_contadores:
+            if valor is None:
+                self._fallos += 1
+            else:
+                self._aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor, etiquetas, generacion=None):
+        """
+        Guarda `valor` bajo `clave`. Si se indica la `generacion` leída antes
+        de calcular el valor y hubo invalidaciones desde entonces, no se
+        guarda: el valor pudo calcularse con datos ya modificados.
+        """
+        if len(valor) > self.max_bytes:
+            return
+        try:
+            self._guardar(clave, valor, etiquetas, generacion)
+        except Exception as e:
+            print(f"✗ Error guardando en la caché ({self.nombre}): {e}")
+
+    def obtener_o_calcular(self, clave, etiquetas, calcular):
+        """
+        Valor en caché o, si no está, el resultado de calcular() (bytes o
+        None para no guardar). Retorna la tupla (valor, acierto).
+        """
+        valor = self.obtener(clave)
+        if valor is not None:
+            return valor, True
+        try:
+            generacion = self.generacion()
+        except Exception:
+            generacion = None
+        valor = calcular()
+        if valor is not None and generacion is not None:
+            self.guardar(clave, valor, etiquetas, generacion)
+        return valor, False
+
+    def estadisticas(self):
+        """Tamaño y tasa de aciertos, para dimensionar la caché."""
+        entradas, tamano = self._tamano()
+        with self._lock_contadores:
+            aciertos, fallos = self._aciertos, self._fallos
+        consultas = aciertos + fallos
+        return {
+            'backend': self.nombre,
+            'entradas': entradas,
+            'max_entradas': self.max_entradas,
+            'bytes': tamano,
+            'max_bytes': self.max_bytes,
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / consultas, 4) if consultas else None,
+        }
+
+
+# ─── BACKEND LOCAL (memoria del proceso) ──────────────────────────────────
+
+class CacheLocal(CacheBase):
+    """
+    LRU acotado por entradas y bytes, con invalidación por etiquetas.
+    Con varios procesos (WEB_CONCURRENCY > 1) las invalidaciones de un
+    worker no llegan a los demás: entonces la clave lleva además la versión
+    de los datos y cualquier escritura deja viejas todas las entradas.
+    """
+
+    nombre = 'local'
+    versionada = WEB_CONCURRENCY > 1
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, max_bytes=CACHE_MAX_BYTES):
+        super().__init__(max_entradas, max_bytes)
+        self._entradas = OrderedDict()   # clave -> (valor, etiquetas)
+        self._por_etiqueta = {}          # etiqueta -> set(claves)
+        self._bytes = 0
+        # cambia con cada invalidación: ver obtener_o_calcular
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def generacion(self):
+        return self._generacion
+
+    def _obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[0]
+
+    def _guardar(self, clave, valor, etiquetas, generacion):
+        with self._lock:
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._quitar(clave)
+            self._entradas[clave] = (valor, etiquetas)
+            self._bytes += len(valor)
+            for etiqueta in etiquetas:
+                self._por_etiqueta.setdefault(etiqueta, set()).add(clave)
+            while (len(self._entradas) > self.max_entradas
+                   or self._bytes > self.max_bytes):
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar(self, *etiquetas):
+        """Descarta las entradas con alguna de las etiquetas."""
+        with self._lock:
+            self._generacion += 1
+            for etiqueta in etiquetas:
+                for clave in self._por_etiqueta.pop(etiqueta, ()):
+                    self._quitar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._por_etiqueta.clear()
+            self._bytes = 0
+
+    def _tamano(self):
+        with self._lock:
+            return len(self._entradas), self._bytes
+
+    def _quitar(self, clave):
+        # llamar con el lock tomado
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        valor, etiquetas = entrada
+        self._bytes -= len(valor)
+        for etiqueta in etiquetas:
+            claves = self._por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_etiqueta[etiqueta]
+
+
+# ─── BACKEND SQLITE (archivo compartido entre workers) ────────────────────
+
+class CacheSQLite(CacheBase):
+    """
+    La misma caché en un archivo SQLite aparte de la base principal: todos
+    los procesos de la máquina leen y escriben las mismas entradas. Es
+    descartable, por eso usa synchronous=OFF. Para no escribir en cada
+    acierto, la hora de uso (LRU) se actualiza como mucho una vez por
+    segundo por entrada.
+    """
+
+    nombre = 'sqlite'
+
+    def __init__(self, ruta=CACHE_PATH, max_entradas=CACHE_MAX_ENTRADAS,
+                 max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        super().__init__(max_entradas, max_bytes)
+        self.ruta = ruta
+        self.ttl = ttl
+        self._local = threading.local()
+        self._conexion().executescript('''
+            CREATE TABLE IF NOT EXISTS cache_entradas (
+                clave     TEXT  PRIMARY KEY,
+                valor     BLOB  NOT NULL,
+                creada_en REAL  NOT NULL,
+                usada_en  REAL  NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_usada ON cache_entradas (usada_en);
+
+            CREATE TABLE IF NOT EXISTS cache_etiquetas (
+                etiqueta TEXT NOT NULL,
+                clave    TEXT NOT NULL,
+                PRIMARY KEY (etiqueta, clave)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_cache_etiquetas_clave ON cache_etiquetas (clave);
+
+            CREATE TABLE IF NOT EXISTS cache_estado (
+                id          INTEGER PRIMARY KEY CHECK (id = 1),
+                generacion  INTEGER NOT NULL,
+                entradas    INTEGER NOT NULL,
+                bytes       INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO cache_estado VALUES (1, 0, 0, 0);
+        ''')
+
+    def _conexion(self):
+        # una conexión por hilo (y por proceso: no sirve la heredada en un
+        # fork de gunicorn); autocommit salvo en las transacciones explícitas
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaccion(self):
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def generacion(self):
+        return self._conexion().execute(
+            'SELECT generacion FROM cache_estado WHERE id = 1'
+        ).fetchone()[0]
+
+    def _obtener(self, clave):
+        conn = self._conexion()
+        fila = conn.execute(
+            'SELECT valor, creada_en, usada_en FROM cache_entradas WHERE clave = ?', (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        valor, creada_en, usada_en = fila
+        ahora = time.time()
+        if ahora - creada_en > self.ttl:
+            return None
+        if ahora - usada_en > 1:
+            try:
+                conn.execute(
+                    'UPDATE cache_entradas SET usada_en = ? WHERE clave = ?', (ahora, clave)
+                )
+            except sqlite3.OperationalError:
+                pass   # otro proceso está escribiendo: el LRU puede esperar
+        return valor
+
+    def _guardar(self, clave, valor, etiquetas, generacion):
+        ahora = time.time()
+        with self._transaccion() as conn:
+            if generacion is not None and generacion != self.generacion():
+                return
+            self._quitar(conn, clave)
+            conn.execute(
+                'INSERT INTO cache_entradas (clave, valor, creada_en, usada_en) VALUES (?, ?, ?, ?)',
+                (clave, valor, ahora, ahora)
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO cache_etiquetas (etiqueta, clave) VALUES (?, ?)',
+                [(etiqueta, clave) for etiqueta in etiquetas]
+            )
+            entradas, tamano = conn.execute(
+                '''UPDATE cache_estado SET entradas = entradas + 1, bytes = bytes + ?
+                   WHERE id = 1 RETURNING entradas, bytes''',
+                (len(valor),)
+            ).fetchone()
+            while entradas > self.max_entradas or tamano > self.max_bytes:
+                menos_usada = conn.execute(
+                    'SELECT clave FROM cache_entradas ORDER BY usada_en LIMIT 1'
+                ).fetchone()
+                entradas, tamano = self._quitar(conn, menos_usada[0])
+
+    def invalidar(self, *etiquetas):
+        """Descarta las entradas con alguna de las etiquetas."""
+        with self._transaccion() as conn:
+            conn.execute('UPDATE cache_estado SET generacion = generacion + 1 WHERE id = 1')
+            for etiqueta in etiquetas:
+                claves = conn.execute(
+                    'SELECT clave FROM cache_etiquetas WHERE etiqueta = ?', (etiqueta,)
+                ).fetchall()
+                for (clave,) in claves:
+                    self._quitar(conn, clave)
+
+    def limpiar(self):
+        with self._transaccion() as conn:
+            conn.execute('DELETE FROM cache_entradas')
+            conn.execute('DELETE FROM cache_etiquetas')
+            conn.execute(
+                '''UPDATE cache_estado SET generacion = generacion + 1, entradas = 0, bytes = 0
+                   WHERE id = 1'''
+            )
+
+    def _tamano(self):
+        return self._conexion().execute(
+            'SELECT entradas, bytes FROM cache_estado WHERE id = 1'
+        ).fetchone()
+
+    def _quitar(self, conn, clave):
+        # dentro de una transacción; retorna (entradas, bytes) actualizados
+        borrada = conn.execute(
+            'DELETE FROM cache_entradas WHERE clave = ? RETURNING length(valor)', (clave,)
+        ).fetchone()
+        if borrada is None:
+            return None
+        conn.execute('DELETE FROM cache_etiquetas WHERE clave = ?', (clave,))
+        return conn.execute(
+            '''UPDATE cache_estado SET entradas = entradas - 1, bytes = bytes - ?
+               WHERE id = 1 RETURNING entradas, bytes''',
+            (borrada[0],)
+        ).fetchone()
+
+
+# ─── BACKEND REDIS (protocolo de Redis) ───────────────────────────────────
+
+class CacheRedis(CacheBase):
+    """
+    Caché en un servidor con protocolo de Redis, compartida por todos los
+    workers (y máquinas). Claves usadas, con el prefijo `cache:`:
+      v:<clave>      valor, con TTL
+      t:<clave>      set con las etiquetas de la entrada
+      e:<etiqueta>   set con las claves que llevan esa etiqueta
+      lru            sorted set clave -> hora de uso, para el límite de entradas
+    Al descartar una entrada (por LRU o invalidación) también se la saca de
+    los sets de todas sus etiquetas, para que no crezcan sin límite.
+      generacion     contador de invalidaciones
+    El límite de bytes lo aplica el propio servidor (maxmemory).
+    """
+
+    nombre = 'redis'
+    PREFIJO = 'cache:'
+
+    def __init__(self, url=CACHE_URL, max_entradas=CACHE_MAX_ENTRADAS,
+                 max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, cliente=None):
+        super().__init__(max_entradas, max_bytes)
+        if cliente is None:
+            if redis is None:
+                raise RuntimeError('CACHE_BACKEND=redis requiere el paquete redis (pip install redis)')
+            cliente = redis.Redis.from_url(url)
+        self._redis = cliente
+        self.ttl = ttl
+
+    def _k(self, *partes):
+        return self.PREFIJO + ':'.join(partes)
+
+    def generacion(self):
+        return int(self._redis.get(self._k('generacion')) or 0)
+
+    def _obtener(self, clave):
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.get(self._k('v', clave))
+        pipe.zadd(self._k('lru'), {clave: time.time()}, xx=True)
+        valor, _ = pipe.execute()
+        return valor
+
+    def _guardar(self, clave, valor, etiquetas, generacion):
+        with self._redis.pipeline() as pipe:
+            try:
+                # si otro worker invalida entre WATCH y EXEC, no se guarda
+                pipe.watch(self._k('generacion'))
+                if generacion is not None and int(pipe.get(self._k('generacion')) or 0) != generacion:
+                    return
+                pipe.multi()
+                pipe.set(self._k('v', clave), valor, ex=self.ttl)
+                if etiquetas:
+                    pipe.sadd(self._k('t', clave), *etiquetas)
+                for etiqueta in etiquetas:
+                    pipe.sadd(self._k('e', etiqueta), clave)
+                pipe.zadd(self._k('lru'), {clave: time.time()})
+                pipe.execute()
+            except redis.WatchError:
+                return
+
+        sobrantes = self._redis.zcard(self._k('lru')) - self.max_entradas
+        if sobrantes > 0:
+            viejas = [c.decode() for c, _ in self._redis.zpopmin(self._k('lru'), sobrantes)]
+            self._quitar(viejas)
+
+    def _quitar(self, claves):
+        """Borra las entradas y las saca de los sets de sus etiquetas."""
+        pipe = self._redis.pipeline(transaction=False)
+        for clave in claves:
+            pipe.smembers(self._k('t', clave))
+        etiquetas_por_clave = pipe.execute()
+
+        pipe = self._redis.pipeline()
+        for clave, etiquetas in zip(claves, etiquetas_por_clave):
+            for etiqueta in etiquetas:
+                pipe.srem(self._k('e', etiqueta.decode()), clave)
+            pipe.delete(self._k('v', clave), self._k('t', clave))
+        pipe.zrem(self._k('lru'), *claves)
+        pipe.execute()
+
+    def invalidar(self, *etiquetas):
+        """Descarta las entradas con alguna de las etiquetas."""
+        pipe = self._redis.pipeline()
+        pipe.incr(self._k('generacion'))
+        for etiqueta in etiquetas:
+            pipe.smembers(self._k('e', etiqueta))
+            pipe.delete(self._k('e', etiqueta))
+        resultados = pipe.execute()
+
+        claves = set()
+        for miembros in resultados[1::2]:
+            claves.update(c.decode() for c in miembros)
+        if claves:
+            # también de los sets de sus otras etiquetas
+            self._quitar(list(claves))
+
+    def limpiar(self):
+        claves = list(self._redis.scan_iter(match=self.PREFIJO + '*'))
+        if claves:
+            self._redis.delete(*claves)
+        self._redis.incr(self._k('generacion'))
+
+    def _tamano(self):
+        # los bytes los administra el servidor
+        return self._redis.zcard(self._k('lru')), None
+
+
+def crear_cache(backend=CACHE_BACKEND):
+    """Crea la caché del backend indicado ('local', 'sqlite' o 'redis')."""
+    if backend == 'local':
+        return CacheLocal()
+    if backend == 'sqlite':
+        return CacheSQLite()
+    if backend == 'redis':
+        return CacheRedis()
+    raise ValueError(f'CACHE_BACKEND no válido: {backend!r} (local, sqlite o redis)')
+
+
+# Caché del proceso: la usan app.py (lectura) y database.py (invalidación)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache():
+    """Caché del proceso; se crea al primer uso (importar no abre nada)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = crear_cache()
+        return _cache
+
+
+def invalidar(*etiquetas):
+    """
+    Invalida en la caché configurada. Si el backend compartido no responde
+    se registra el error: la escritura en la base ya se hizo y las entradas
+    viejas vencen igual tras CACHE_TTL segundos.
+    """
+    cache = obtener_cache()
+    try:
+        cache.invalidar(*etiquetas)
+    except Exception as e:
+        print(f"✗ Error invalidando la caché ({cache.nombre}): {e}")
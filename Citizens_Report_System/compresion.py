@@ -0,0 +1,163 @@
+"""
+Compresión de respuestas (gzip y Brotli).
+
+- Respuestas dinámicas (JSON de la API, HTML): se comprimen en un
+  after_request si el cliente lo acepta (Accept-Encoding), el tipo es de
+  texto y el cuerpo tiene al menos COMPRESION_MIN_BYTES.
+- Archivos estáticos (styles.css, script.js, ...): se comprimen una sola
+  vez al desplegar (`flask precomprimir`) y se guardan junto al original
+  como archivo.css.gz y archivo.css.br; la ruta static sirve directamente
+  esas versiones, sin gastar CPU por petición.
+
+Las fotos subidas (static/uploads) ya están comprimidas (JPEG, PNG, WebP)
+y no se tocan. Brotli requiere el paquete `brotli`; sin él solo se usa gzip.
+"""
+import gzip
+import mimetypes
+import os
+import tempfile
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+# brotli es opcional: sin él se responde solo con gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESION_MIN_BYTES = int(os.environ.get('COMPRESION_MIN_BYTES', 500))
+COMPRESION_NIVEL_GZIP = int(os.environ.get('COMPRESION_NIVEL_GZIP', 6))
+COMPRESION_NIVEL_BROTLI = int(os.environ.get('COMPRESION_NIVEL_BROTLI', 5))
+
+# Tipos que vale la pena comprimir; el resto (imágenes, etc.) ya lo está
+TIPOS_COMPRIMIBLES = {
+    'application/json', 'application/javascript', 'application/x-ndjson',
+    'application/xml', 'image/svg+xml', 'text/css', 'text/csv',
+    'text/html', 'text/javascript', 'text/plain',
+}
+EXTENSIONES_ESTATICAS = ('.css', '.js', '.svg', '.html', '.json', '.txt')
+
+# Extensión del archivo precomprimido por codificación
+SUFIJOS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _comprimir(datos, codificacion, nivel_gzip=None, nivel_brotli=None):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=nivel_brotli or COMPRESION_NIVEL_BROTLI)
+    # mtime=0: el mismo contenido da siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=nivel_gzip or COMPRESION_NIVEL_GZIP, mtime=0)
+
+
+def codificaciones_aceptadas():
+    """Codificaciones que acepta el cliente, en orden de preferencia (br, gzip)."""
+    aceptadas = request.accept_encodings
+    codificaciones = []
+    if brotli is not None and aceptadas['br']:
+        codificaciones.append('br')
+    if aceptadas['gzip']:
+        codificaciones.append('gzip')
+    return codificaciones
+
+
+def _agregar_vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+def comprimir_respuesta(response):
+    """after_request: comprime el cuerpo si corresponde."""
+    _agregar_vary(response)
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in TIPOS_COMPRIMIBLES
+            or request.path.startswith('/static/uploads/')):
+        return response
+
+    datos = response.get_data()
+    if len(datos) < COMPRESION_MIN_BYTES:
+        return response
+
+    for codificacion in codificaciones_aceptadas():
+        response.set_data(_comprimir(datos, codificacion))
+        response.headers['Content-Encoding'] = codificacion
+        break
+    return response
+
+
+def _precomprimido_al_dia(ruta, ruta_comprimida):
+    return (os.path.exists(ruta_comprimida)
+            and os.path.getmtime(ruta_comprimida) >= os.path.getmtime(ruta))
+
+
+def precomprimir_estaticos(carpeta, forzar=False):
+    """
+    Genera archivo.gz (y archivo.br si está brotli) para cada estático de
+    texto de `carpeta`, con el nivel máximo: se hace una sola vez. Salta
+    los que ya están al día y la carpeta de fotos subidas. Cada archivo se
+    escribe en un temporal propio y se renombra: si dos procesos lo hacen
+    a la vez, gana el último y ninguno falla.
+    Retorna la cantidad de archivos escritos.
+    """
+    escritos = 0
+    for raiz, carpetas, archivos in os.walk(carpeta):
+        if 'uploads' in carpetas:
+            carpetas.remove('uploads')
+        for nombre in archivos:
+            if not nombre.endswith(EXTENSIONES_ESTATICAS):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            datos = None
+            for codificacion, sufijo in SUFIJOS.items():
+                if codificacion == 'br' and brotli is None:
+                    continue
+                destino = ruta + sufijo
+                if not forzar and _precomprimido_al_dia(ruta, destino):
+                    continue
+                if datos is None:
+                    with open(ruta, 'rb') as f:
+                        datos = f.read()
+                descriptor, temporal = tempfile.mkstemp(dir=raiz, prefix=nombre, suffix='.tmp')
+                try:
+                    with os.fdopen(descriptor, 'wb') as f:
+                        f.write(_comprimir(datos, codificacion, nivel_gzip=9, nivel_brotli=11))
+                    # mkstemp lo crea solo legible por el dueño; un proxy también lo sirve
+                    os.chmod(temporal, 0o644)
+                    os.replace(temporal, destino)
+                except BaseException:
+                    os.unlink(temporal)
+                    raise
+                escritos += 1
+    return escritos
+
+
+def servir_estatico(app, vista_original):
+    """
+    Envuelve la vista `static` de Flask: si el cliente acepta br o gzip y
+    existe la versión precomprimida al día, responde con ella.
+    """
+    def estatico(filename):
+        ruta = safe_join(app.static_folder, filename)
+        if ruta and filename.endswith(EXTENSIONES_ESTATICAS):
+            for codificacion in codificaciones_aceptadas():
+                sufijo = SUFIJOS[codificacion]
+                if not _precomprimido_al_dia(ruta, ruta + sufijo):
+                    continue
+                tipo = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                response = send_from_directory(
+                    app.static_folder, filename + sufijo,
+                    mimetype=tipo, max_age=app.get_send_file_max_age(filename),
+                )
+                response.headers['Content-Encoding'] = codificacion
+                _agregar_vary(response)
+                return response
+        return vista_original(filename=filename)
+    return estatico
+
+
+def instalar_compresion(app):
+    """Activa la compresión de respuestas y de estáticos en la app."""
+    app.after_request(comprimir_respuesta)
+    if app.static_folder:
+        app.view_functions['static'] = servir_estatico(app, app.view_functions['static'])
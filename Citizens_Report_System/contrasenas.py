@@ -0,0 +1,86 @@
+"""
+Hash y verificación de contraseñas con costo configurable y concurrencia
+acotada.
+
+Calcular un hash (scrypt o pbkdf2) es lo más caro de POST /login y de
+POST /register. Acá se hace en un pool de CONTRASENA_HILOS hilos: hashlib
+suelta el GIL mientras calcula, así el resto de las peticiones del worker
+sigue atendiéndose. Como mucho CONTRASENA_HILOS + CONTRASENA_COLA
+operaciones esperan o corren a la vez; si no hay lugar en
+CONTRASENA_ESPERA_MAX segundos se lanza SistemaOcupado y la ruta responde
+503 en vez de acumular logins que tardarían cada vez más.
+
+El método se configura con CONTRASENA_HASH en el formato de werkzeug
+(p. ej. 'scrypt:32768:8:1' o 'pbkdf2:sha256:600000'). Los hashes guardados
+con otros parámetros se recalculan en el siguiente login exitoso
+(necesita_rehash).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+CONTRASENA_HASH = os.environ.get('CONTRASENA_HASH', 'scrypt:32768:8:1')
+CONTRASENA_HILOS = int(os.environ.get('CONTRASENA_HILOS', min(os.cpu_count() or 1, 4)))
+CONTRASENA_COLA = int(os.environ.get('CONTRASENA_COLA', 16))
+CONTRASENA_ESPERA_MAX = float(os.environ.get('CONTRASENA_ESPERA_MAX', 2.0))
+
+
+class SistemaOcupado(Exception):
+    """No hay lugar para calcular otro hash; reintentar en unos segundos."""
+
+    def __init__(self, reintentar_en=1):
+        super().__init__('Demasiados inicios de sesión simultáneos')
+        self.reintentar_en = reintentar_en
+
+
+_ejecutor = None
+_ejecutor_pid = None
+_ejecutor_lock = threading.Lock()
+_lugares = threading.BoundedSemaphore(CONTRASENA_HILOS + CONTRASENA_COLA)
+
+
+def _obtener_ejecutor():
+    # se crea al primer uso (y de nuevo en cada proceso tras un fork)
+    global _ejecutor, _ejecutor_pid
+    with _ejecutor_lock:
+        if _ejecutor is None or _ejecutor_pid != os.getpid():
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=CONTRASENA_HILOS, thread_name_prefix='contrasenas'
+            )
+            _ejecutor_pid = os.getpid()
+        return _ejecutor
+
+
+def _ejecutar(funcion, *args):
+    """Corre `funcion` en el pool respetando el tope de operaciones."""
+    if not _lugares.acquire(timeout=CONTRASENA_ESPERA_MAX):
+        raise SistemaOcupado(reintentar_en=max(1, round(CONTRASENA_ESPERA_MAX)))
+    try:
+        return _obtener_ejecutor().submit(funcion, *args).result()
+    finally:
+        _lugares.release()
+
+
+def hashear(contrasena):
+    """Hash de la contraseña con el método configurado."""
+    return _ejecutar(generate_password_hash, contrasena, CONTRASENA_HASH)
+
+
+def verificar(contrasena, hash_almacenado):
+    """True si la contraseña corresponde al hash (con sus propios parámetros)."""
+    return _ejecutar(check_password_hash, hash_almacenado, contrasena)
+
+
+@lru_cache(maxsize=None)
+def _metodo_actual():
+    # werkzeug completa los parámetros que falten ('scrypt' -> 'scrypt:32768:8:1');
+    # el prefijo de un hash cualquiera es el método efectivo
+    return generate_password_hash('', CONTRASENA_HASH).split('$', 1)[0]
+
+
+def necesita_rehash(hash_almacenado):
+    """True si el hash se calculó con otro método o parámetros que los actuales."""
+    return hash_almacenado.split('$', 1)[0] != _metodo_actual()
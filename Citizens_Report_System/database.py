@@ -1,295 +1,1681 @@
-import sqlite3
-import os
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-
-# Ruta absoluta al archivo de base de datos
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db.sqlite3')
-
-
-def get_db():
-    """Conecta a la base de datos SQLite."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # permite acceder por nombre de columna
-    return conn
-
-
-def migrar_columna_categoria():
-    """Agrega la columna categoria si no existe (migración automática)."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Verificar si la columna ya existe
-        cursor.execute("PRAGMA table_info(reportes)")
-        columnas = [col[1] for col in cursor.fetchall()]
-        
-        if 'categoria' not in columnas:
-            print("→ Migrando base de datos: agregando columna 'categoria'...")
-            cursor.execute('''
-                ALTER TABLE reportes 
-                ADD COLUMN categoria TEXT NOT NULL DEFAULT 'Otros'
-            ''')
-            conn.commit()
-            print("✓ Columna 'categoria' agregada exitosamente")
-        
-        conn.close()
-    except Exception as e:
-        print(f"✗ Error en migración: {e}")
-
-
-def migrar_columna_direccion():
-    """Agrega la columna direccion si no existe (migración automática)."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(reportes)")
-        columnas = [col[1] for col in cursor.fetchall()]
-        if 'direccion' not in columnas:
-            print("→ Migrando base de datos: agregando columna 'direccion'...")
-            cursor.execute("ALTER TABLE reportes ADD COLUMN direccion TEXT DEFAULT ''")
-            conn.commit()
-            print("✓ Columna 'direccion' agregada exitosamente")
-        conn.close()
-    except Exception as e:
-        print(f"✗ Error en migración: {e}")
-
-
-def init_db():
-    """Inicializa las tablas de la base de datos."""
-    db_existe = os.path.exists(DB_PATH)
-    
-    if db_existe:
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            conn.execute('SELECT name FROM sqlite_master WHERE type="table" AND name="usuarios"')
-            tables = conn.execute('SELECT name FROM sqlite_master WHERE type="table"').fetchall()
-            conn.close()
-            if not tables:
-                # archivo existe pero estÃ¡ vacÃ­o â†’ eliminarlo
-                os.remove(DB_PATH)
-                db_existe = False
-        except Exception:
-            # cualquier error al leer → eliminarlo
-            try:
-                os.remove(DB_PATH)
-                db_existe = False
-            except Exception:
-                pass
-
-    conn = get_db()
-    
-    # Tabla de usuarios
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id        INTEGER PRIMARY KEY AUTOINCREMENT,
-            correo    TEXT    UNIQUE NOT NULL,
-            contrasena TEXT   NOT NULL,
-            rol       TEXT    NOT NULL DEFAULT 'usuario'
-        )
-    ''')
-    
-    # Tabla de reportes
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS reportes (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            ubicacion       TEXT    NOT NULL,
-            direccion       TEXT    DEFAULT '',
-            comentario      TEXT    NOT NULL,
-            foto            TEXT    NOT NULL,
-            email           TEXT,
-            categoria       TEXT    NOT NULL DEFAULT 'Otros',
-            estado          TEXT    NOT NULL DEFAULT 'Pendiente',
-            razon_rechazo   TEXT,
-            lat             REAL    NOT NULL,
-            lng             REAL    NOT NULL,
-            fecha_creacion  TEXT    NOT NULL,
-            usuario_correo  TEXT,
-            FOREIGN KEY (usuario_correo) REFERENCES usuarios(correo)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-    
-    # Si la base de datos ya existi­a, ejecutar migraciones automÃ¡ticas
-    if db_existe:
-        migrar_columna_categoria()
-        migrar_columna_direccion()
-
-# -------------FUNCIONES DE USUARIOS---------------------------------------------------------------------------------------------------------------
-
-def crear_usuario(correo, contrasena, rol='usuario'):
-    """
-    Inserta un nuevo usuario.
-    La contraseña se hashea automÃ¡ticamente.
-    Retorna True si se crea, False si el correo ya existe.
-    """
-    conn = get_db()
-    try:
-        conn.execute(
-            'INSERT INTO usuarios (correo, contrasena, rol) VALUES (?, ?, ?)',
-            (correo, generate_password_hash(contrasena), rol)
-        )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        # correo duplicado
-        return False
-    finally:
-        conn.close()
-
-
-def buscar_usuario_por_correo(correo):
-    """Retorna la fila del usuario o None."""
-    conn = get_db()
-    usuario = conn.execute(
-        'SELECT * FROM usuarios WHERE correo = ?', (correo,)
-    ).fetchone()
-    conn.close()
-    return usuario
-
-
-def verificar_contrasena(contrasena, hash_almacenado):
-    """Compara la contraseÃ±a plana contra el hash."""
-    return check_password_hash(hash_almacenado, contrasena)
-
-
-#---------------FUNCIONES DE REPORTES---------------------------------------------------------------------------------------------------------
-
-def crear_reporte(ubicacion, comentario, foto, lat=None, lng=None, categoria='Otros', direccion='', email=None, usuario_correo=None):
-    """
-    Crea un nuevo reporte.
-    Retorna el ID del reporte creado.
-    """
-    conn = get_db()
-    fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    cursor = conn.execute(
-        '''INSERT INTO reportes 
-           (ubicacion, direccion, comentario, foto, categoria, email, lat, lng, estado, fecha_creacion, usuario_correo)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'Pendiente', ?, ?)''',
-        (ubicacion, direccion, comentario, foto, categoria, email, lat, lng, fecha, usuario_correo)
-    )
-    conn.commit()
-    reporte_id = cursor.lastrowid
-    conn.close()
-    return reporte_id
-
-
-def obtener_reportes(estado=None):
-    """
-    Obtiene todos los reportes, opcionalmente filtrados por estado.
-    Retorna una lista de diccionarios.
-    """
-    conn = get_db()
-    
-    if estado and estado != 'Todos':
-        reportes = conn.execute(
-            'SELECT * FROM reportes WHERE estado = ? ORDER BY fecha_creacion DESC',
-            (estado,)
-        ).fetchall()
-    else:
-        reportes = conn.execute(
-            'SELECT * FROM reportes ORDER BY fecha_creacion DESC'
-        ).fetchall()
-    
-    conn.close()
-    
-    # Convertir Row objects a diccionarios
-    return [dict(r) for r in reportes]
-
-
-def obtener_reporte_por_id(reporte_id):
-    """Obtiene un reporte específico por su ID."""
-    conn = get_db()
-    reporte = conn.execute(
-        'SELECT * FROM reportes WHERE id = ?',
-        (reporte_id,)
-    ).fetchone()
-    conn.close()
-    return dict(reporte) if reporte else None
-
-
-def actualizar_estado_reporte(reporte_id, nuevo_estado, razon_rechazo=None):
-    """
-    Actualiza el estado de un reporte.
-    Si el estado es 'Rechazado', debe incluir una razÃ³n.
-    """
-    conn = get_db()
-    
-    if nuevo_estado == 'Rechazado':
-        conn.execute(
-            'UPDATE reportes SET estado = ?, razon_rechazo = ? WHERE id = ?',
-            (nuevo_estado, razon_rechazo, reporte_id)
-        )
-    else:
-        conn.execute(
-            'UPDATE reportes SET estado = ?, razon_rechazo = NULL WHERE id = ?',
-            (nuevo_estado, reporte_id)
-        )
-    
-    conn.commit()
-    conn.close()
-
-
-def actualizar_categoria_reporte(reporte_id, nueva_categoria):
-    """
-    Actualiza la categoria de un reporte (solo admin).
-    """
-    conn = get_db()
-    conn.execute(
-        'UPDATE reportes SET categoria = ? WHERE id = ?',
-        (nueva_categoria, reporte_id)
-    )
-    conn.commit()
-    conn.close()
-
-
-def eliminar_reporte(reporte_id):
-    """
-    Elimina un reporte por su ID (solo admin).
-    Retorna True si se eliminÃ³, False si no existÃ­a.
-    """
-    conn = get_db()
-    cursor = conn.execute(
-        'DELETE FROM reportes WHERE id = ?',
-        (reporte_id,)
-    )
-    conn.commit()
-    eliminado = cursor.rowcount > 0
-    conn.close()
-    return eliminado
-
-
-def obtener_estadisticas():
-    """
-    Obtiene estadÃ­sticas de reportes por estado.
-    Retorna un diccionario con el conteo de cada estado.
-    """
-    conn = get_db()
-    
-    stats = {
-        'Pendiente': 0,
-        'Verificando': 0,
-        'Solucionado': 0,
-        'Rechazado': 0,
-        'Total': 0
-    }
-    
-    # Contar reportes por estado
-    resultados = conn.execute(
-        '''SELECT estado, COUNT(*) as cantidad 
-           FROM reportes 
-           GROUP BY estado'''
-    ).fetchall()
-    
-    for row in resultados:
-        estado = row['estado']
-        cantidad = row['cantidad']
-        if estado in stats:
-            stats[estado] = cantidad
-        stats['Total'] += cantidad
-    
-    conn.close()
+import sqlite3
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_app_context
+
+from cache import invalidar
+from contrasenas import hashear, verificar
+from datetime import datetime, timedelta
+
+# Ruta absoluta al archivo de base de datos (se puede cambiar con DB_PATH)
+DB_PATH = os.environ.get(
+    'DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db.sqlite3')
+)
+
+# Cantidad maxima de conexiones ociosas que se reutilizan (0 = sin pool)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+
+# PRAGMAs de rendimiento/concurrencia (ver _nueva_conexion e init_db)
+DB_JOURNAL_MODE   = os.environ.get('DB_JOURNAL_MODE', 'WAL').upper()
+DB_SYNCHRONOUS    = os.environ.get('DB_SYNCHRONOUS', 'NORMAL').upper()
+DB_BUSY_TIMEOUT   = int(os.environ.get('DB_BUSY_TIMEOUT', '5000'))     # ms
+DB_CACHE_SIZE     = int(os.environ.get('DB_CACHE_SIZE', '-16000'))     # negativo = KiB
+DB_MMAP_SIZE      = int(os.environ.get('DB_MMAP_SIZE', '134217728'))   # bytes
+
+# Reintentos de escritura cuando la base sigue bloqueada tras busy_timeout
+DB_WRITE_RETRIES  = int(os.environ.get('DB_WRITE_RETRIES', '5'))
+DB_WRITE_BACKOFF  = float(os.environ.get('DB_WRITE_BACKOFF', '0.05'))  # segundos
+
+if DB_JOURNAL_MODE not in ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF'):
+    raise ValueError(f'DB_JOURNAL_MODE no válido: {DB_JOURNAL_MODE}')
+if DB_SYNCHRONOUS not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+    raise ValueError(f'DB_SYNCHRONOUS no válido: {DB_SYNCHRONOUS}')
+
+
+# ─── POOL DE CONEXIONES ────────────────────────────────────────────────────
+
+def _nueva_conexion():
+    """Abre una conexión nueva y aplica los PRAGMAs una sola vez."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # permite acceder por nombre de columna
+    conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT}')
+    conn.execute(f'PRAGMA synchronous = {DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA cache_size = {DB_CACHE_SIZE}')
+    conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite compartido entre hilos.
+    Guarda hasta `tamano` conexiones ociosas; las que sobran se cierran.
+    """
+
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self._libres = []
+        self._lock = threading.Lock()
+
+    def obtener(self):
+        with self._lock:
+            if self._libres:
+                return self._libres.pop()
+        return _nueva_conexion()
+
+    def devolver(self, conn):
+        # nunca devolver al pool una transacción a medias
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._libres) < self.tamano:
+                self._libres.append(conn)
+                return
+        conn.close()
+
+    def cerrar_todas(self):
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            conn.close()
+
+
+_pool = PoolConexiones(DB_POOL_SIZE)
+_local = threading.local()
+
+
+def get_db():
+    """
+    Retorna la conexión asociada al contexto actual.
+    Dentro de una petición Flask se guarda en `g` y vuelve al pool en el
+    teardown (ver cerrar_db); fuera de Flask se reutiliza una por hilo.
+    """
+    if has_app_context():
+        if 'db' not in g:
+            g.db = _pool.obtener()
+        return g.db
+
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = _pool.obtener()
+    return conn
+
+
+def cerrar_db(exc=None):
+    """Devuelve al pool la conexión de la petición (teardown de Flask)."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        _pool.devolver(conn)
+
+
+def cerrar_conexiones():
+    """Cierra la conexión del hilo actual y todas las del pool."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+    _pool.cerrar_todas()
+
+
+# ─── ESCRITURAS SERIALIZADAS CON REINTENTOS ────────────────────────────────
+
+# Dentro de un mismo worker las escrituras pasan de a una; entre workers
+# las ordena el lock de SQLite (busy_timeout + reintentos).
+_lock_escritura = threading.RLock()
+
+
+def _es_bloqueo(error):
+    mensaje = str(error).lower()
+    return 'locked' in mensaje or 'busy' in mensaje
+
+
+@contextmanager
+def escritura():
+    """
+    Abre una transacción de escritura con BEGIN IMMEDIATE.
+    Toma el lock de escritura al inicio (no a mitad de la transacción),
+    hace commit al salir y rollback si hay una excepción. Si ya hay una
+    transacción abierta en la conexión, se une a ella.
+    """
+    conn = get_db()
+    with _lock_escritura:
+        if conn.in_transaction:
+            # escritura anidada: se une a la transacción exterior
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def reintentar_si_bloqueada(funcion):
+    """
+    Reintenta la función con backoff exponencial (y algo de azar) si SQLite
+    responde "database is locked" / "busy" después de agotar busy_timeout.
+    """
+    @wraps(funcion)
+    def decorado(*args, **kwargs):
+        for intento in range(DB_WRITE_RETRIES + 1):
+            try:
+                return funcion(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _es_bloqueo(e) or intento == DB_WRITE_RETRIES:
+                    raise
+                espera = DB_WRITE_BACKOFF * (2 ** intento)
+                time.sleep(espera * random.uniform(0.5, 1.5))
+    return decorado
+
+
+def migrar_columna_categoria():
+    """Agrega la columna categoria si no existe (migración automática)."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        # Verificar si la columna ya existe
+        cursor.execute("PRAGMA table_info(reportes)")
+        columnas = [col[1] for col in cursor.fetchall()]
+        
+        if 'categoria' not in columnas:
+            print("→ Migrando base de datos: agregando columna 'categoria'...")
+            cursor.execute('''
+                ALTER TABLE reportes 
+                ADD COLUMN categoria TEXT NOT NULL DEFAULT 'Otros'
+            ''')
+            conn.commit()
+            print("✓ Columna 'categoria' agregada exitosamente")
+        
+        conn.close()
+    except Exception as e:
+        print(f"✗ Error en migración: {e}")
+
+
+def migrar_columna_direccion():
+    """Agrega la columna direccion si no existe (migración automática)."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(reportes)")
+        columnas = [col[1] for col in cursor.fetchall()]
+        if 'direccion' not in columnas:
+            print("→ Migrando base de datos: agregando columna 'direccion'...")
+            cursor.execute("ALTER TABLE reportes ADD COLUMN direccion TEXT DEFAULT ''")
+            conn.commit()
+            print("✓ Columna 'direccion' agregada exitosamente")
+        conn.close()
+    except Exception as e:
+        print(f"✗ Error en migración: {e}")
+
+
+def migrar_columnas_version():
+    """
+    Agrega las columnas version y actualizado_en si no existen (migración
+    automática). Cada reporte existente recibe una versión distinta (su
+    id), así GET /api/reportes/cambios?desde=0 los devuelve a todos y se
+    pueden paginar por versión.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(reportes)")
+        columnas = [col[1] for col in cursor.fetchall()]
+        if 'version' not in columnas:
+            print("→ Migrando base de datos: agregando columnas 'version' y 'actualizado_en'...")
+            cursor.execute("ALTER TABLE reportes ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            cursor.execute("ALTER TABLE reportes ADD COLUMN actualizado_en TEXT")
+            cursor.execute("UPDATE reportes SET version = id, actualizado_en = fecha_creacion")
+            conn.commit()
+            print("✓ Columnas 'version' y 'actualizado_en' agregadas exitosamente")
+        conn.close()
+    except Exception as e:
+        print(f"✗ Error en migración: {e}")
+
+
+# Índices secundarios de reportes, pensados para las consultas reales.
+# Son ascendentes a propósito: SQLite los recorre al revés para
+# ORDER BY fecha_creacion DESC, id DESC sin ordenar en un B-tree temporal
+# (el id es el rowid y va implícito al final de cada índice).
+INDICES_REPORTES = {
+    # listado general y paginación por keyset
+    'idx_reportes_fecha':
+        'reportes (fecha_creacion)',
+    # filtro por estado + orden por fecha; también cubre el GROUP BY estado
+    'idx_reportes_estado_fecha':
+        'reportes (estado, fecha_creacion)',
+    # filtro por categoría + orden por fecha (exportación)
+    'idx_reportes_categoria_fecha':
+        'reportes (categoria, fecha_creacion)',
+    'idx_reportes_usuario':
+        'reportes (usuario_correo)',
+    # GET /api/reportes/cambios?desde=<version>
+    'idx_reportes_version':
+        'reportes (version)',
+}
+
+# Índices reemplazados por otros de INDICES_REPORTES
+INDICES_OBSOLETOS = ('idx_reportes_categoria',)
+
+
+def crear_indices():
+    """Crea los índices que falten (también en bases ya existentes)."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        for nombre, definicion in INDICES_REPORTES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}')
+        for nombre in INDICES_OBSOLETOS:
+            conn.execute(f'DROP INDEX IF EXISTS {nombre}')
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"✗ Error creando índices: {e}")
+
+
+def crear_indice_espacial():
+    """
+    Crea el índice R*Tree de coordenadas (reportes_rtree) y los triggers
+    que lo mantienen sincronizado con reportes.lat/lng. Si la tabla ya
+    tenía reportes, los carga en el índice.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS reportes_rtree USING rtree(
+                id, min_lng, max_lng, min_lat, max_lat
+            );
+
+            CREATE TRIGGER IF NOT EXISTS reportes_rtree_insert
+            AFTER INSERT ON reportes BEGIN
+                INSERT INTO reportes_rtree VALUES (new.id, new.lng, new.lng, new.lat, new.lat);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS reportes_rtree_update
+            AFTER UPDATE OF lat, lng ON reportes BEGIN
+                UPDATE reportes_rtree
+                SET min_lng = new.lng, max_lng = new.lng, min_lat = new.lat, max_lat = new.lat
+                WHERE id = new.id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS reportes_rtree_delete
+            AFTER DELETE ON reportes BEGIN
+                DELETE FROM reportes_rtree WHERE id = old.id;
+            END;
+
+            INSERT INTO reportes_rtree
+            SELECT id, lng, lng, lat, lat FROM reportes
+            WHERE id NOT IN (SELECT id FROM reportes_rtree);
+        ''')
+        conn.close()
+    except Exception as e:
+        print(f"✗ Error creando índice espacial: {e}")
+
+
+# ─── BÚSQUEDA DE TEXTO ─────────────────────────────────────────────────────
+
+# Peso de cada columna de reportes_fts en el ranking (bm25)
+PESOS_BUSQUEDA = (1.0, 2.0, 2.0)   # comentario, direccion, ubicacion
+# Términos que se toman de la consulta; el resto se ignora
+BUSQUEDA_MAX_TERMINOS = 8
+# Coincidencias (las más recientes) que se ordenan por relevancia. bm25 se
+# calcula fila por fila: sin este tope, una palabra presente en casi todos
+# los reportes obligaría a puntuar la tabla entera.
+BUSQUEDA_MAX_CANDIDATOS = int(os.environ.get('BUSQUEDA_MAX_CANDIDATOS', 1000))
+
+
+def crear_indice_texto():
+    """
+    Crea el índice FTS5 (reportes_fts) sobre comentario, direccion y
+    ubicacion, con los triggers que lo mantienen sincronizado. Es una
+    tabla de contenido externo: solo guarda el índice, el texto se lee de
+    reportes. El tokenizador ignora mayúsculas y tildes ("via" encuentra
+    "Vía") y los índices de prefijo aceleran las búsquedas "bach*".
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        existia = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'reportes_fts'"
+        ).fetchone() is not None
+        conn.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS reportes_fts USING fts5(
+                comentario, direccion, ubicacion,
+                content = 'reportes', content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS reportes_fts_insert
+            AFTER INSERT ON reportes BEGIN
+                INSERT INTO reportes_fts (rowid, comentario, direccion, ubicacion)
+                VALUES (new.id, new.comentario, new.direccion, new.ubicacion);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS reportes_fts_update
+            AFTER UPDATE OF comentario, direccion, ubicacion ON reportes BEGIN
+                INSERT INTO reportes_fts (reportes_fts, rowid, comentario, direccion, ubicacion)
+                VALUES ('delete', old.id, old.comentario, old.direccion, old.ubicacion);
+                INSERT INTO reportes_fts (rowid, comentario, direccion, ubicacion)
+                VALUES (new.id, new.comentario, new.direccion, new.ubicacion);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS reportes_fts_delete
+            AFTER DELETE ON reportes BEGIN
+                INSERT INTO reportes_fts (reportes_fts, rowid, comentario, direccion, ubicacion)
+                VALUES ('delete', old.id, old.comentario, old.direccion, old.ubicacion);
+            END;
+        ''')
+        # ORDER BY rank usa bm25 con estos pesos; FTS5 ordena internamente
+        pesos = ', '.join(map(str, PESOS_BUSQUEDA))
+        conn.execute(
+            "INSERT INTO reportes_fts (reportes_fts, rank) VALUES ('rank', ?)",
+            (f'bm25({pesos})',)
+        )
+        conn.commit()
+        if not existia:
+            # indexar los reportes que ya había
+            conn.execute("INSERT INTO reportes_fts (reportes_fts) VALUES ('rebuild')")
+            conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"✗ Error creando índice de texto: {e}")
+
+
+def _consulta_fts(texto):
+    """
+    Convierte el texto que escribe el usuario en una consulta FTS5 segura:
+    cada palabra entre comillas (sin operadores ni sintaxis especial), todas
+    obligatorias. La última se busca como prefijo ("bach" encuentra
+    "baches") porque puede estar a medio escribir. Retorna None si no hay
+    palabras.
+    """
+    palabras = re.findall(r'\w+', texto)[:BUSQUEDA_MAX_TERMINOS]
+    if not palabras:
+        return None
+    terminos = [f'"{p}"' for p in palabras]
+    terminos[-1] += '*'
+    return ' '.join(terminos)
+
+
+# ─── CLUSTERS DEL MAPA ─────────────────────────────────────────────────────
+
+# Zoom máximo con clusters precalculados (más cerca se envían puntos)
+CLUSTER_ZOOM_MAX = 16
+# Cada tile de 256px se divide en 2^CLUSTER_SUBDIVISION celdas por lado (64px)
+CLUSTER_SUBDIVISION = 2
+
+# Columna del desglose por estado en clusters_mapa
+COLUMNA_ESTADO = {
+    'Pendiente': 'pendiente',
+    'Verificando': 'verificando',
+    'Solucionado': 'solucionado',
+    'Rechazado': 'rechazado',
+}
+
+
+def _celda(lat, lng, zoom):
+    """Celda (x, y) de la grilla Web Mercator que contiene el punto."""
+    n = 2 ** (zoom + CLUSTER_SUBDIVISION)
+    lat = max(min(lat, 85.0511), -85.0511)
+    lat_rad = math.radians(lat)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _sumar_a_clusters(conn, lat, lng, estado, delta):
+    """
+    Suma (delta=1) o resta (delta=-1) un reporte en su celda de cada zoom.
+    Debe llamarse dentro de la misma transacción que modifica reportes.
+    """
+    columna = COLUMNA_ESTADO.get(estado)
+    if columna is None:
+        return
+    for zoom in range(CLUSTER_ZOOM_MAX + 1):
+        x, y = _celda(lat, lng, zoom)
+        conn.execute(
+            f'''INSERT INTO clusters_mapa (zoom, x, y, cantidad, suma_lat, suma_lng, {columna})
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (zoom, x, y) DO UPDATE SET
+                    cantidad = cantidad + excluded.cantidad,
+                    suma_lat = suma_lat + excluded.suma_lat,
+                    suma_lng = suma_lng + excluded.suma_lng,
+                    {columna} = {columna} + excluded.{columna}''',
+            (zoom, x, y, delta, lat * delta, lng * delta, delta)
+        )
+        if delta < 0:
+            conn.execute(
+                'DELETE FROM clusters_mapa WHERE zoom = ? AND x = ? AND y = ? AND cantidad <= 0',
+                (zoom, x, y)
+            )
+
+
+def _agrupar_clusters(celdas, lat, lng, estado):
+    """
+    Acumula un reporte en `celdas` ({(x, y): [cantidad, suma_lat, suma_lng,
+    {estado: cantidad}]}) con la celda del zoom máximo. Las de los demás
+    zooms salen de esa en _guardar_clusters: la grilla de cada zoom es la
+    del siguiente con celdas del doble de lado.
+    """
+    if estado not in COLUMNA_ESTADO:
+        return
+    clave = _celda(lat, lng, CLUSTER_ZOOM_MAX)
+    celda = celdas.get(clave)
+    if celda is None:
+        celda = celdas[clave] = [0, 0.0, 0.0, {}]
+    celda[0] += 1
+    celda[1] += lat
+    celda[2] += lng
+    celda[3][estado] = celda[3].get(estado, 0) + 1
+
+
+def _guardar_clusters(conn, celdas):
+    """Suma en clusters_mapa las celdas acumuladas con _agrupar_clusters, en todos los zooms."""
+    columnas = list(COLUMNA_ESTADO.values())
+    for zoom in range(CLUSTER_ZOOM_MAX, -1, -1):
+        conn.executemany(
+            f'''INSERT INTO clusters_mapa (zoom, x, y, cantidad, suma_lat, suma_lng, {', '.join(columnas)})
+                VALUES (?, ?, ?, ?, ?, ?{', ?' * len(columnas)})
+                ON CONFLICT (zoom, x, y) DO UPDATE SET
+                    cantidad = cantidad + excluded.cantidad,
+                    suma_lat = suma_lat + excluded.suma_lat,
+                    suma_lng = suma_lng + excluded.suma_lng,
+                    {', '.join(f'{c} = {c} + excluded.{c}' for c in columnas)}''',
+            [
+                (zoom, x, y, cantidad, suma_lat, suma_lng,
+                 *(estados.get(estado, 0) for estado in COLUMNA_ESTADO))
+                for (x, y), (cantidad, suma_lat, suma_lng, estados) in celdas.items()
+            ]
+        )
+        # celdas del zoom anterior: coordenadas a la mitad
+        padres = {}
+        for (x, y), (cantidad, suma_lat, suma_lng, estados) in celdas.items():
+            padre = padres.setdefault((x >> 1, y >> 1), [0, 0.0, 0.0, {}])
+            padre[0] += cantidad
+            padre[1] += suma_lat
+            padre[2] += suma_lng
+            for estado, n in estados.items():
+                padre[3][estado] = padre[3].get(estado, 0) + n
+        celdas = padres
+
+
+def crear_tabla_clusters():
+    """Crea clusters_mapa y la llena si hay reportes sin agrupar."""
+    conn = _nueva_conexion()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS clusters_mapa (
+            zoom        INTEGER NOT NULL,
+            x           INTEGER NOT NULL,
+            y           INTEGER NOT NULL,
+            cantidad    INTEGER NOT NULL DEFAULT 0,
+            suma_lat    REAL    NOT NULL DEFAULT 0,
+            suma_lng    REAL    NOT NULL DEFAULT 0,
+            pendiente   INTEGER NOT NULL DEFAULT 0,
+            verificando INTEGER NOT NULL DEFAULT 0,
+            solucionado INTEGER NOT NULL DEFAULT 0,
+            rechazado   INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (zoom, x, y)
+        ) WITHOUT ROWID
+    ''')
+    conn.commit()
+    vacia = conn.execute('SELECT 1 FROM clusters_mapa LIMIT 1').fetchone() is None
+    hay_reportes = conn.execute('SELECT 1 FROM reportes LIMIT 1').fetchone() is not None
+    conn.close()
+
+    if vacia and hay_reportes:
+        reconstruir_clusters()
+
+
+def reconstruir_clusters():
+    """Recalcula clusters_mapa completo a partir de la tabla reportes."""
+    with escritura() as conn:
+        conn.execute('DELETE FROM clusters_mapa')
+        _nueva_version(conn)
+        celdas = {}
+        for r in conn.execute('SELECT lat, lng, estado FROM reportes'):
+            _agrupar_clusters(celdas, r['lat'], r['lng'], r['estado'])
+        _guardar_clusters(conn, celdas)
+
+
+def obtener_clusters(zoom, min_lng, min_lat, max_lng, max_lat):
+    """
+    Clusters de un zoom que tocan el bbox: posición media, cantidad y
+    desglose por estado. Como mucho una fila por celda visible.
+    """
+    zoom = max(0, min(zoom, CLUSTER_ZOOM_MAX))
+    # en Mercator la y crece hacia el sur
+    x_min, y_min = _celda(max_lat, min_lng, zoom)
+    x_max, y_max = _celda(min_lat, max_lng, zoom)
+
+    conn = get_db()
+    filas = conn.execute(
+        '''SELECT * FROM clusters_mapa
+           WHERE zoom = ? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ?''',
+        (zoom, x_min, x_max, y_min, y_max)
+    ).fetchall()
+
+    return [
+        {
+            'lat': f['suma_lat'] / f['cantidad'],
+            'lng': f['suma_lng'] / f['cantidad'],
+            'cantidad': f['cantidad'],
+            'estados': {estado: f[col] for estado, col in COLUMNA_ESTADO.items()},
+        }
+        for f in filas
+    ]
+
+
+# ─── CONTADORES DE ESTADÍSTICAS ────────────────────────────────────────────
+
+# Consulta de recuento completo por tipo de contador (para reconstruir/verificar)
+RECUENTOS = {
+    'total': "SELECT '' AS clave, COUNT(*) AS cantidad FROM reportes",
+    'estado': 'SELECT estado AS clave, COUNT(*) AS cantidad FROM reportes GROUP BY estado',
+    'categoria': 'SELECT categoria AS clave, COUNT(*) AS cantidad FROM reportes GROUP BY categoria',
+    'dia': 'SELECT substr(fecha_creacion, 1, 10) AS clave, COUNT(*) AS cantidad FROM reportes GROUP BY clave',
+}
+
+
+def _sumar_contador(conn, tipo, clave, delta):
+    conn.execute(
+        '''INSERT INTO contadores_reportes (tipo, clave, cantidad) VALUES (?, ?, ?)
+           ON CONFLICT (tipo, clave) DO UPDATE SET cantidad = cantidad + excluded.cantidad''',
+        (tipo, clave, delta)
+    )
+
+
+def _sumar_a_contadores(conn, estado, categoria, fecha, delta):
+    """
+    Suma o resta un reporte en los contadores total/estado/categoría/día.
+    Debe llamarse dentro de la misma transacción que modifica reportes.
+    """
+    _sumar_contador(conn, 'total', '', delta)
+    _sumar_contador(conn, 'estado', estado, delta)
+    _sumar_contador(conn, 'categoria', categoria, delta)
+    _sumar_contador(conn, 'dia', fecha[:10], delta)
+
+
+def crear_tabla_contadores():
+    """Crea contadores_reportes y la llena si hay reportes sin contar."""
+    conn = _nueva_conexion()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS contadores_reportes (
+            tipo     TEXT    NOT NULL,
+            clave    TEXT    NOT NULL,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tipo, clave)
+        ) WITHOUT ROWID
+    ''')
+    conn.commit()
+    vacia = conn.execute('SELECT 1 FROM contadores_reportes LIMIT 1').fetchone() is None
+    hay_reportes = conn.execute('SELECT 1 FROM reportes LIMIT 1').fetchone() is not None
+    conn.close()
+
+    if vacia and hay_reportes:
+        reconstruir_contadores()
+
+
+def reconstruir_contadores():
+    """Recalcula todos los contadores con un recuento completo."""
+    with escritura() as conn:
+        conn.execute('DELETE FROM contadores_reportes')
+        _nueva_version(conn)
+        for tipo, sql in RECUENTOS.items():
+            conn.execute(
+                f'''INSERT INTO contadores_reportes (tipo, clave, cantidad)
+                    SELECT ?, clave, cantidad FROM ({sql}) WHERE cantidad > 0''',
+                (tipo,)
+            )
+    invalidar('estadisticas')
+
+
+def verificar_contadores():
+    """
+    Compara los contadores con un recuento completo.
+    Retorna una lista de diferencias (tipo, clave, contador, recuento);
+    vacía si todo coincide.
+    """
+    conn = get_db()
+    diferencias = []
+    for tipo, sql in RECUENTOS.items():
+        real = {r['clave']: r['cantidad'] for r in conn.execute(sql) if r['cantidad'] > 0}
+        guardado = {
+            r['clave']: r['cantidad']
+            for r in conn.execute(
+                'SELECT clave, cantidad FROM contadores_reportes WHERE tipo = ? AND cantidad != 0',
+                (tipo,)
+            )
+        }
+        for clave in sorted(real.keys() | guardado.keys()):
+            if real.get(clave, 0) != guardado.get(clave, 0):
+                diferencias.append((tipo, clave, guardado.get(clave, 0), real.get(clave, 0)))
+    return diferencias
+
+
+# ─── VERSIÓN DE LOS DATOS ──────────────────────────────────────────────────
+
+def crear_tabla_version():
+    """
+    Crea la tabla con la versión de los datos: un número que solo crece y
+    que cada escritura sobre reportes incrementa en su misma transacción.
+    La API la usa como ETag (ver app.py).
+    """
+    conn = _nueva_conexion()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS version_datos (
+            id              INTEGER PRIMARY KEY CHECK (id = 1),
+            version         INTEGER NOT NULL,
+            actualizado_en  REAL    NOT NULL
+        );
+    ''')
+    conn.execute(
+        'INSERT OR IGNORE INTO version_datos (id, version, actualizado_en) VALUES (1, 1, ?)',
+        (time.time(),)
+    )
+    # nunca por debajo de la versión de un reporte (ver migrar_columnas_version)
+    conn.execute('''
+        UPDATE version_datos
+        SET version = max(version, (SELECT coalesce(max(version), 0) FROM reportes))
+        WHERE id = 1
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def _nueva_version(conn):
+    """Incrementa la versión de los datos. Retorna la nueva versión."""
+    return conn.execute(
+        '''UPDATE version_datos SET version = version + 1, actualizado_en = ?
+           WHERE id = 1 RETURNING version''',
+        (time.time(),)
+    ).fetchone()[0]
+
+
+def obtener_version_datos():
+    """
+    Versión actual de los datos y timestamp de la última escritura.
+    Es una sola fila: se lee sin consultar reportes.
+    """
+    fila = get_db().execute(
+        'SELECT version, actualizado_en FROM version_datos WHERE id = 1'
+    ).fetchone()
+    return fila['version'], fila['actualizado_en']
+
+
+# ─── EVENTOS (GET /api/eventos) ───────────────────────────────────────────
+
+# Eventos que se conservan: un cliente desconectado más tiempo recarga todo
+EVENTOS_RETENIDOS = int(os.environ.get('EVENTOS_RETENIDOS', 10000))
+
+
+def crear_tabla_eventos():
+    """
+    Crea la tabla de eventos de reportes. Cada evento usa como id la
+    versión de los datos que generó su escritura, así un cliente que
+    reconecta pide "lo posterior a la versión N" (Last-Event-ID).
+    """
+    conn = _nueva_conexion()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS eventos (
+            version     INTEGER PRIMARY KEY,
+            tipo        TEXT    NOT NULL,
+            reporte_id  INTEGER NOT NULL,
+            datos       TEXT    NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def crear_tabla_eliminados():
+    """
+    Crea la tabla de reportes eliminados (tombstones): el reporte se borra
+    de verdad, pero su id queda registrado con la versión en que se
+    eliminó para que /api/reportes/cambios pueda informarlo.
+    """
+    conn = _nueva_conexion()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS reportes_eliminados (
+            id            INTEGER PRIMARY KEY,
+            version       INTEGER NOT NULL,
+            eliminado_en  TEXT    NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_eliminados_version ON reportes_eliminados (version);
+    ''')
+    conn.close()
+
+
+def _registrar_evento(conn, tipo, reporte_id, datos=None):
+    """
+    Incrementa la versión de los datos y la deja en el reporte (columnas
+    version y actualizado_en) o, si se eliminó, en su tombstone. Guarda
+    además el evento con ese número. Todo en la misma transacción que la
+    escritura. Descarta los eventos fuera de la ventana de EVENTOS_RETENIDOS.
+    """
+    version = _nueva_version(conn)
+    ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if tipo == 'eliminado':
+        conn.execute(
+            'INSERT OR REPLACE INTO reportes_eliminados (id, version, eliminado_en) VALUES (?, ?, ?)',
+            (reporte_id, version, ahora)
+        )
+    else:
+        conn.execute(
+            'UPDATE reportes SET version = ?, actualizado_en = ? WHERE id = ?',
+            (version, ahora, reporte_id)
+        )
+    conn.execute(
+        'INSERT INTO eventos (version, tipo, reporte_id, datos) VALUES (?, ?, ?, ?)',
+        (version, tipo, reporte_id, json.dumps(datos or {}))
+    )
+    conn.execute('DELETE FROM eventos WHERE version <= ?', (version - EVENTOS_RETENIDOS,))
+    return version
+
+
+def obtener_cambios(desde, limite=500):
+    """
+    Reportes creados o modificados y reportes eliminados después de la
+    versión `desde`, en orden de versión y hasta `limite` en total.
+    Retorna (reportes, eliminados, version, hay_mas): `version` es hasta
+    dónde llega la respuesta, para pedir la siguiente con desde=version.
+    """
+    conn = get_db()
+    # una sola transacción de lectura: todo desde la misma foto de la base
+    conn.execute('BEGIN')
+    try:
+        version_actual = conn.execute(
+            'SELECT version FROM version_datos WHERE id = 1'
+        ).fetchone()['version']
+        reportes = conn.execute(
+            'SELECT * FROM reportes WHERE version > ? ORDER BY version LIMIT ?',
+            (desde, limite + 1)
+        ).fetchall()
+        eliminados = conn.execute(
+            '''SELECT id, version FROM reportes_eliminados
+               WHERE version > ? ORDER BY version LIMIT ?''',
+            (desde, limite + 1)
+        ).fetchall()
+    finally:
+        conn.rollback()
+
+    # mezclar ambas listas por versión y cortar en `limite`
+    cambios = sorted(
+        [(r['version'], dict(r)) for r in reportes] + [(e['version'], e['id']) for e in eliminados],
+        key=lambda cambio: cambio[0]
+    )
+    hay_mas = len(cambios) > limite
+    cambios = cambios[:limite]
+    version = cambios[-1][0] if hay_mas else version_actual
+    return (
+        [dato for _, dato in cambios if isinstance(dato, dict)],
+        [dato for _, dato in cambios if not isinstance(dato, dict)],
+        version,
+        hay_mas,
+    )
+
+
+def obtener_eventos(desde, limite=100):
+    """
+    Eventos posteriores a la versión `desde`, en orden.
+    Retorna (eventos, completos): completos es False si algunos eventos
+    posteriores a `desde` ya se descartaron y el cliente debe recargar.
+    """
+    conn = get_db()
+    version_actual = conn.execute(
+        'SELECT version FROM version_datos WHERE id = 1'
+    ).fetchone()['version']
+    if desde < version_actual - EVENTOS_RETENIDOS:
+        return [], False
+
+    filas = conn.execute(
+        '''SELECT version, tipo, reporte_id, datos FROM eventos
+           WHERE version > ? ORDER BY version LIMIT ?''',
+        (desde, limite)
+    ).fetchall()
+    eventos = []
+    for fila in filas:
+        evento = dict(fila)
+        evento['datos'] = json.loads(evento['datos'])
+        eventos.append(evento)
+    return eventos, True
+
+
+def _invalidar_cache_reporte(reporte_id, *estados):
+    """
+    Descarta de la caché de respuestas (cache.py) lo que cambia al escribir
+    un reporte: su detalle, los listados de sus estados y las estadísticas.
+    Se llama después del commit, nunca dentro de la transacción.
+    """
+    invalidar(
+        'estadisticas', 'listado:Todos', f'reporte:{reporte_id}',
+        *(f'listado:{estado}' for estado in estados)
+    )
+
+
+# ─── REFERENCIAS A FOTOS ───────────────────────────────────────────────────
+
+def crear_tabla_fotos():
+    """
+    Crea la tabla de referencias a fotos (almacenamiento por contenido,
+    ver subidas.py) y cuenta las referencias de los reportes existentes.
+    """
+    conn = _nueva_conexion()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS fotos (
+            ruta         TEXT    PRIMARY KEY,
+            referencias  INTEGER NOT NULL DEFAULT 0,
+            liberada_en  REAL
+        ) WITHOUT ROWID;
+        -- índice parcial: solo las fotos candidatas a limpieza
+        CREATE INDEX IF NOT EXISTS idx_fotos_liberadas
+            ON fotos (liberada_en) WHERE referencias <= 0;
+    ''')
+    vacia = conn.execute('SELECT 1 FROM fotos LIMIT 1').fetchone() is None
+    if vacia:
+        conn.execute('''
+            INSERT INTO fotos (ruta, referencias)
+            SELECT foto, COUNT(*) FROM reportes GROUP BY foto
+        ''')
+        conn.commit()
+    conn.close()
+
+
+def _sumar_referencia_foto(conn, ruta, delta):
+    """Suma o resta una referencia; al llegar a 0 anota cuándo se liberó."""
+    conn.execute(
+        '''INSERT INTO fotos (ruta, referencias) VALUES (?, ?)
+           ON CONFLICT (ruta) DO UPDATE SET referencias = referencias + excluded.referencias''',
+        (ruta, delta)
+    )
+    conn.execute(
+        '''UPDATE fotos
+           SET liberada_en = CASE WHEN referencias <= 0 THEN ? ELSE NULL END
+           WHERE ruta = ?''',
+        (time.time(), ruta)
+    )
+
+
+def obtener_fotos_liberadas(antes_de):
+    """Fotos sin referencias desde antes del timestamp `antes_de`."""
+    conn = get_db()
+    filas = conn.execute(
+        '''SELECT ruta FROM fotos
+           WHERE referencias <= 0 AND liberada_en < ?''',
+        (antes_de,)
+    ).fetchall()
+    return [f['ruta'] for f in filas]
+
+
+@reintentar_si_bloqueada
+def eliminar_foto_si_liberada(ruta, borrar_archivos):
+    """
+    Borra el registro de una foto si sigue sin referencias y llama a
+    `borrar_archivos(ruta)` dentro de la misma transacción: mientras tanto
+    ningún reporte nuevo puede volver a referenciarla.
+    Retorna True si se eliminó.
+    """
+    with escritura() as conn:
+        cursor = conn.execute(
+            'DELETE FROM fotos WHERE ruta = ? AND referencias <= 0', (ruta,)
+        )
+        if cursor.rowcount == 0:
+            return False
+        borrar_archivos(ruta)
+    return True
+
+
+# ─── COLA DE TAREAS EN SEGUNDO PLANO ───────────────────────────────────────
+
+TAREA_MAX_INTENTOS = 5
+# Una tarea "en_proceso" más vieja que esto se considera abandonada
+TAREA_TIMEOUT = 600  # segundos
+
+
+def crear_tabla_tareas():
+    """Crea la tabla de la cola de tareas (ver tareas.py)."""
+    conn = _nueva_conexion()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS tareas (
+            id             INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo           TEXT    NOT NULL,
+            reporte_id     INTEGER,
+            datos          TEXT    NOT NULL DEFAULT '{}',
+            estado         TEXT    NOT NULL DEFAULT 'pendiente',
+            intentos       INTEGER NOT NULL DEFAULT 0,
+            error          TEXT,
+            disponible_en  REAL    NOT NULL,
+            tomada_en      REAL,
+            creada_en      REAL    NOT NULL
+        );
+        -- índice parcial: solo las tareas que todavía pueden tomarse
+        CREATE INDEX IF NOT EXISTS idx_tareas_disponibles
+            ON tareas (disponible_en) WHERE estado IN ('pendiente', 'en_proceso');
+        CREATE INDEX IF NOT EXISTS idx_tareas_reporte
+            ON tareas (reporte_id);
+    ''')
+    conn.close()
+
+
+@reintentar_si_bloqueada
+def encolar_tarea(tipo, datos=None, reporte_id=None):
+    """Agrega una tarea pendiente a la cola. Retorna su ID."""
+    ahora = time.time()
+    with escritura() as conn:
+        cursor = conn.execute(
+            '''INSERT INTO tareas (tipo, reporte_id, datos, disponible_en, creada_en)
+               VALUES (?, ?, ?, ?, ?)''',
+            (tipo, reporte_id, json.dumps(datos or {}), ahora, ahora)
+        )
+    return cursor.lastrowid
+
+
+@reintentar_si_bloqueada
+def tomar_tarea():
+    """
+    Toma la siguiente tarea disponible y la marca "en_proceso".
+    Es atómico entre procesos (BEGIN IMMEDIATE). Retorna un diccionario
+    con `datos` ya decodificado, o None si no hay tareas. Las tareas
+    abandonadas que ya usaron TAREA_MAX_INTENTOS quedan "fallida" en vez
+    de volver a tomarse.
+    """
+    ahora = time.time()
+    with escritura() as conn:
+        # el IN repite la condición del índice parcial para poder usarlo
+        conn.execute(
+            '''UPDATE tareas
+               SET estado = 'fallida',
+                   error = 'Abandonada sin terminar en el último intento'
+               WHERE estado IN ('pendiente', 'en_proceso') AND disponible_en <= ?
+                 AND estado = 'en_proceso' AND intentos >= ?''',
+            (ahora, TAREA_MAX_INTENTOS)
+        )
+        # disponible_en se corre TAREA_TIMEOUT: si el worker muere, la
+        # tarea "en_proceso" vuelve a poder tomarse después de ese tiempo
+        fila = conn.execute(
+            '''UPDATE tareas
+               SET estado = 'en_proceso', tomada_en = ?, disponible_en = ?,
+                   intentos = intentos + 1
+               WHERE id = (
+                   SELECT id FROM tareas
+                   WHERE estado IN ('pendiente', 'en_proceso') AND disponible_en <= ?
+                   ORDER BY disponible_en
+                   LIMIT 1
+               )
+               RETURNING *''',
+            (ahora, ahora + TAREA_TIMEOUT, ahora)
+        ).fetchone()
+
+    if fila is None:
+        return None
+    tarea = dict(fila)
+    tarea['datos'] = json.loads(tarea['datos'])
+    return tarea
+
+
+@reintentar_si_bloqueada
+def completar_tarea(tarea_id):
+    with escritura() as conn:
+        conn.execute(
+            "UPDATE tareas SET estado = 'completada', error = NULL WHERE id = ?",
+            (tarea_id,)
+        )
+
+
+@reintentar_si_bloqueada
+def fallar_tarea(tarea_id, error):
+    """
+    Registra el error. Si quedan intentos la tarea vuelve a "pendiente"
+    con backoff exponencial (30s, 60s, 120s...); si no, queda "fallida".
+    """
+    with escritura() as conn:
+        fila = conn.execute('SELECT intentos FROM tareas WHERE id = ?', (tarea_id,)).fetchone()
+        if fila is None:
+            return
+        if fila['intentos'] >= TAREA_MAX_INTENTOS:
+            conn.execute(
+                "UPDATE tareas SET estado = 'fallida', error = ? WHERE id = ?",
+                (error, tarea_id)
+            )
+        else:
+            espera = 30 * 2 ** (fila['intentos'] - 1)
+            conn.execute(
+                "UPDATE tareas SET estado = 'pendiente', error = ?, disponible_en = ? WHERE id = ?",
+                (error, time.time() + espera, tarea_id)
+            )
+
+
+def obtener_tareas_reporte(reporte_id):
+    """Tareas asociadas a un reporte (para mostrar su procesamiento)."""
+    conn = get_db()
+    filas = conn.execute(
+        '''SELECT id, tipo, estado, intentos, error, creada_en
+           FROM tareas WHERE reporte_id = ? ORDER BY id''',
+        (reporte_id,)
+    ).fetchall()
+    return [dict(f) for f in filas]
+
+
+def init_db():
+    """Inicializa las tablas de la base de datos."""
+    db_existe = os.path.exists(DB_PATH)
+    
+    if db_existe:
+        try:
+            conn = sqlite3.connect(DB_PATH)
+            conn.execute('SELECT name FROM sqlite_master WHERE type="table" AND name="usuarios"')
+            tables = conn.execute('SELECT name FROM sqlite_master WHERE type="table"').fetchall()
+            conn.close()
+            if not tables:
+                # archivo existe pero estÃ¡ vacÃ­o â†’ eliminarlo
+                os.remove(DB_PATH)
+                db_existe = False
+        except Exception:
+            # cualquier error al leer → eliminarlo
+            try:
+                os.remove(DB_PATH)
+                db_existe = False
+            except Exception:
+                pass
+
+    # conexión propia: init_db puede borrar el archivo y no debe usar el pool
+    conn = _nueva_conexion()
+
+    # El modo WAL queda guardado en el archivo: lectores y escritor no se bloquean
+    conn.execute(f'PRAGMA journal_mode = {DB_JOURNAL_MODE}')
+    
+    # Tabla de usuarios
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id        INTEGER PRIMARY KEY AUTOINCREMENT,
+            correo    TEXT    UNIQUE NOT NULL,
+            contrasena TEXT   NOT NULL,
+            rol       TEXT    NOT NULL DEFAULT 'usuario'
+        )
+    ''')
+    
+    # Tabla de reportes
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reportes (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            ubicacion       TEXT    NOT NULL,
+            direccion       TEXT    DEFAULT '',
+            comentario      TEXT    NOT NULL,
+            foto            TEXT    NOT NULL,
+            email           TEXT,
+            categoria       TEXT    NOT NULL DEFAULT 'Otros',
+            estado          TEXT    NOT NULL DEFAULT 'Pendiente',
+            razon_rechazo   TEXT,
+            lat             REAL    NOT NULL,
+            lng             REAL    NOT NULL,
+            fecha_creacion  TEXT    NOT NULL,
+            usuario_correo  TEXT,
+            version         INTEGER NOT NULL DEFAULT 1,
+            actualizado_en  TEXT,
+            FOREIGN KEY (usuario_correo) REFERENCES usuarios(correo)
+        )
+    ''')
+    
+    conn.commit()
+    conn.close()
+    
+    # Si la base de datos ya existi­a, ejecutar migraciones automÃ¡ticas
+    if db_existe:
+        migrar_columna_categoria()
+        migrar_columna_direccion()
+        migrar_columnas_version()
+
+    # Después de las migraciones: algunos índices usan columnas migradas
+    crear_indices()
+
+    # Antes que las tablas derivadas: al reconstruirlas cambia la versión
+    crear_tabla_version()
+    crear_tabla_eventos()
+    crear_tabla_eliminados()
+
+    crear_indice_espacial()
+    crear_indice_texto()
+    crear_tabla_clusters()
+    crear_tabla_contadores()
+    crear_tabla_tareas()
+    crear_tabla_fotos()
+
+# -------------FUNCIONES DE USUARIOS---------------------------------------------------------------------------------------------------------------
+
+def crear_usuario(correo, contrasena, rol='usuario'):
+    """
+    Inserta un nuevo usuario.
+    La contraseña se hashea automÃ¡ticamente.
+    Retorna True si se crea, False si el correo ya existe.
+    """
+    # hashear una sola vez, antes del lock de escritura y fuera de los
+    # reintentos: solo se reintenta el INSERT
+    return _insertar_usuario(correo, hashear(contrasena), rol)
+
+
+@reintentar_si_bloqueada
+def _insertar_usuario(correo, hash_contrasena, rol):
+    try:
+        with escritura() as conn:
+            conn.execute(
+                'INSERT INTO usuarios (correo, contrasena, rol) VALUES (?, ?, ?)',
+                (correo, hash_contrasena, rol)
+            )
+        return True
+    except sqlite3.IntegrityError:
+        # correo duplicado
+        return False
+
+
+def buscar_usuario_por_correo(correo):
+    """Retorna la fila del usuario o None."""
+    conn = get_db()
+    usuario = conn.execute(
+        'SELECT * FROM usuarios WHERE correo = ?', (correo,)
+    ).fetchone()
+    return usuario
+
+
+def verificar_contrasena(contrasena, hash_almacenado):
+    """Compara la contraseÃ±a plana contra el hash."""
+    return verificar(contrasena, hash_almacenado)
+
+
+def actualizar_hash_contrasena(correo, contrasena):
+    """Recalcula el hash de la contraseña con los parámetros actuales."""
+    _guardar_hash_contrasena(correo, hashear(contrasena))
+
+
+@reintentar_si_bloqueada
+def _guardar_hash_contrasena(correo, hash_contrasena):
+    with escritura() as conn:
+        conn.execute(
+            'UPDATE usuarios SET contrasena = ? WHERE correo = ?',
+            (hash_contrasena, correo)
+        )
+
+
+#---------------FUNCIONES DE REPORTES---------------------------------------------------------------------------------------------------------
+
+@reintentar_si_bloqueada
+def crear_reporte(ubicacion, comentario, foto, lat=None, lng=None, categoria='Otros', direccion='', email=None, usuario_correo=None):
+    """
+    Crea un nuevo reporte.
+    Retorna el ID del reporte creado.
+    """
+    fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    with escritura() as conn:
+        cursor = conn.execute(
+            '''INSERT INTO reportes 
+               (ubicacion, direccion, comentario, foto, categoria, email, lat, lng, estado, fecha_creacion, usuario_correo)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'Pendiente', ?, ?)''',
+            (ubicacion, direccion, comentario, foto, categoria, email, lat, lng, fecha, usuario_correo)
+        )
+        _sumar_a_clusters(conn, lat, lng, 'Pendiente', 1)
+        _sumar_a_contadores(conn, 'Pendiente', categoria, fecha, 1)
+        _sumar_referencia_foto(conn, foto, 1)
+        reporte_id = cursor.lastrowid
+        # lo que se muestra en una tarjeta y un marcador (sin el email)
+        _registrar_evento(conn, 'creado', reporte_id, {
+            'ubicacion': ubicacion, 'direccion': direccion, 'comentario': comentario,
+            'foto': foto, 'categoria': categoria, 'estado': 'Pendiente',
+            'lat': lat, 'lng': lng, 'fecha_creacion': fecha,
+        })
+    _invalidar_cache_reporte(reporte_id, 'Pendiente')
+    return reporte_id
+
+
+# Columnas que recibe insertar_reportes_masivo, en este orden
+COLUMNAS_MASIVO = (
+    'ubicacion', 'direccion', 'comentario', 'foto', 'categoria', 'email',
+    'lat', 'lng', 'estado', 'razon_rechazo', 'fecha_creacion', 'usuario_correo',
+)
+
+
+# Trigger de inserción -> consulta que indexa de una vez los reportes con id > ?
+INDEXAR_MASIVO = {
+    'reportes_fts_insert':
+        '''INSERT INTO reportes_fts (rowid, comentario, direccion, ubicacion)
+           SELECT id, comentario, direccion, ubicacion FROM reportes WHERE id > ?''',
+    'reportes_rtree_insert':
+        '''INSERT INTO reportes_rtree (id, min_lng, max_lng, min_lat, max_lat)
+           SELECT id, lng, lng, lat, lat FROM reportes WHERE id > ?''',
+}
+
+
+def insertar_reportes_masivo(filas, cantidad_estimada=None):
+    """
+    Inserta muchos reportes en una sola transacción (generador de datos,
+    importaciones). `filas` es un iterable de tuplas con COLUMNAS_MASIVO;
+    se consume a medida que se inserta.
+
+    Las tablas derivadas quedan consistentes, igual que con crear_reporte,
+    pero se actualizan una vez por lote y no por fila:
+    - índices secundarios (INDICES_REPORTES) y reportes_fts: si la carga
+      es al menos tan grande como lo que ya hay (`cantidad_estimada`, o
+      len(filas); sin dato se asume que sí), los índices se borran durante
+      la carga y se vuelven a crear al final, y el índice de texto se
+      reconstruye con 'rebuild'. Armar un índice ordenando todas las filas
+      es varias veces más rápido que actualizarlo fila por fila. En cargas
+      chicas sobre una tabla grande se mantienen y solo se indexan las
+      filas nuevas
+    - reportes_rtree y reportes_fts: sus triggers de inserción se quitan
+      durante la carga (en la misma transacción) y las filas nuevas se
+      indexan con un solo INSERT ... SELECT
+    - version: cada reporte recibe una versión distinta y version_datos
+      queda en la última
+    - contadores_reportes y fotos: un recuento agrupado de las filas nuevas
+    - clusters_mapa: se agrupa en memoria por celda (ver _agrupar_clusters)
+    - eventos: uno solo, 'recargar', para que los navegadores conectados
+      vuelvan a pedir todo en lugar de recibir un evento por reporte
+    Retorna la cantidad insertada.
+    """
+    celdas = {}
+    ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    with escritura() as conn:
+        base = conn.execute('SELECT version FROM version_datos WHERE id = 1').fetchone()[0]
+        ultimo_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM reportes').fetchone()[0]
+
+        def con_version():
+            for i, fila in enumerate(filas, start=1):
+                _agrupar_clusters(celdas, fila[6], fila[7], fila[8])
+                yield (*fila, base + i, ahora)
+
+        if cantidad_estimada is None and hasattr(filas, '__len__'):
+            cantidad_estimada = len(filas)
+        existentes = conn.execute('SELECT COUNT(*) FROM reportes').fetchone()[0]
+        reconstruir = cantidad_estimada is None or cantidad_estimada >= existentes
+
+        triggers = conn.execute(
+            f'''SELECT name, sql FROM sqlite_master
+                WHERE type = 'trigger' AND name IN ({', '.join('?' * len(INDEXAR_MASIVO))})''',
+            tuple(INDEXAR_MASIVO)
+        ).fetchall()
+        for trigger in triggers:
+            conn.execute(f'DROP TRIGGER {trigger["name"]}')
+        if reconstruir:
+            for nombre in INDICES_REPORTES:
+                conn.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+        conn.executemany(
+            f'''INSERT INTO reportes ({', '.join(COLUMNAS_MASIVO)}, version, actualizado_en)
+                VALUES ({', '.join('?' * (len(COLUMNAS_MASIVO) + 2))})''',
+            con_version()
+        )
+        if reconstruir:
+            for nombre, definicion in INDICES_REPORTES.items():
+                conn.execute(f'CREATE INDEX {nombre} ON {definicion}')
+        for trigger in triggers:
+            if reconstruir and trigger['name'] == 'reportes_fts_insert':
+                conn.execute("INSERT INTO reportes_fts (reportes_fts) VALUES ('rebuild')")
+            else:
+                conn.execute(INDEXAR_MASIVO[trigger['name']], (ultimo_id,))
+            conn.execute(trigger['sql'])
+
+        cantidad = conn.execute(
+            'SELECT COUNT(*) FROM reportes WHERE id > ?', (ultimo_id,)
+        ).fetchone()[0]
+        if cantidad == 0:
+            return 0
+
+        # los mismos recuentos que reconstruir_contadores, solo de las filas nuevas
+        for tipo, sql in RECUENTOS.items():
+            sql_nuevas = sql.replace('FROM reportes', 'FROM reportes WHERE id > ?')
+            conn.execute(
+                f'''INSERT INTO contadores_reportes (tipo, clave, cantidad)
+                    SELECT ?, clave, cantidad FROM ({sql_nuevas})
+                    WHERE true
+                    ON CONFLICT (tipo, clave) DO UPDATE SET cantidad = cantidad + excluded.cantidad''',
+                (tipo, ultimo_id)
+            )
+        conn.execute(
+            '''INSERT INTO fotos (ruta, referencias)
+               SELECT foto, COUNT(*) FROM reportes WHERE id > ? GROUP BY foto
+               ON CONFLICT (ruta) DO UPDATE SET
+                   referencias = referencias + excluded.referencias, liberada_en = NULL''',
+            (ultimo_id,)
+        )
+        _guardar_clusters(conn, celdas)
+
+        conn.execute(
+            'UPDATE version_datos SET version = ?, actualizado_en = ? WHERE id = 1',
+            (base + cantidad, time.time())
+        )
+        version = _nueva_version(conn)
+        conn.execute(
+            "INSERT INTO eventos (version, tipo, reporte_id, datos) VALUES (?, 'recargar', 0, '{}')",
+            (version,)
+        )
+        conn.execute('DELETE FROM eventos WHERE version <= ?', (version - EVENTOS_RETENIDOS,))
+
+    invalidar('estadisticas', 'listado:Todos', *(f'listado:{e}' for e in COLUMNA_ESTADO))
+    return cantidad
+
+
+# Columnas de reportes que se pueden pedir con `campos` (proyección)
+CAMPOS_REPORTES = (
+    'id', 'ubicacion', 'direccion', 'comentario', 'foto', 'email', 'categoria',
+    'estado', 'razon_rechazo', 'lat', 'lng', 'fecha_creacion', 'usuario_correo',
+    'version', 'actualizado_en',
+)
+
+
+def obtener_reportes(estado=None, limite=None, despues_de=None, campos=None):
+    """
+    Obtiene los reportes, opcionalmente filtrados por estado, del más
+    reciente al más antiguo (orden estable por fecha_creacion, id).
+
+    Paginación por keyset: `despues_de` es la tupla (fecha_creacion, id) del
+    último reporte de la página anterior y `limite` la cantidad de filas.
+    `campos` limita las columnas del SELECT (ver CAMPOS_REPORTES); si
+    todas están en un índice, SQLite no lee las filas de la tabla.
+    Retorna una lista de diccionarios.
+    """
+    conn = get_db()
+
+    if campos:
+        invalidos = set(campos) - set(CAMPOS_REPORTES)
+        if invalidos:
+            raise ValueError(f'Campos no válidos: {", ".join(sorted(invalidos))}')
+        columnas = ', '.join(campos)
+    else:
+        columnas = '*'
+
+    condiciones = []
+    parametros = []
+
+    if estado and estado != 'Todos':
+        condiciones.append('estado = ?')
+        parametros.append(estado)
+
+    if despues_de:
+        fecha, ultimo_id = despues_de
+        # comparación de row values: usa el índice como rango
+        condiciones.append('(fecha_creacion, id) < (?, ?)')
+        parametros.extend([fecha, ultimo_id])
+
+    sql = f'SELECT {columnas} FROM reportes'
+    if condiciones:
+        sql += ' WHERE ' + ' AND '.join(condiciones)
+    sql += ' ORDER BY fecha_creacion DESC, id DESC'
+    if limite:
+        sql += ' LIMIT ?'
+        parametros.append(limite)
+
+    reportes = conn.execute(sql, parametros).fetchall()
+    
+    # Convertir Row objects a diccionarios
+    return [dict(r) for r in reportes]
+
+
+def exportar_reportes(estado=None, categoria=None, desde=None, hasta=None, lote=500):
+    """
+    Generador con todos los reportes que cumplen los filtros, del más
+    antiguo al más reciente. `desde` y `hasta` son fechas 'AAAA-MM-DD'
+    (ambas inclusive).
+
+    Las filas se leen del cursor de SQLite de a `lote` (fetchmany), así la
+    memoria no depende del tamaño de la tabla. Mientras el generador está
+    abierto la conexión mantiene una lectura activa: hay que consumirlo o
+    cerrarlo.
+    """
+    conn = get_db()
+
+    condiciones = []
+    parametros = []
+    if estado and estado != 'Todos':
+        condiciones.append('estado = ?')
+        parametros.append(estado)
+    if categoria:
+        condiciones.append('categoria = ?')
+        parametros.append(categoria)
+    if desde:
+        condiciones.append('fecha_creacion >= ?')
+        parametros.append(desde)
+    if hasta:
+        # hasta el final de ese día: fecha_creacion es 'AAAA-MM-DD HH:MM:SS'
+        condiciones.append("fecha_creacion < date(?, '+1 day')")
+        parametros.append(hasta)
+
+    sql = 'SELECT * FROM reportes'
+    if condiciones:
+        sql += ' WHERE ' + ' AND '.join(condiciones)
+    sql += ' ORDER BY fecha_creacion, id'
+
+    cursor = conn.execute(sql, parametros)
+    try:
+        while True:
+            filas = cursor.fetchmany(lote)
+            if not filas:
+                break
+            for fila in filas:
+                yield dict(fila)
+    finally:
+        cursor.close()
+
+
+def obtener_reportes_en_bbox(min_lng, min_lat, max_lng, max_lat, limite=None):
+    """
+    Reportes dentro de un rectángulo, resuelto con el índice R*Tree.
+    Retorna tuplas compactas (id, lat, lng, estado, categoria).
+    """
+    conn = get_db()
+    sql = '''SELECT r.id, r.lat, r.lng, r.estado, r.categoria
+             FROM reportes_rtree AS g
+             JOIN reportes AS r ON r.id = g.id
+             WHERE g.min_lng >= ? AND g.max_lng <= ?
+               AND g.min_lat >= ? AND g.max_lat <= ?'''
+    parametros = [min_lng, max_lng, min_lat, max_lat]
+    if limite:
+        sql += ' LIMIT ?'
+        parametros.append(limite)
+
+    return [tuple(r) for r in conn.execute(sql, parametros)]
+
+
+def buscar_reportes(texto, estado=None, limite=24, desplazamiento=0):
+    """
+    Busca reportes por texto en comentario, dirección y ubicación (FTS5),
+    del más relevante al menos relevante. Opcionalmente filtra por estado.
+    Se ordenan las BUSQUEDA_MAX_CANDIDATOS coincidencias más recientes (ya
+    filtradas por estado): el corte es el rowid de la última de ellas.
+    Retorna (lista de diccionarios, truncado); truncado es True si había
+    más coincidencias que no entraron en el ranking.
+    """
+    consulta = _consulta_fts(texto)
+    if consulta is None:
+        return [], False
+
+    conn = get_db()
+    filtro_estado = 'AND r.estado = :estado' if estado and estado != 'Todos' else ''
+    parametros = {
+        'consulta': consulta,
+        'candidatos': BUSQUEDA_MAX_CANDIDATOS - 1,
+        'estado': estado,
+        'limite': limite,
+        'desplazamiento': desplazamiento,
+    }
+
+    # rowid de la última coincidencia que entra; None si entran todas
+    corte = conn.execute(f'''
+        SELECT reportes_fts.rowid FROM reportes_fts
+        JOIN reportes r ON r.id = reportes_fts.rowid
+        WHERE reportes_fts MATCH :consulta {filtro_estado}
+        ORDER BY reportes_fts.rowid DESC LIMIT 1 OFFSET :candidatos
+    ''', parametros).fetchone()
+    truncado = corte is not None
+    if truncado:
+        # ¿hay alguna más vieja que quedó afuera?
+        truncado = conn.execute(f'''
+            SELECT 1 FROM reportes_fts
+            JOIN reportes r ON r.id = reportes_fts.rowid
+            WHERE reportes_fts MATCH :consulta AND reportes_fts.rowid < :corte {filtro_estado}
+            LIMIT 1
+        ''', {**parametros, 'corte': corte[0]}).fetchone() is not None
+    parametros['corte'] = corte[0] if corte else 0
+
+    reportes = conn.execute(f'''
+        SELECT r.* FROM reportes_fts
+        JOIN reportes r ON r.id = reportes_fts.rowid
+        WHERE reportes_fts MATCH :consulta
+        AND reportes_fts.rowid >= :corte
+        {filtro_estado}
+        ORDER BY reportes_fts.rank
+        LIMIT :limite OFFSET :desplazamiento
+    ''', parametros).fetchall()
+    return [dict(r) for r in reportes], truncado
+
+
+def obtener_reporte_por_id(reporte_id):
+    """Obtiene un reporte específico por su ID."""
+    conn = get_db()
+    reporte = conn.execute(
+        'SELECT * FROM reportes WHERE id = ?',
+        (reporte_id,)
+    ).fetchone()
+    return dict(reporte) if reporte else None
+
+
+@reintentar_si_bloqueada
+def actualizar_estado_reporte(reporte_id, nuevo_estado, razon_rechazo=None):
+    """
+    Actualiza el estado de un reporte.
+    Si el estado es 'Rechazado', debe incluir una razÃ³n.
+    """
+    with escritura() as conn:
+        anterior = conn.execute(
+            'SELECT lat, lng, estado FROM reportes WHERE id = ?', (reporte_id,)
+        ).fetchone()
+
+        if nuevo_estado == 'Rechazado':
+            conn.execute(
+                'UPDATE reportes SET estado = ?, razon_rechazo = ? WHERE id = ?',
+                (nuevo_estado, razon_rechazo, reporte_id)
+            )
+        else:
+            conn.execute(
+                'UPDATE reportes SET estado = ?, razon_rechazo = NULL WHERE id = ?',
+                (nuevo_estado, reporte_id)
+            )
+
+        # mover el reporte al desglose de su nuevo estado
+        if anterior and anterior['estado'] != nuevo_estado:
+            _sumar_a_clusters(conn, anterior['lat'], anterior['lng'], anterior['estado'], -1)
+            _sumar_a_clusters(conn, anterior['lat'], anterior['lng'], nuevo_estado, 1)
+            _sumar_contador(conn, 'estado', anterior['estado'], -1)
+            _sumar_contador(conn, 'estado', nuevo_estado, 1)
+        if anterior:
+            _registrar_evento(conn, 'estado', reporte_id, {
+                'estado': nuevo_estado,
+                'razon_rechazo': razon_rechazo if nuevo_estado == 'Rechazado' else None,
+            })
+
+    if anterior:
+        _invalidar_cache_reporte(reporte_id, anterior['estado'], nuevo_estado)
+
+
+@reintentar_si_bloqueada
+def actualizar_categoria_reporte(reporte_id, nueva_categoria):
+    """
+    Actualiza la categoria de un reporte (solo admin).
+    """
+    with escritura() as conn:
+        anterior = conn.execute(
+            'SELECT categoria, estado FROM reportes WHERE id = ?', (reporte_id,)
+        ).fetchone()
+        conn.execute(
+            'UPDATE reportes SET categoria = ? WHERE id = ?',
+            (nueva_categoria, reporte_id)
+        )
+        if anterior and anterior['categoria'] != nueva_categoria:
+            _sumar_contador(conn, 'categoria', anterior['categoria'], -1)
+            _sumar_contador(conn, 'categoria', nueva_categoria, 1)
+        if anterior:
+            _registrar_evento(conn, 'categoria', reporte_id, {'categoria': nueva_categoria})
+
+    if anterior:
+        _invalidar_cache_reporte(reporte_id, anterior['estado'])
+
+
+@reintentar_si_bloqueada
+def eliminar_reporte(reporte_id):
+    """
+    Elimina un reporte por su ID (solo admin).
+    Retorna True si se eliminÃ³, False si no existÃ­a.
+    """
+    with escritura() as conn:
+        anterior = conn.execute(
+            'SELECT lat, lng, estado, categoria, fecha_creacion, foto FROM reportes WHERE id = ?',
+            (reporte_id,)
+        ).fetchone()
+        cursor = conn.execute(
+            'DELETE FROM reportes WHERE id = ?',
+            (reporte_id,)
+        )
+        if anterior:
+            _sumar_a_clusters(conn, anterior['lat'], anterior['lng'], anterior['estado'], -1)
+            _sumar_a_contadores(
+                conn, anterior['estado'], anterior['categoria'], anterior['fecha_creacion'], -1
+            )
+            # el archivo lo borra luego el comando limpiar-fotos
+            _sumar_referencia_foto(conn, anterior['foto'], -1)
+            _registrar_evento(conn, 'eliminado', reporte_id)
+
+    if anterior:
+        _invalidar_cache_reporte(reporte_id, anterior['estado'])
+    eliminado = cursor.rowcount > 0
+    return eliminado
+
+
+def obtener_estadisticas(dias=30):
+    """
+    Obtiene estadÃ­sticas de reportes por estado.
+    Retorna un diccionario con el conteo de cada estado, más el desglose
+    por categoría y por día (últimos `dias`). Lee los contadores
+    precalculados: no recorre la tabla reportes.
+    """
+    conn = get_db()
+    
+    stats = {
+        'Pendiente': 0,
+        'Verificando': 0,
+        'Solucionado': 0,
+        'Rechazado': 0,
+        'Total': 0,
+        'Categorias': {},
+        'PorDia': {}
+    }
+    
+    desde = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+    resultados = conn.execute(
+        '''SELECT tipo, clave, cantidad
+           FROM contadores_reportes
+           WHERE tipo IN ('total', 'estado', 'categoria')
+              OR (tipo = 'dia' AND clave >= ?)''',
+        (desde,)
+    ).fetchall()
+    
+    for row in resultados:
+        tipo, clave, cantidad = row['tipo'], row['clave'], row['cantidad']
+        if cantidad <= 0:
+            continue
+        if tipo == 'total':
+            stats['Total'] = cantidad
+        elif tipo == 'estado' and clave in stats:
+            stats[clave] = cantidad
+        elif tipo == 'categoria':
+            stats['Categorias'][clave] = cantidad
+        elif tipo == 'dia':
+            stats['PorDia'][clave] = cantidad
+    
     return stats
\ No newline at end of file
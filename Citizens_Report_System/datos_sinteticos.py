@@ -0,0 +1,188 @@
+"""
+Generador de reportes sintéticos para pruebas de carga y benchmarks.
+
+Produce filas con COLUMNAS_MASIVO (database.py) listas para
+insertar_reportes_masivo:
+- ubicación: la mayoría agrupada en barrios alrededor del centro del mapa
+  (-25.2575, -57.5864), con barrios más cargados que otros, y el resto
+  dispersa por el área metropolitana
+- categoría y estado con distribuciones desparejas; los reportes viejos
+  están casi todos solucionados o rechazados
+- fecha_creacion repartida en `anios` años, en orden creciente (como si
+  se hubieran creado de a uno), con más reportes de día que de noche
+
+Todo sale de un random.Random con `semilla`: la misma semilla genera los
+mismos datos.
+"""
+import hashlib
+import io
+import os
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from imagenes import generar_variantes
+
+# Pillow es opcional: solo hace falta para las fotos de ejemplo
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+CENTRO = (-25.2575, -57.5864)
+# Cantidad de barrios (centros de agrupamiento) y fracción de reportes dispersos
+BARRIOS = 40
+FRACCION_DISPERSOS = 0.1
+
+# Pesos relativos: unas pocas categorías concentran la mayoría
+PESOS_CATEGORIA = {
+    'Vías y Tránsito': 30,
+    'Residuos y Limpieza': 22,
+    'Alumbrado Público': 15,
+    'Agua y Saneamiento': 10,
+    'Seguridad Urbana': 7,
+    'Parques y Espacios Públicos': 5,
+    'Transporte Público': 4,
+    'Electricidad y Telecomunicaciones': 3,
+    'Edificaciones Públicas': 2,
+    'Otros': 2,
+}
+# Estado según la antigüedad: los recientes siguen abiertos
+PESOS_ESTADO_RECIENTE = {'Pendiente': 60, 'Verificando': 25, 'Solucionado': 10, 'Rechazado': 5}
+PESOS_ESTADO_ANTIGUO = {'Pendiente': 8, 'Verificando': 4, 'Solucionado': 73, 'Rechazado': 15}
+DIAS_RECIENTE = 60
+# Peso por hora del día (0-23)
+PESOS_HORA = [1, 1, 1, 1, 1, 2, 4, 7, 9, 9, 8, 8, 7, 7, 8, 8, 8, 7, 6, 5, 4, 3, 2, 1]
+
+CALLES = [
+    'Mcal. López', 'España', 'Eusebio Ayala', 'Artigas', 'Fernando de la Mora',
+    'Sacramento', 'Perú', 'Brasilia', 'Mcal. Estigarribia', 'Palma', 'Aviadores del Chaco',
+    'Santísima Trinidad', 'República Argentina', 'Mburucuyá', 'Denis Roa', 'Choferes del Chaco',
+]
+REFERENCIAS = [
+    'frente a la escuela', 'cerca de la parada', 'en la esquina', 'al lado del almacén',
+    'frente a la plaza', 'detrás del supermercado', 'junto a la iglesia', 'cerca del semáforo',
+]
+DESCRIPCIONES = {
+    'Vías y Tránsito': ['Bache profundo en la calzada', 'Semáforo sin funcionar', 'Falta señalización'],
+    'Residuos y Limpieza': ['Basura acumulada en la vereda', 'Vertedero clandestino', 'Contenedor desbordado'],
+    'Alumbrado Público': ['Foco quemado hace semanas', 'Poste de luz inclinado', 'Cuadra entera a oscuras'],
+    'Agua y Saneamiento': ['Caño roto pierde agua', 'Desagüe tapado', 'Raudal no escurre'],
+    'Seguridad Urbana': ['Zona sin iluminación y peligrosa', 'Terreno baldío abandonado'],
+    'Parques y Espacios Públicos': ['Juegos infantiles rotos', 'Pasto sin cortar en la plaza'],
+    'Transporte Público': ['Parada sin techo', 'Refugio destruido'],
+    'Electricidad y Telecomunicaciones': ['Cables sueltos colgando', 'Poste caído'],
+    'Edificaciones Públicas': ['Fachada con desprendimientos', 'Baños públicos clausurados'],
+    'Otros': ['Animal suelto en la vía', 'Ruidos molestos constantes'],
+}
+RAZONES_RECHAZO = ['Reporte duplicado', 'Fuera de la jurisdicción municipal', 'Información insuficiente']
+
+
+def _elector(rng, opciones, pesos):
+    """Función que elige una opción según los pesos (más rápida que rng.choices)."""
+    acumulados = list(accumulate(pesos))
+    total = acumulados[-1]
+    azar = rng.random
+
+    def elegir():
+        return opciones[bisect(acumulados, azar() * total)]
+    return elegir
+
+
+def generar_reportes(cantidad, anios=3, fotos=('sin_foto.jpg',), semilla=1, hasta=None):
+    """
+    Generador de `cantidad` tuplas con COLUMNAS_MASIVO, de la más antigua
+    a la más reciente, terminando en `hasta` (por defecto, ahora). Usa
+    memoria constante: se puede pasar directo a insertar_reportes_masivo.
+    """
+    rng = random.Random(semilla)
+    hasta = hasta or datetime.now()
+    desde = hasta - timedelta(days=365 * anios)
+
+    # barrios: centro, dispersión (grados) y peso (unos pocos concentran más)
+    barrios = [
+        (rng.gauss(CENTRO[0], 0.05), rng.gauss(CENTRO[1], 0.05), rng.uniform(0.002, 0.012))
+        for _ in range(BARRIOS)
+    ]
+    elegir_barrio = _elector(rng, barrios, [1 / (i + 1) for i in range(BARRIOS)])
+    elegir_categoria = _elector(rng, list(PESOS_CATEGORIA), PESOS_CATEGORIA.values())
+    elegir_estado_reciente = _elector(rng, list(PESOS_ESTADO_RECIENTE), PESOS_ESTADO_RECIENTE.values())
+    elegir_estado_antiguo = _elector(rng, list(PESOS_ESTADO_ANTIGUO), PESOS_ESTADO_ANTIGUO.values())
+    elegir_hora = _elector(rng, range(24), PESOS_HORA)
+    usuarios = [f'vecino{i}@ejemplo.com' for i in range(max(1, cantidad // 20))]
+    azar, gauss, elegir = rng.random, rng.gauss, rng.choice
+
+    # días en orden: a cada día le toca su parte proporcional de los
+    # reportes, también si hay menos reportes que días
+    dias = (hasta - desde).days or 1
+    for dia in range(dias):
+        fecha_dia = desde + timedelta(days=dia)
+        prefijo = fecha_dia.strftime('%Y-%m-%d')
+        antiguo = dias - dia > DIAS_RECIENTE
+        n = (dia + 1) * cantidad // dias - dia * cantidad // dias
+        segundos = sorted(elegir_hora() * 3600 + rng.randrange(3600) for _ in range(n))
+        for segundo in segundos:
+            minutos, segundo = divmod(segundo, 60)
+            fecha = f'{prefijo} {minutos // 60:02d}:{minutos % 60:02d}:{segundo:02d}'
+            if azar() < FRACCION_DISPERSOS:
+                lat = CENTRO[0] + (azar() - 0.5) * 0.3
+                lng = CENTRO[1] + (azar() - 0.5) * 0.3
+            else:
+                lat_b, lng_b, dispersion = elegir_barrio()
+                lat = gauss(lat_b, dispersion)
+                lng = gauss(lng_b, dispersion)
+
+            categoria = elegir_categoria()
+            estado = elegir_estado_antiguo() if antiguo else elegir_estado_reciente()
+            i = int(azar() * len(CALLES))
+            calle = CALLES[i]
+            esquina = CALLES[(i + 1 + int(azar() * (len(CALLES) - 1))) % len(CALLES)]
+            correo = elegir(usuarios)
+
+            yield (
+                f'{calle} {elegir(REFERENCIAS)}',
+                f'{calle} c/ {esquina}, Asunción',
+                f'{elegir(DESCRIPCIONES[categoria])} ({calle} y {esquina})',
+                elegir(fotos),
+                categoria,
+                correo,
+                round(lat, 6),
+                round(lng, 6),
+                estado,
+                elegir(RAZONES_RECHAZO) if estado == 'Rechazado' else None,
+                fecha,
+                correo,
+            )
+
+
+def crear_fotos_de_ejemplo(carpeta, cantidad, semilla=1):
+    """
+    Crea `cantidad` fotos JPEG de relleno (un color y un número) con sus
+    variantes, guardadas por contenido como las subidas
+    (ab/cd/<sha256>.jpg). Retorna sus rutas relativas a `carpeta`.
+    Requiere Pillow.
+    """
+    if Image is None:
+        raise RuntimeError('Las fotos de ejemplo requieren Pillow (pip install Pillow)')
+
+    rng = random.Random(semilla)
+    rutas = []
+    for i in range(cantidad):
+        color = tuple(rng.randrange(60, 200) for _ in range(3))
+        imagen = Image.new('RGB', (1024, 768), color)
+        ImageDraw.Draw(imagen).text((40, 40), f'Reporte de ejemplo #{i + 1}', fill=(255, 255, 255))
+        datos = io.BytesIO()
+        imagen.save(datos, 'JPEG', quality=80)
+        datos = datos.getvalue()
+
+        digest = hashlib.sha256(datos).hexdigest()
+        ruta = f'{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        destino = os.path.join(carpeta, ruta)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            with open(destino, 'wb') as f:
+                f.write(datos)
+            generar_variantes(destino)
+        rutas.append(ruta)
+    return rutas
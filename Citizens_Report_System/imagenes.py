@@ -0,0 +1,69 @@
+import os
+
+# Pillow es opcional: sin él se sirven solo las fotos originales
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Variantes que se generan junto a cada foto: sufijo -> lado mayor en px
+VARIANTES = {
+    'miniatura': 480,    # tarjetas de la lista
+    'mediana': 1280,     # modal de detalle
+}
+CALIDAD_WEBP = 80
+
+
+def nombre_variante(foto, variante):
+    """Nombre de archivo de una variante: foto.jpg -> foto_miniatura.webp"""
+    base = os.path.splitext(foto)[0]
+    return f'{base}_{variante}.webp'
+
+
+def es_variante(nombre):
+    """True si el archivo es una variante generada y no una foto original."""
+    return any(nombre.endswith(f'_{variante}.webp') for variante in VARIANTES)
+
+
+def urls_foto(foto, prefijo='/static/uploads'):
+    """URLs de la foto original y de sus variantes."""
+    urls = {'original': f'{prefijo}/{foto}'}
+    for variante in VARIANTES:
+        urls[variante] = f'{prefijo}/{nombre_variante(foto, variante)}'
+    return urls
+
+
+def generar_variantes(ruta_original, estricto=False):
+    """
+    Genera las variantes WebP reducidas junto a la foto original.
+    Retorna la lista de rutas creadas (vacía si Pillow no está instalado
+    o la imagen no se pudo leer). Con `estricto` (worker de tareas) esos
+    casos lanzan la excepción, para que la tarea se reintente o quede
+    fallida en vez de darse por completada.
+    """
+    if Image is None:
+        if estricto:
+            raise RuntimeError('Las variantes de fotos requieren Pillow (pip install Pillow)')
+        return []
+
+    carpeta, foto = os.path.split(ruta_original)
+    creadas = []
+    try:
+        with Image.open(ruta_original) as imagen:
+            # respetar la orientación EXIF de las fotos de celular
+            imagen = ImageOps.exif_transpose(imagen)
+            if imagen.mode not in ('RGB', 'RGBA'):
+                imagen = imagen.convert('RGB')
+
+            for variante, lado in VARIANTES.items():
+                copia = imagen.copy()
+                copia.thumbnail((lado, lado))
+                destino = os.path.join(carpeta, nombre_variante(foto, variante))
+                copia.save(destino, 'WEBP', quality=CALIDAD_WEBP, method=4)
+                creadas.append(destino)
+    except (OSError, ValueError) as e:
+        if estricto:
+            raise
+        print(f"✗ No se pudieron generar variantes de {foto}: {e}")
+
+    return creadas
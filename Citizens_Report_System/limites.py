@@ -0,0 +1,328 @@
+"""
+Límites de peticiones (token bucket) y descarte de carga.
+
+Límites por ruta: cada ruta decorada con @limitar('<nombre>') tiene un
+balde por IP y, si hay sesión, otro por usuario. Un balde de "N/S" admite
+ráfagas de N peticiones y se rellena a N cada S segundos. Sin fichas se
+responde 429 con Retry-After. Los valores por defecto están en LIMITES y
+se cambian con variables de entorno LIMITE_<NOMBRE>_<IP|SESION>
+(p. ej. LIMITE_LOGIN_IP=5/60; 0 lo desactiva).
+
+Backends de los baldes (variable LIMITES_BACKEND), como en cache.py:
+- local:  en memoria del proceso; con varios workers cada uno cuenta lo suyo.
+- sqlite: archivo LIMITES_PATH compartido por los workers de la máquina.
+- redis:  servidor LIMITES_URL, compartido entre máquinas (paquete `redis`).
+Si el backend compartido falla se deja pasar la petición.
+
+Descarte de carga: con CARGA_MAX_EN_CURSO > 0, cuando un proceso ya está
+atendiendo esa cantidad de peticiones las nuevas reciben 503 con
+Retry-After enseguida, en vez de esperar detrás de las demás. Las
+conexiones largas (eventos, exportación) y los estáticos no cuentan.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, make_response, render_template, request, session
+from werkzeug.wsgi import ClosingIterator
+
+# redis es opcional: solo hace falta con LIMITES_BACKEND=redis
+try:
+    import redis
+except ImportError:
+    redis = None
+
+LIMITES_BACKEND = os.environ.get('LIMITES_BACKEND', 'local').lower()
+# Junto al código, como DB_PATH y CACHE_PATH: el mismo archivo para todos
+# los workers aunque arranquen desde otra carpeta
+LIMITES_PATH = os.environ.get(
+    'LIMITES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'limites.sqlite3')
+)
+LIMITES_URL = os.environ.get('LIMITES_URL', os.environ.get('CACHE_URL', 'redis://localhost:6379/0'))
+# Baldes que guarda el backend local antes de descartar los menos usados
+LIMITES_MAX_CLAVES = int(os.environ.get('LIMITES_MAX_CLAVES', 10000))
+
+CARGA_MAX_EN_CURSO = int(os.environ.get('CARGA_MAX_EN_CURSO', 0))
+# Rutas que no cuentan para el descarte de carga (/api/eventos tiene su
+# propio tope, EVENTOS_MAX_CONEXIONES en app.py)
+CARGA_EXENTAS = ('/static/', '/api/eventos', '/api/reportes/exportar')
+
+# Límites por defecto: nombre -> {'ip': 'N/S', 'sesion': 'N/S'}
+LIMITES = {
+    'login': {'ip': '10/60'},
+    'registro': {'ip': '5/3600'},
+    'crear_reporte': {'ip': '30/3600', 'sesion': '10/600'},
+}
+
+
+def leer_tasa(texto):
+    """'N/S' -> (capacidad, fichas por segundo), o None si está desactivado."""
+    if not texto or texto == '0':
+        return None
+    cantidad, segundos = texto.split('/')
+    capacidad = float(cantidad)
+    return capacidad, capacidad / float(segundos)
+
+
+def tasa_configurada(nombre, tipo):
+    """Tasa de la ruta `nombre` para el balde `tipo` ('ip' o 'sesion')."""
+    variable = f'LIMITE_{nombre.upper()}_{tipo.upper()}'
+    return leer_tasa(os.environ.get(variable, LIMITES.get(nombre, {}).get(tipo)))
+
+
+def _rellenar(fichas, actualizado, capacidad, por_segundo, ahora):
+    return min(capacidad, fichas + (ahora - actualizado) * por_segundo)
+
+
+class LimitadorBase:
+    """
+    Cada backend implementa _consumir(clave, capacidad, por_segundo, ahora),
+    que retorna los segundos a esperar (0 si la petición pasa).
+    """
+
+    nombre = None
+
+    def consumir(self, clave, capacidad, por_segundo):
+        try:
+            return self._consumir(clave, capacidad, por_segundo, time.time())
+        except Exception as e:
+            # un backend caído no debe tumbar la API: se deja pasar
+            print(f"✗ Error en el límite de peticiones ({self.nombre}): {e}")
+            return 0
+
+
+class LimitadorLocal(LimitadorBase):
+    """Baldes en un OrderedDict del proceso, con tope de claves (LRU)."""
+
+    nombre = 'local'
+
+    def __init__(self, max_claves=LIMITES_MAX_CLAVES):
+        self.max_claves = max_claves
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _consumir(self, clave, capacidad, por_segundo, ahora):
+        with self._lock:
+            fichas, actualizado = self._baldes.pop(clave, (capacidad, ahora))
+            fichas = _rellenar(fichas, actualizado, capacidad, por_segundo, ahora)
+            espera = 0 if fichas >= 1 else (1 - fichas) / por_segundo
+            if not espera:
+                fichas -= 1
+            self._baldes[clave] = (fichas, ahora)
+            while len(self._baldes) > self.max_claves:
+                self._baldes.popitem(last=False)
+            return espera
+
+
+class LimitadorSQLite(LimitadorBase):
+    """
+    Baldes en un archivo SQLite compartido por los procesos de la máquina.
+    Cada consumo es una transacción corta (leer, rellenar, descontar).
+    """
+
+    nombre = 'sqlite'
+    # cada tanto se borran los baldes sin uso en la última hora
+    PURGAR_CADA = 1000
+
+    def __init__(self, ruta=LIMITES_PATH):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._consumos = 0
+        self._conexion().execute('''
+            CREATE TABLE IF NOT EXISTS limites (
+                clave       TEXT PRIMARY KEY,
+                fichas      REAL NOT NULL,
+                actualizado REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+
+    def _conexion(self):
+        # una conexión por hilo y por proceso, como CacheSQLite
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _consumir(self, clave, capacidad, por_segundo, ahora):
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            fila = conn.execute(
+                'SELECT fichas, actualizado FROM limites WHERE clave = ?', (clave,)
+            ).fetchone()
+            fichas, actualizado = fila if fila else (capacidad, ahora)
+            fichas = _rellenar(fichas, actualizado, capacidad, por_segundo, ahora)
+            espera = 0 if fichas >= 1 else (1 - fichas) / por_segundo
+            if not espera:
+                fichas -= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO limites (clave, fichas, actualizado) VALUES (?, ?, ?)',
+                (clave, fichas, ahora)
+            )
+            self._consumos += 1
+            if self._consumos % self.PURGAR_CADA == 0:
+                conn.execute('DELETE FROM limites WHERE actualizado < ?', (ahora - 3600,))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return espera
+
+
+class LimitadorRedis(LimitadorBase):
+    """
+    Baldes en un servidor con protocolo de Redis. El consumo es un script
+    Lua, atómico en el servidor; cada balde vence cuando ya estaría lleno.
+    """
+
+    nombre = 'redis'
+    PREFIJO = 'limite:'
+    SCRIPT = '''
+        local capacidad = tonumber(ARGV[1])
+        local por_segundo = tonumber(ARGV[2])
+        local ahora = tonumber(ARGV[3])
+        local balde = redis.call('HMGET', KEYS[1], 'fichas', 'actualizado')
+        local fichas = tonumber(balde[1]) or capacidad
+        local actualizado = tonumber(balde[2]) or ahora
+        fichas = math.min(capacidad, fichas + (ahora - actualizado) * por_segundo)
+        local espera = 0
+        if fichas >= 1 then
+            fichas = fichas - 1
+        else
+            espera = (1 - fichas) / por_segundo
+        end
+        redis.call('HSET', KEYS[1], 'fichas', fichas, 'actualizado', ahora)
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / por_segundo) + 1)
+        return tostring(espera)
+    '''
+
+    def __init__(self, url=LIMITES_URL, cliente=None):
+        if cliente is None:
+            if redis is None:
+                raise RuntimeError('LIMITES_BACKEND=redis requiere el paquete redis (pip install redis)')
+            cliente = redis.Redis.from_url(url)
+        self._redis = cliente
+        self._script = cliente.register_script(self.SCRIPT)
+
+    def _consumir(self, clave, capacidad, por_segundo, ahora):
+        return float(self._script(keys=[self.PREFIJO + clave], args=[capacidad, por_segundo, ahora]))
+
+
+def crear_limitador(backend=LIMITES_BACKEND):
+    """Crea el limitador del backend indicado ('local', 'sqlite' o 'redis')."""
+    if backend == 'local':
+        return LimitadorLocal()
+    if backend == 'sqlite':
+        return LimitadorSQLite()
+    if backend == 'redis':
+        return LimitadorRedis()
+    raise ValueError(f'LIMITES_BACKEND no válido: {backend!r} (local, sqlite o redis)')
+
+
+_limitador = None
+_limitador_lock = threading.Lock()
+
+
+def obtener_limitador():
+    """Limitador del proceso; se crea al primer uso (importar no abre nada)."""
+    global _limitador
+    with _limitador_lock:
+        if _limitador is None:
+            _limitador = crear_limitador()
+        return _limitador
+
+
+def limitar(nombre, plantilla=None, metodos=('POST',)):
+    """
+    Aplica a la ruta los baldes configurados para `nombre` (solo en los
+    `metodos` indicados: ver el formulario de login no gasta fichas). Al
+    agotarse responde 429 con Retry-After: JSON, o la `plantilla` con el error.
+    """
+    def decorador(f):
+        @wraps(f)
+        def decorado(*args, **kwargs):
+            if request.method not in metodos:
+                return f(*args, **kwargs)
+            claves = []
+            tasa_ip = tasa_configurada(nombre, 'ip')
+            if tasa_ip:
+                claves.append((f'{nombre}:ip:{request.remote_addr}', tasa_ip))
+            tasa_sesion = tasa_configurada(nombre, 'sesion')
+            if tasa_sesion and 'correo' in session:
+                claves.append((f'{nombre}:sesion:{session["correo"]}', tasa_sesion))
+
+            limitador = obtener_limitador()
+            espera = max((limitador.consumir(clave, *tasa) for clave, tasa in claves), default=0)
+            if espera:
+                return _demasiadas_peticiones(plantilla, espera)
+            return f(*args, **kwargs)
+        return decorado
+    return decorador
+
+
+def _demasiadas_peticiones(plantilla, espera):
+    mensaje = 'Demasiadas peticiones. Intenta de nuevo más tarde.'
+    if plantilla:
+        respuesta = make_response(render_template(plantilla, error=mensaje), 429)
+    else:
+        respuesta = make_response(jsonify({'error': mensaje}), 429)
+    respuesta.headers['Retry-After'] = str(math.ceil(espera))
+    return respuesta
+
+
+class ControlCarga:
+    """
+    Middleware WSGI que cuenta las peticiones en curso del proceso y
+    responde 503 a las que superan `maximo`. La petición deja de contar
+    cuando el servidor cierra la respuesta (también si es un stream).
+    """
+
+    def __init__(self, wsgi_app, maximo, exentas=CARGA_EXENTAS):
+        self.wsgi_app = wsgi_app
+        self.maximo = maximo
+        self.exentas = exentas
+        self.en_curso = 0
+        self.descartadas = 0
+        self._lock = threading.Lock()
+
+    def _terminar(self):
+        with self._lock:
+            self.en_curso -= 1
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(self.exentas):
+            return self.wsgi_app(environ, start_response)
+
+        with self._lock:
+            ocupado = self.en_curso >= self.maximo
+            if ocupado:
+                self.descartadas += 1
+            else:
+                self.en_curso += 1
+        if ocupado:
+            start_response('503 Service Unavailable', [
+                ('Content-Type', 'application/json'),
+                ('Retry-After', '1'),
+            ])
+            return [b'{"error": "Servidor ocupado, intenta de nuevo en unos segundos"}']
+
+        try:
+            return ClosingIterator(self.wsgi_app(environ, start_response), self._terminar)
+        except BaseException:
+            self._terminar()
+            raise
+
+
+def instalar_limites(app):
+    """Activa el descarte de carga si CARGA_MAX_EN_CURSO > 0."""
+    if CARGA_MAX_EN_CURSO > 0:
+        app.wsgi_app = ControlCarga(app.wsgi_app, CARGA_MAX_EN_CURSO)
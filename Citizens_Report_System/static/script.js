@@ -1,753 +1,1054 @@
-// ═══════════════════════════════════════════════════════════════════════════
-// NAVEGACIÓN ENTRE SECCIONES
-// ═══════════════════════════════════════════════════════════════════════════
-let map;
-let marker;
-let mapaReportes;
-let marcadoresReportes = [];
-
-function mostrarSeccion(nombre) {
-    // ─── Ocultar todas las secciones ───
-    document.querySelectorAll('.seccion').forEach(s => {
-        s.classList.remove('active');
-    });
-
-    // ─── Mostrar la sección actual ───
-    const seccion = document.getElementById(`seccion-${nombre}`);
-    if (seccion) {
-        seccion.classList.add('active');
-    }
-
-    // ─── Actualizar botón activo del navbar ───
-    document.querySelectorAll('.nav-btn').forEach(btn => {
-        btn.classList.remove('active');
-    });
-
-    const btnActivo = document.querySelector(
-        `.nav-btn[data-seccion="${nombre}"]`
-    );
-    if (btnActivo) {
-        btnActivo.classList.add('active');
-    }
-
-    // ─── Acciones especiales por sección ───
-    if (nombre === 'crear') {
-        setTimeout(() => {
-            initMap();
-            map?.invalidateSize(true);
-        }, 100);
-    }
-
-    if (nombre === 'lista') {
-        cargarReportes();
-    }
-
-    if (nombre === 'analiticas') {
-        cargarAnaliticas();
-    }
-    if (nombre === 'mapa') {
-    setTimeout(() => {
-        initMapaReportes();
-        mapaReportes.invalidateSize(true);
-        cargarReportesEnMapa();
-    }, 150);
-}
-
-}
-
-
-function initMap() {
-    // Don't initialize if map already exists
-    if (map) return;
-    
-    // Ensure map container exists and is visible
-    const mapContainer = document.getElementById('map');
-    if (!mapContainer || mapContainer.offsetParent === null) {
-        return;
-    }
-    
-    map = L.map('map').setView([-25.257574,-57.586483], 13);
-
-    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
-        attribution: '&copy; OpenStreetMap contributors',
-        maxZoom: 19,
-        minZoom: 2
-    }).addTo(map);
-
-    map.on('click', function (e) {
-        const { lat, lng } = e.latlng;
-
-        if (marker) {
-            marker.setLatLng(e.latlng);
-        } else {
-            marker = L.marker(e.latlng).addTo(map);
-        }
-
-        document.getElementById('lat').value = lat;
-        document.getElementById('lng').value = lng;
-    });
-    
-    // Force redraw after initialization
-    setTimeout(() => {
-        map.invalidateSize(true);
-    }, 100);
-}
-
-// Initialize on page load
-document.addEventListener('DOMContentLoaded', function() {
-    // Show first section - Reportes
-    mostrarSeccion('lista');
-    
-    // Initialize filters
-    const filtroEstado = document.getElementById('filtro-estado');
-    if (filtroEstado) {
-        filtroEstado.addEventListener('change', cargarReportes);
-    }
-});
-
-function initMapaReportes() {
-    if (mapaReportes) return;
-
-    mapaReportes = L.map('mapa-reportes')
-        .setView([-25.2637, -57.5759], 12); // Asunción
-
-    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
-        attribution: '&copy; OpenStreetMap contributors'
-    }).addTo(mapaReportes);
-}
-
-// ═══════════════════════════════════════════════════════════════════════════
-// CREAR REPORTE
-// ═══════════════════════════════════════════════════════════════════════════
-
-document.addEventListener('DOMContentLoaded', function() {
-    const formCrear = document.getElementById('form-crear-reporte');
-    if (formCrear) {
-        formCrear.addEventListener('submit', async function(e) {
-            e.preventDefault();
-            
-            const mensajeDiv = document.getElementById('mensaje-crear');
-            const btnSubmit = this.querySelector('button[type="submit"]');
-            
-            // Validaciones del lado del cliente
-            const lat = document.getElementById('lat')?.value;
-            const lng = document.getElementById('lng')?.value;
-            const ubicacion = document.getElementById('ubicacion').value.trim();
-            const comentario = document.getElementById('comentario').value.trim();
-            const foto = document.getElementById('foto').files[0];
-            
-            if (!lat || !lng) {
-                mostrarMensaje(mensajeDiv, 'Debes seleccionar una ubicación en el mapa', 'error');
-                return;
-            }
-            
-            if (comentario.length < 10) {
-                mostrarMensaje(mensajeDiv, 'El comentario debe tener al menos 10 caracteres', 'error');
-                return;
-            }
-            
-            if (!foto) {
-                mostrarMensaje(mensajeDiv, 'Debes seleccionar una foto', 'error');
-                return;
-            }
-            
-            // Validar tamaño de archivo (25MB)
-            if (foto.size > 25 * 1024 * 1024) {
-                mostrarMensaje(
-                    mensajeDiv,
-                    'La foto no debe superar los 25MB',
-                    'error'
-                );
-                return;
-            }
-            
-            // Preparar FormData
-            const formData = new FormData(this);
-            
-            // Deshabilitar botón mientras se envía
-            btnSubmit.disabled = true;
-            btnSubmit.textContent = 'Enviando...';
-            
-            try {
-                // Obtener dirección desde coordenadas (reverse geocoding)
-                const direccion = await obtenerDireccionDesdeCoords(lat, lng);
-                formData.append('direccion', direccion);
-                
-                btnSubmit.textContent = 'Enviando...';
-                
-                const response = await fetch('/api/reportes', {
-                    method: 'POST',
-                    body: formData
-                });
-                
-                const data = await response.json();
-                
-                if (response.ok) {
-                    mostrarMensaje(mensajeDiv, `✅ Reporte creado exitosamente!\n\n📍 Ubicación: ${direccion}`, 'exito');
-                    // Limpiar formulario
-                    this.reset();
-                    // Resetear marcador del mapa
-                    if (marker) {
-                        map.removeLayer(marker);
-                        marker = null;
-                    }
-                    document.getElementById('lat').value = '';
-                    document.getElementById('lng').value = '';
-                    // Después de 2 segundos, ir a ver reportes
-                    setTimeout(() => {
-                        mostrarSeccion('lista');
-                    }, 2000);
-                } else {
-                    mostrarMensaje(mensajeDiv, '❌ ' + data.error, 'error');
-                }
-            } catch (error) {
-                mostrarMensaje(mensajeDiv, '❌ Error al conectar con el servidor', 'error');
-            } finally {
-                btnSubmit.disabled = false;
-                btnSubmit.textContent = 'Enviar Reporte';
-            }
-        });
-    }
-});
-
-// ═══════════════════════════════════════════════════════════════════════════
-// CARGAR Y MOSTRAR REPORTES
-// ═══════════════════════════════════════════════════════════════════════════
-
-async function cargarReportes() {
-    const estado = document.getElementById('filtro-estado').value;
-    const container = document.getElementById('lista-reportes');
-    
-    container.innerHTML = '<p class="cargando">Cargando reportes...</p>';
-    
-    try {
-        const url = estado === 'Todos' 
-            ? '/api/reportes' 
-            : `/api/reportes?estado=${encodeURIComponent(estado)}`;
-            
-        const response = await fetch(url);
-        const reportes = await response.json();
-        
-        if (reportes.length === 0) {
-            container.innerHTML = '<p class="cargando">No hay reportes para mostrar.</p>';
-            return;
-        }
-        
-        // Renderizar reportes
-        container.innerHTML = '';
-        reportes.forEach(reporte => {
-            const card = crearTarjetaReporte(reporte);
-            container.appendChild(card);
-        });
-        
-    } catch (error) {
-        container.innerHTML = '<p class="cargando">Error al cargar reportes.</p>';
-    }
-}
-
-function obtenerIconoCategoria(categoria) {
-    const iconos = {
-        'Vías y Tránsito': '🚗',
-        'Alumbrado Público': '💡',
-        'Agua y Saneamiento': '💧',
-        'Residuos y Limpieza': '🗑️',
-        'Parques y Espacios Públicos': '🌳',
-        'Electricidad y Telecomunicaciones': '⚡',
-        'Edificaciones Públicas': '🏢',
-        'Seguridad Urbana': '🚨',
-        'Transporte Público': '🚌',
-        'Otros': '📌'
-    };
-    return iconos[categoria] || '📌';
-}
-
-function crearTarjetaReporte(reporte) {
-    const card = document.createElement('div');
-    card.className = 'reporte-card';
-    card.onclick = () => verDetalleReporte(reporte.id);
-    
-    const estadoClass = `estado-${reporte.estado.toLowerCase()}`;
-    const categoriaIcon = obtenerIconoCategoria(reporte.categoria);
-    
-    card.innerHTML = `
-        <img src="/static/uploads/${reporte.foto}" alt="Foto del reporte" class="reporte-imagen" onerror="this.src='data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 width=%22300%22 height=%22200%22%3E%3Crect fill=%22%23ddd%22 width=%22300%22 height=%22200%22/%3E%3Ctext x=%2250%25%22 y=%2250%25%22 font-size=%2218%22 text-anchor=%22middle%22 fill=%22%23999%22%3ESin imagen%3C/text%3E%3C/svg%3E'">
-        <div class="reporte-contenido">
-            <div class="reporte-categoria">${categoriaIcon} ${escapeHtml(reporte.categoria)}</div>
-            <div class="reporte-comentario">${escapeHtml(reporte.comentario)}</div>
-            <div class="reporte-direccion">${escapeHtml(reporte.direccion)}</div>
-            <div class="reporte-footer">
-                <span class="reporte-estado ${estadoClass}">${reporte.estado}</span>
-                <span class="reporte-fecha">${formatearFecha(reporte.fecha_creacion)}</span>
-            </div>
-        </div>
-    `;
-    
-    return card;
-}
-
-// ═══════════════════════════════════════════════════════════════════════════
-// MODAL - VER DETALLE DE REPORTE
-// ═══════════════════════════════════════════════════════════════════════════
-
-async function verDetalleReporte(id) {
-    try {
-        const response = await fetch(`/api/reportes/${id}`);
-        const reporte = await response.json();
-        
-        if (!response.ok) {
-            alert('Error al cargar el reporte');
-            return;
-        }
-        
-        const estadoClass = `estado-${reporte.estado.toLowerCase()}`;
-        const categoriaIcon = obtenerIconoCategoria(reporte.categoria);
-        
-        let contenido = `
-        
-            <h2>Detalle del Reporte #${reporte.id}</h2>
-            
-            <img src="/static/uploads/${reporte.foto}" alt="Foto del reporte" class="modal-imagen" onerror="this.style.display='none'">
-            
-            <div class="modal-info">
-                <strong>🏷️ Categoría:</strong>
-                <p>${categoriaIcon} ${escapeHtml(reporte.categoria)}</p>
-            </div>
-            
-            <div class="modal-info">
-                <strong>📝 Referencia:</strong>
-                <p>${escapeHtml(reporte.ubicacion)}</p>
-            </div>
-
-            <div class="modal-info">
-                <strong>📍 Dirección:</strong>
-                <p>${escapeHtml(reporte.direccion)}</p>
-            </div>
-
-            <div class="modal-info">
-            <div id="modal-map" style="height:220px; border-radius:8px; border:1px solid #ddd; margin-top:0.5rem; margin-bottom:1rem;"></div>            </div>
-            
-            <div class="modal-info">
-                <strong>💬 Descripción:</strong>
-                <p>${escapeHtml(reporte.comentario)}</p>
-            </div>
-            
-            <div class="modal-info">
-                <strong>📅 Fecha de creación:</strong>
-                <p>${formatearFecha(reporte.fecha_creacion)}</p>
-            </div>
-            
-            ${(reporte.email && esAdmin()) ? `
-            <div class="modal-info">
-                <strong>📧 Email de contacto:</strong>
-                <p>${escapeHtml(reporte.email)}</p>
-            </div>
-            ` : ''}
-            
-            <div class="modal-info">
-                <strong>📊 Estado actual:</strong>
-                <p><span class="reporte-estado ${estadoClass}">${reporte.estado}</span></p>
-            </div>
-            
-            ${reporte.razon_rechazo ? `
-            <div class="modal-info">
-                <strong>❌ Razón de rechazo:</strong>
-                <p>${escapeHtml(reporte.razon_rechazo)}</p>
-            </div>
-            ` : ''}
-        `;
-        
-        // Si es admin, agregar botones para cambiar estado
-        if (esAdmin()) {
-            contenido += `
-                <div class="admin-acciones">
-                    <h4>Cambiar Categoría</h4>
-                    <div class="admin-categoria">
-                        <select id="nueva-categoria" class="select-categoria">
-                            <option value="Vías y Tránsito" ${reporte.categoria === 'Vías y Tránsito' ? 'selected' : ''}>Vías y Tránsito</option>
-                            <option value="Alumbrado Público" ${reporte.categoria === 'Alumbrado Público' ? 'selected' : ''}>Alumbrado Público</option>
-                            <option value="Agua y Saneamiento" ${reporte.categoria === 'Agua y Saneamiento' ? 'selected' : ''}>Agua y Saneamiento</option>
-                            <option value="Residuos y Limpieza" ${reporte.categoria === 'Residuos y Limpieza' ? 'selected' : ''}>Residuos y Limpieza</option>
-                            <option value="Parques y Espacios Públicos" ${reporte.categoria === 'Parques y Espacios Públicos' ? 'selected' : ''}>Parques y Espacios Públicos</option>
-                            <option value="Electricidad y Telecomunicaciones" ${reporte.categoria === 'Electricidad y Telecomunicaciones' ? 'selected' : ''}>Electricidad y Telecomunicaciones</option>
-                            <option value="Edificaciones Públicas" ${reporte.categoria === 'Edificaciones Públicas' ? 'selected' : ''}>Edificaciones Públicas</option>
-                            <option value="Seguridad Urbana" ${reporte.categoria === 'Seguridad Urbana' ? 'selected' : ''}>Seguridad Urbana</option>
-                            <option value="Transporte Público" ${reporte.categoria === 'Transporte Público' ? 'selected' : ''}>Transporte Público</option>
-                            <option value="Otros" ${reporte.categoria === 'Otros' ? 'selected' : ''}>Otros</option>
-                        </select>
-                        <button class="btn btn-primary btn-small" onclick="cambiarCategoria(${reporte.id})">Actualizar Categoría</button>
-                    </div>
-                    
-                    <h4>Cambiar Estado</h4>
-                    <div class="admin-botones">
-                        <button class="btn btn-warning btn-small" onclick="cambiarEstado(${reporte.id}, 'Pendiente')">Pendiente</button>
-                        <button class="btn btn-primary btn-small" onclick="cambiarEstado(${reporte.id}, 'Verificando')">Verificando</button>
-                        <button class="btn btn-success btn-small" onclick="cambiarEstado(${reporte.id}, 'Solucionado')">Solucionado</button>
-                        <button class="btn btn-danger btn-small" onclick="rechazarReporte(${reporte.id})">Rechazar</button>
-                    </div>
-                    
-                    <div class="admin-zona-peligro">
-                        <button class="btn btn-eliminar btn-extra-small" onclick="eliminarReporte(${reporte.id})">🗑️ Eliminar Reporte</button>
-                        <small class="texto-advertencia">Esta acción no se puede deshacer</small>
-                    </div>
-                </div>
-            `;
-        }
-        
-        abrirModal(contenido);
-
-        // Crear mapa dentro del modal con el marcador en las coordenadas del reporte
-        setTimeout(() => {
-            modalMapInstance = L.map('modal-map').setView([reporte.lat, reporte.lng], 15);
-            L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
-                attribution: '&copy; OpenStreetMap contributors'
-            }).addTo(modalMapInstance);
-            L.marker([reporte.lat, reporte.lng]).addTo(modalMapInstance);        }, 150);
-        
-    } catch (error) {
-        alert('Error al cargar el reporte');
-    }
-}
-
-async function cambiarEstado(id, nuevoEstado) {
-    if (!confirm(`¿Cambiar estado a "${nuevoEstado}"?`)) {
-        return;
-    }
-    
-    try {
-        const response = await fetch(`/api/reportes/${id}/estado`, {
-            method: 'PUT',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ estado: nuevoEstado })
-        });
-        
-        const data = await response.json();
-        
-        if (response.ok) {
-            alert('✅ ' + data.message);
-            cerrarModal();
-            cargarReportes(); // Recargar lista
-            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
-                cargarAnaliticas(); // Actualizar analíticas si está visible
-            }
-        } else {
-            alert('❌ ' + data.error);
-        }
-    } catch (error) {
-        alert('❌ Error al cambiar el estado');
-    }
-}
-
-function rechazarReporte(id) {
-    const razon = prompt('Ingresa la razón del rechazo (mínimo 10 caracteres):');
-    
-    if (!razon) {
-        return; // Cancelado
-    }
-    
-    if (razon.trim().length < 10) {
-        alert('❌ La razón debe tener al menos 10 caracteres');
-        return rechazarReporte(id); // Volver a preguntar
-    }
-    
-    cambiarEstadoConRazon(id, 'Rechazado', razon);
-}
-
-async function cambiarEstadoConRazon(id, nuevoEstado, razon) {
-    try {
-        const response = await fetch(`/api/reportes/${id}/estado`, {
-            method: 'PUT',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ 
-                estado: nuevoEstado,
-                razon_rechazo: razon
-            })
-        });
-        
-        const data = await response.json();
-        
-        if (response.ok) {
-            alert('✅ ' + data.message);
-            cerrarModal();
-            cargarReportes();
-            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
-                cargarAnaliticas();
-            }
-        } else {
-            alert('❌ ' + data.error);
-        }
-    } catch (error) {
-        alert('❌ Error al cambiar el estado');
-    }
-}
-
-// ═══════════════════════════════════════════════════════════════════════════
-// ANALÍTICAS (SOLO ADMIN)
-// ═══════════════════════════════════════════════════════════════════════════
-
-async function cargarAnaliticas() {
-    try {
-        // Cargar estadísticas
-        const statsResponse = await fetch('/api/estadisticas');
-        const stats = await statsResponse.json();
-        
-        // Actualizar tarjetas de estadísticas
-        document.getElementById('stat-total').textContent = stats.Total;
-        document.getElementById('stat-pendiente').textContent = stats.Pendiente;
-        document.getElementById('stat-verificando').textContent = stats.Verificando;
-        document.getElementById('stat-solucionado').textContent = stats.Solucionado;
-        document.getElementById('stat-rechazado').textContent = stats.Rechazado;
-        
-        // Actualizar gráfico de barras
-        const total = stats.Total || 1; // Evitar división por cero
-        
-        actualizarBarra('pendiente', stats.Pendiente, total);
-        actualizarBarra('verificando', stats.Verificando, total);
-        actualizarBarra('solucionado', stats.Solucionado, total);
-        actualizarBarra('rechazado', stats.Rechazado, total);
-        
-        // Cargar reportes recientes
-        const reportesResponse = await fetch('/api/reportes');
-        const reportes = await reportesResponse.json();
-        
-        const container = document.getElementById('reportes-recientes');
-        if (reportes.length === 0) {
-            container.innerHTML = '<p class="cargando">No hay reportes aún.</p>';
-        } else {
-            container.innerHTML = '';
-            // Mostrar solo los 6 más recientes
-            reportes.slice(0, 6).forEach(reporte => {
-                const card = crearTarjetaReporte(reporte);
-                container.appendChild(card);
-            });
-        }
-        
-    } catch (error) {
-        console.error('Error al cargar analíticas:', error);
-    }
-}
-
-function actualizarBarra(estado, valor, total) {
-    const porcentaje = total > 0 ? (valor / total) * 100 : 0;
-    
-    document.getElementById(`barra-${estado}`).style.width = `${porcentaje}%`;
-    document.getElementById(`valor-${estado}`).textContent = valor;
-}
-
-// ═══════════════════════════════════════════════════════════════════════════
-// MODAL - FUNCIONES GENERALES
-// ═══════════════════════════════════════════════════════════════════════════
-
-function abrirModal(contenido) {
-    document.getElementById('modal-body').innerHTML = contenido;
-    document.getElementById('modal-reporte').classList.remove('oculto');
-}
-
-function cerrarModal() {
-    if (modalMapInstance) {
-        modalMapInstance.remove();
-        modalMapInstance = null;
-    }
-    document.getElementById('modal-reporte').classList.add('oculto');
-}
-
-// Cerrar modal al hacer clic fuera
-document.addEventListener('click', function(e) {
-    const modal = document.getElementById('modal-reporte');
-    if (e.target === modal) {
-        cerrarModal();
-    }
-});
-
-// ═══════════════════════════════════════════════════════════════════════════
-// FUNCIONES AUXILIARES
-// ═══════════════════════════════════════════════════════════════════════════
-
-function mostrarMensaje(elemento, texto, tipo) {
-    elemento.textContent = texto;
-    elemento.className = `mensaje ${tipo}`;
-    elemento.classList.remove('oculto');
-    
-    // Ocultar después de 5 segundos
-    setTimeout(() => {
-        elemento.classList.add('oculto');
-    }, 5000);
-}
-
-function formatearFecha(fechaString) {
-    const fecha = new Date(fechaString);
-    const ahora = new Date();
-    const diferencia = ahora - fecha;
-    
-    const minutos = Math.floor(diferencia / 60000);
-    const horas = Math.floor(diferencia / 3600000);
-    const dias = Math.floor(diferencia / 86400000);
-    
-    if (minutos < 1) return 'Hace un momento';
-    if (minutos < 60) return `Hace ${minutos} min`;
-    if (horas < 24) return `Hace ${horas} h`;
-    if (dias < 7) return `Hace ${dias} días`;
-    
-    return fecha.toLocaleDateString('es-ES', {
-        day: '2-digit',
-        month: '2-digit',
-        year: 'numeric'
-    });
-}
-
-function escapeHtml(text) {
-    if (text == null) return '';
-    const map = {
-        '&': '&amp;',
-        '<': '&lt;',
-        '>': '&gt;',
-        '"': '&quot;',
-        "'": '&#039;'
-    };
-    return text.replace(/[&<>"']/g, m => map[m]);
-}
-
-async function cambiarCategoria(id) {
-    const nuevaCategoria = document.getElementById('nueva-categoria').value;
-    
-    if (!confirm(`¿Cambiar categoría a "${nuevaCategoria}"?`)) {
-        return;
-    }
-    
-    try {
-        const response = await fetch(`/api/reportes/${id}/categoria`, {
-            method: 'PUT',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ categoria: nuevaCategoria })
-        });
-        
-        const data = await response.json();
-        
-        if (response.ok) {
-            alert('✅ ' + data.message);
-            cerrarModal();
-            cargarReportes();
-            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
-                cargarAnaliticas();
-            }
-        } else {
-            alert('❌ ' + data.error);
-        }
-    } catch (error) {
-        alert('❌ Error al cambiar la categoría');
-    }
-}
-
-function eliminarReporte(id) {
-    // Primera confirmación
-    if (!confirm('⚠️ ¿ESTÁS SEGURO que deseas ELIMINAR este reporte?\n\nEsta acción NO se puede deshacer.')) {
-        return;
-    }
-    
-    // Solicitar comentario obligatorio
-    const comentario = prompt('Por favor, ingresa el motivo de la eliminación (mínimo 10 caracteres):\n\nEjemplo: "Reporte duplicado del ID #123" o "Contenido inapropiado"');
-    
-    if (!comentario) {
-        return; // Cancelado
-    }
-    
-    if (comentario.trim().length < 10) {
-        alert('❌ El comentario debe tener al menos 10 caracteres');
-        return eliminarReporte(id); // Volver a preguntar
-    }
-    
-    // Segunda confirmación con el comentario
-    if (!confirm(`¿Confirmas la eliminación del reporte?\n\nMotivo: "${comentario}"\n\n⚠️ Esta acción es IRREVERSIBLE`)) {
-        return;
-    }
-    
-    eliminarReporteConfirmado(id, comentario);
-}
-
-async function eliminarReporteConfirmado(id, comentario) {
-    try {
-        const response = await fetch(`/api/reportes/${id}`, {
-            method: 'DELETE',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ 
-                comentario: comentario
-            })
-        });
-        
-        const data = await response.json();
-        
-        if (response.ok) {
-            alert('✅ ' + data.message);
-            cerrarModal();
-            cargarReportes();
-            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
-                cargarAnaliticas();
-            }
-        } else {
-            alert('❌ ' + data.error);
-        }
-    } catch (error) {
-        alert('❌ Error al eliminar el reporte');
-    }
-}
-
-function esAdmin() {
-    // Verificar si el elemento de analíticas existe (solo visible para admin)
-    return document.getElementById('seccion-analiticas') !== null;
-}
-
-// Función para obtener dirección desde coordenadas
-async function obtenerDireccionDesdeCoords(lat, lng) {
-    try {
-        const response = await fetch(
-            `https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}&accept-language=es`
-        );
-        const data = await response.json();
-        
-        if (data && data.display_name) {
-            return data.display_name;
-        } else {
-            // Si falla, usar coordenadas como dirección
-            return `Lat: ${parseFloat(lat).toFixed(6)}, Lng: ${parseFloat(lng).toFixed(6)}`;
-        }
-    } catch (error) {
-        console.error('Error obteniendo dirección:', error);
-        // Si falla, usar coordenadas como dirección
-        return `Lat: ${parseFloat(lat).toFixed(6)}, Lng: ${parseFloat(lng).toFixed(6)}`;
-    }
-}
-
-async function cargarReportesEnMapa() {
-    try {
-        const response = await fetch('/api/reportes');
-        const reportes = await response.json();
-
-        // Limpiar marcadores anteriores
-        marcadoresReportes.forEach(m => mapaReportes.removeLayer(m));
-        marcadoresReportes = [];
-
-        reportes.forEach(reporte => {
-            if (!reporte.lat || !reporte.lng) return;
-
-            const marker = L.marker([reporte.lat, reporte.lng])
-                .addTo(mapaReportes)
-                .bindPopup(`
-                    <strong>${reporte.categoria}</strong><br>
-                    ${reporte.direccion || 'Sin dirección'}<br>
-                    <em>Estado: ${reporte.estado}</em>
-                `);
-
-            marcadoresReportes.push(marker);
-        });
-
-    } catch (error) {
-        console.error('Error cargando reportes en el mapa', error);
-    }
-}
+// ═══════════════════════════════════════════════════════════════════════════
+// NAVEGACIÓN ENTRE SECCIONES
+// ═══════════════════════════════════════════════════════════════════════════
+let map;
+let marker;
+let mapaReportes;
+let marcadoresReportes = new Map();   // id del reporte -> marcador
+let capaClusters = null;              // grupos de reportes en zoom lejano
+let cargaMapaActual = 0;
+
+function mostrarSeccion(nombre) {
+    // ─── Ocultar todas las secciones ───
+    document.querySelectorAll('.seccion').forEach(s => {
+        s.classList.remove('active');
+    });
+
+    // ─── Mostrar la sección actual ───
+    const seccion = document.getElementById(`seccion-${nombre}`);
+    if (seccion) {
+        seccion.classList.add('active');
+    }
+
+    // ─── Actualizar botón activo del navbar ───
+    document.querySelectorAll('.nav-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+
+    const btnActivo = document.querySelector(
+        `.nav-btn[data-seccion="${nombre}"]`
+    );
+    if (btnActivo) {
+        btnActivo.classList.add('active');
+    }
+
+    // ─── Acciones especiales por sección ───
+    if (nombre === 'crear') {
+        setTimeout(() => {
+            initMap();
+            map?.invalidateSize(true);
+        }, 100);
+    }
+
+    if (nombre === 'lista') {
+        cargarReportes();
+    }
+
+    if (nombre === 'analiticas') {
+        cargarAnaliticas();
+    }
+    if (nombre === 'mapa') {
+    setTimeout(() => {
+        initMapaReportes();
+        mapaReportes.invalidateSize(true);
+        cargarReportesEnMapa();
+    }, 150);
+}
+
+    // ─── Eventos en tiempo real: solo la lista y el mapa los usan ───
+    seccionActual = nombre;
+    actualizarConexionEventos();
+}
+
+
+function initMap() {
+    // Don't initialize if map already exists
+    if (map) return;
+    
+    // Ensure map container exists and is visible
+    const mapContainer = document.getElementById('map');
+    if (!mapContainer || mapContainer.offsetParent === null) {
+        return;
+    }
+    
+    map = L.map('map').setView([-25.257574,-57.586483], 13);
+
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '&copy; OpenStreetMap contributors',
+        maxZoom: 19,
+        minZoom: 2
+    }).addTo(map);
+
+    map.on('click', function (e) {
+        const { lat, lng } = e.latlng;
+
+        if (marker) {
+            marker.setLatLng(e.latlng);
+        } else {
+            marker = L.marker(e.latlng).addTo(map);
+        }
+
+        document.getElementById('lat').value = lat;
+        document.getElementById('lng').value = lng;
+    });
+    
+    // Force redraw after initialization
+    setTimeout(() => {
+        map.invalidateSize(true);
+    }, 100);
+}
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    // Show first section - Reportes
+    mostrarSeccion('lista');
+    
+    // Cambios de otros usuarios en tiempo real; sin conexión con la pestaña oculta
+    document.addEventListener('visibilitychange', actualizarConexionEventos);
+
+    // Initialize filters
+    const filtroEstado = document.getElementById('filtro-estado');
+    if (filtroEstado) {
+        filtroEstado.addEventListener('change', cargarReportes);
+    }
+
+    // Búsqueda de texto: espera a que el usuario deje de escribir
+    const filtroTexto = document.getElementById('filtro-texto');
+    if (filtroTexto) {
+        let espera = null;
+        filtroTexto.addEventListener('input', () => {
+            clearTimeout(espera);
+            espera = setTimeout(cargarReportes, 300);
+        });
+    }
+});
+
+function initMapaReportes() {
+    if (mapaReportes) return;
+
+    mapaReportes = L.map('mapa-reportes')
+        .setView([-25.2637, -57.5759], 12); // Asunción
+
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '&copy; OpenStreetMap contributors'
+    }).addTo(mapaReportes);
+
+    capaClusters = L.layerGroup().addTo(mapaReportes);
+
+    // Al mover o hacer zoom, pedir solo los reportes visibles
+    mapaReportes.on('moveend', cargarReportesEnMapa);
+}
+
+// ═══════════════════════════════════════════════════════════════════════════
+// CREAR REPORTE
+// ═══════════════════════════════════════════════════════════════════════════
+
+document.addEventListener('DOMContentLoaded', function() {
+    const formCrear = document.getElementById('form-crear-reporte');
+    if (formCrear) {
+        formCrear.addEventListener('submit', async function(e) {
+            e.preventDefault();
+            
+            const mensajeDiv = document.getElementById('mensaje-crear');
+            const btnSubmit = this.querySelector('button[type="submit"]');
+            
+            // Validaciones del lado del cliente
+            const lat = document.getElementById('lat')?.value;
+            const lng = document.getElementById('lng')?.value;
+            const ubicacion = document.getElementById('ubicacion').value.trim();
+            const comentario = document.getElementById('comentario').value.trim();
+            const foto = document.getElementById('foto').files[0];
+            
+            if (!lat || !lng) {
+                mostrarMensaje(mensajeDiv, 'Debes seleccionar una ubicación en el mapa', 'error');
+                return;
+            }
+            
+            if (comentario.length < 10) {
+                mostrarMensaje(mensajeDiv, 'El comentario debe tener al menos 10 caracteres', 'error');
+                return;
+            }
+            
+            if (!foto) {
+                mostrarMensaje(mensajeDiv, 'Debes seleccionar una foto', 'error');
+                return;
+            }
+            
+            // Validar tamaño de archivo (25MB)
+            if (foto.size > 25 * 1024 * 1024) {
+                mostrarMensaje(
+                    mensajeDiv,
+                    'La foto no debe superar los 25MB',
+                    'error'
+                );
+                return;
+            }
+            
+            // Preparar FormData
+            const formData = new FormData(this);
+            
+            // Deshabilitar botón mientras se envía
+            btnSubmit.disabled = true;
+            btnSubmit.textContent = 'Enviando...';
+            
+            try {
+                // Obtener dirección desde coordenadas (reverse geocoding)
+                const direccion = await obtenerDireccionDesdeCoords(lat, lng);
+                formData.append('direccion', direccion);
+                
+                btnSubmit.textContent = 'Enviando...';
+                
+                const response = await fetch('/api/reportes', {
+                    method: 'POST',
+                    body: formData
+                });
+                
+                const data = await response.json();
+                
+                if (response.ok) {
+                    mostrarMensaje(mensajeDiv, `✅ Reporte creado exitosamente!\n\n📍 Ubicación: ${direccion}`, 'exito');
+                    // Limpiar formulario
+                    this.reset();
+                    // Resetear marcador del mapa
+                    if (marker) {
+                        map.removeLayer(marker);
+                        marker = null;
+                    }
+                    document.getElementById('lat').value = '';
+                    document.getElementById('lng').value = '';
+                    // Después de 2 segundos, ir a ver reportes
+                    setTimeout(() => {
+                        mostrarSeccion('lista');
+                    }, 2000);
+                } else {
+                    mostrarMensaje(mensajeDiv, '❌ ' + data.error, 'error');
+                }
+            } catch (error) {
+                mostrarMensaje(mensajeDiv, '❌ Error al conectar con el servidor', 'error');
+            } finally {
+                btnSubmit.disabled = false;
+                btnSubmit.textContent = 'Enviar Reporte';
+            }
+        });
+    }
+});
+
+// ═══════════════════════════════════════════════════════════════════════════
+// CARGAR Y MOSTRAR REPORTES
+// ═══════════════════════════════════════════════════════════════════════════
+
+const REPORTES_POR_PAGINA = 24;
+let cursorReportes = null;     // cursor de la siguiente página
+let cargaReportesActual = 0;   // descarta respuestas de cargas anteriores
+let reportesEnLista = new Map();   // id -> reporte de las tarjetas visibles
+// columnas que usan las tarjetas; el servidor solo lee esas
+const CAMPOS_TARJETA = 'id,foto,categoria,comentario,direccion,estado,fecha_creacion';
+
+function urlReportes(estado, limite, cursor, texto) {
+    const params = new URLSearchParams({ limit: limite });
+    if (estado && estado !== 'Todos') params.set('estado', estado);
+    if (cursor) params.set('cursor', cursor);
+    if (texto) {
+        // resultados ordenados por relevancia
+        params.set('q', texto);
+        return `/api/reportes/buscar?${params}`;
+    }
+    params.set('fields', CAMPOS_TARJETA);
+    return `/api/reportes?${params}`;
+}
+
+function textoBusqueda() {
+    const filtroTexto = document.getElementById('filtro-texto');
+    return filtroTexto ? filtroTexto.value.trim() : '';
+}
+
+async function cargarReportes() {
+    const estado = document.getElementById('filtro-estado').value;
+    const container = document.getElementById('lista-reportes');
+    const carga = ++cargaReportesActual;
+    cursorReportes = null;
+    
+    container.innerHTML = '<p class="cargando">Cargando reportes...</p>';
+    
+    try {
+        const response = await fetch(urlReportes(estado, REPORTES_POR_PAGINA, null, textoBusqueda()));
+        const pagina = await response.json();
+        
+        if (carga !== cargaReportesActual) return;
+        
+        if (pagina.reportes.length === 0) {
+            container.innerHTML = '<p class="cargando">No hay reportes para mostrar.</p>';
+            return;
+        }
+        
+        // Renderizar reportes
+        container.innerHTML = '';
+        reportesEnLista = new Map();
+        if (pagina.truncado) {
+            // la búsqueda solo ordenó las coincidencias más recientes
+            const aviso = document.createElement('p');
+            aviso.className = 'aviso-busqueda';
+            aviso.textContent = 'Hay demasiadas coincidencias: se muestran solo las más recientes. Agrega palabras para afinar la búsqueda.';
+            container.appendChild(aviso);
+        }
+        agregarPaginaReportes(container, pagina);
+        
+    } catch (error) {
+        container.innerHTML = '<p class="cargando">Error al cargar reportes.</p>';
+    }
+}
+
+async function cargarMasReportes(boton) {
+    const estado = document.getElementById('filtro-estado').value;
+    const container = document.getElementById('lista-reportes');
+    const carga = cargaReportesActual;
+    
+    boton.disabled = true;
+    boton.textContent = 'Cargando...';
+    
+    try {
+        const response = await fetch(urlReportes(estado, REPORTES_POR_PAGINA, cursorReportes, textoBusqueda()));
+        const pagina = await response.json();
+        
+        if (carga !== cargaReportesActual) return;
+        
+        boton.remove();
+        agregarPaginaReportes(container, pagina);
+    } catch (error) {
+        boton.disabled = false;
+        boton.textContent = 'Cargar más';
+    }
+}
+
+function agregarPaginaReportes(container, pagina) {
+    pagina.reportes.forEach(reporte => {
+        const card = crearTarjetaReporte(reporte);
+        container.appendChild(card);
+        reportesEnLista.set(reporte.id, reporte);
+    });
+    
+    // Botón para la siguiente página, si la hay
+    cursorReportes = pagina.siguiente;
+    if (cursorReportes) {
+        const boton = document.createElement('button');
+        boton.className = 'btn btn-primary btn-cargar-mas';
+        boton.textContent = 'Cargar más';
+        boton.onclick = () => cargarMasReportes(boton);
+        container.appendChild(boton);
+    }
+}
+
+function obtenerIconoCategoria(categoria) {
+    const iconos = {
+        'Vías y Tránsito': '🚗',
+        'Alumbrado Público': '💡',
+        'Agua y Saneamiento': '💧',
+        'Residuos y Limpieza': '🗑️',
+        'Parques y Espacios Públicos': '🌳',
+        'Electricidad y Telecomunicaciones': '⚡',
+        'Edificaciones Públicas': '🏢',
+        'Seguridad Urbana': '🚨',
+        'Transporte Público': '🚌',
+        'Otros': '📌'
+    };
+    return iconos[categoria] || '📌';
+}
+
+const FOTO_PLACEHOLDER = 'data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 width=%22300%22 height=%22200%22%3E%3Crect fill=%22%23ddd%22 width=%22300%22 height=%22200%22/%3E%3Ctext x=%2250%25%22 y=%2250%25%22 font-size=%2218%22 text-anchor=%22middle%22 fill=%22%23999%22%3ESin imagen%3C/text%3E%3C/svg%3E';
+
+// URL de la variante pedida ('miniatura', 'mediana' u 'original')
+function fotoReporte(reporte, variante) {
+    if (reporte.foto_urls) return reporte.foto_urls[variante];
+    return `/static/uploads/${reporte.foto}`;
+}
+
+// Si la variante no existe (fotos antiguas o aún sin procesar), usar la
+// original; si tampoco carga, el placeholder (o se oculta si es null)
+function manejarErrorFoto(img, placeholder) {
+    if (img.dataset.original) {
+        const original = img.dataset.original;
+        delete img.dataset.original;
+        img.src = original;
+    } else if (placeholder) {
+        img.onerror = null;
+        img.src = placeholder;
+    } else {
+        img.style.display = 'none';
+    }
+}
+
+function crearTarjetaReporte(reporte) {
+    const card = document.createElement('div');
+    card.className = 'reporte-card';
+    card.dataset.id = reporte.id;
+    card.onclick = () => verDetalleReporte(reporte.id);
+    
+    const estadoClass = `estado-${reporte.estado.toLowerCase()}`;
+    const categoriaIcon = obtenerIconoCategoria(reporte.categoria);
+    
+    card.innerHTML = `
+        <img src="${fotoReporte(reporte, 'miniatura')}" data-original="${fotoReporte(reporte, 'original')}" alt="Foto del reporte" class="reporte-imagen" loading="lazy" decoding="async" onerror="manejarErrorFoto(this, FOTO_PLACEHOLDER)">
+        <div class="reporte-contenido">
+            <div class="reporte-categoria">${categoriaIcon} ${escapeHtml(reporte.categoria)}</div>
+            <div class="reporte-comentario">${escapeHtml(reporte.comentario)}</div>
+            <div class="reporte-direccion">${escapeHtml(reporte.direccion)}</div>
+            <div class="reporte-footer">
+                <span class="reporte-estado ${estadoClass}">${reporte.estado}</span>
+                <span class="reporte-fecha">${formatearFecha(reporte.fecha_creacion)}</span>
+            </div>
+        </div>
+    `;
+    
+    return card;
+}
+
+// ═══════════════════════════════════════════════════════════════════════════
+// MODAL - VER DETALLE DE REPORTE
+// ═══════════════════════════════════════════════════════════════════════════
+
+async function verDetalleReporte(id) {
+    try {
+        const response = await fetch(`/api/reportes/${id}`);
+        const reporte = await response.json();
+        
+        if (!response.ok) {
+            alert('Error al cargar el reporte');
+            return;
+        }
+        
+        const estadoClass = `estado-${reporte.estado.toLowerCase()}`;
+        const categoriaIcon = obtenerIconoCategoria(reporte.categoria);
+        
+        let contenido = `
+        
+            <h2>Detalle del Reporte #${reporte.id}</h2>
+            
+            <img src="${fotoReporte(reporte, 'mediana')}" data-original="${fotoReporte(reporte, 'original')}" alt="Foto del reporte" class="modal-imagen" onerror="manejarErrorFoto(this, null)">
+            
+            <div class="modal-info">
+                <strong>🏷️ Categoría:</strong>
+                <p>${categoriaIcon} ${escapeHtml(reporte.categoria)}</p>
+            </div>
+            
+            <div class="modal-info">
+                <strong>📝 Referencia:</strong>
+                <p>${escapeHtml(reporte.ubicacion)}</p>
+            </div>
+
+            <div class="modal-info">
+                <strong>📍 Dirección:</strong>
+                <p>${escapeHtml(reporte.direccion)}</p>
+            </div>
+
+            <div class="modal-info">
+            <div id="modal-map" style="height:220px; border-radius:8px; border:1px solid #ddd; margin-top:0.5rem; margin-bottom:1rem;"></div>            </div>
+            
+            <div class="modal-info">
+                <strong>💬 Descripción:</strong>
+                <p>${escapeHtml(reporte.comentario)}</p>
+            </div>
+            
+            <div class="modal-info">
+                <strong>📅 Fecha de creación:</strong>
+                <p>${formatearFecha(reporte.fecha_creacion)}</p>
+            </div>
+            
+            ${(reporte.email && esAdmin()) ? `
+            <div class="modal-info">
+                <strong>📧 Email de contacto:</strong>
+                <p>${escapeHtml(reporte.email)}</p>
+            </div>
+            ` : ''}
+            
+            <div class="modal-info">
+                <strong>📊 Estado actual:</strong>
+                <p><span class="reporte-estado ${estadoClass}">${reporte.estado}</span></p>
+            </div>
+            
+            ${reporte.razon_rechazo ? `
+            <div class="modal-info">
+                <strong>❌ Razón de rechazo:</strong>
+                <p>${escapeHtml(reporte.razon_rechazo)}</p>
+            </div>
+            ` : ''}
+        `;
+        
+        // Si es admin, agregar botones para cambiar estado
+        if (esAdmin()) {
+            contenido += `
+                <div class="admin-acciones">
+                    <h4>Cambiar Categoría</h4>
+                    <div class="admin-categoria">
+                        <select id="nueva-categoria" class="select-categoria">
+                            <option value="Vías y Tránsito" ${reporte.categoria === 'Vías y Tránsito' ? 'selected' : ''}>Vías y Tránsito</option>
+                            <option value="Alumbrado Público" ${reporte.categoria === 'Alumbrado Público' ? 'selected' : ''}>Alumbrado Público</option>
+                            <option value="Agua y Saneamiento" ${reporte.categoria === 'Agua y Saneamiento' ? 'selected' : ''}>Agua y Saneamiento</option>
+                            <option value="Residuos y Limpieza" ${reporte.categoria === 'Residuos y Limpieza' ? 'selected' : ''}>Residuos y Limpieza</option>
+                            <option value="Parques y Espacios Públicos" ${reporte.categoria === 'Parques y Espacios Públicos' ? 'selected' : ''}>Parques y Espacios Públicos</option>
+                            <option value="Electricidad y Telecomunicaciones" ${reporte.categoria === 'Electricidad y Telecomunicaciones' ? 'selected' : ''}>Electricidad y Telecomunicaciones</option>
+                            <option value="Edificaciones Públicas" ${reporte.categoria === 'Edificaciones Públicas' ? 'selected' : ''}>Edificaciones Públicas</option>
+                            <option value="Seguridad Urbana" ${reporte.categoria === 'Seguridad Urbana' ? 'selected' : ''}>Seguridad Urbana</option>
+                            <option value="Transporte Público" ${reporte.categoria === 'Transporte Público' ? 'selected' : ''}>Transporte Público</option>
+                            <option value="Otros" ${reporte.categoria === 'Otros' ? 'selected' : ''}>Otros</option>
+                        </select>
+                        <button class="btn btn-primary btn-small" onclick="cambiarCategoria(${reporte.id})">Actualizar Categoría</button>
+                    </div>
+                    
+                    <h4>Cambiar Estado</h4>
+                    <div class="admin-botones">
+                        <button class="btn btn-warning btn-small" onclick="cambiarEstado(${reporte.id}, 'Pendiente')">Pendiente</button>
+                        <button class="btn btn-primary btn-small" onclick="cambiarEstado(${reporte.id}, 'Verificando')">Verificando</button>
+                        <button class="btn btn-success btn-small" onclick="cambiarEstado(${reporte.id}, 'Solucionado')">Solucionado</button>
+                        <button class="btn btn-danger btn-small" onclick="rechazarReporte(${reporte.id})">Rechazar</button>
+                    </div>
+                    
+                    <div class="admin-zona-peligro">
+                        <button class="btn btn-eliminar btn-extra-small" onclick="eliminarReporte(${reporte.id})">🗑️ Eliminar Reporte</button>
+                        <small class="texto-advertencia">Esta acción no se puede deshacer</small>
+                    </div>
+                </div>
+            `;
+        }
+        
+        abrirModal(contenido);
+
+        // Crear mapa dentro del modal con el marcador en las coordenadas del reporte
+        setTimeout(() => {
+            modalMapInstance = L.map('modal-map').setView([reporte.lat, reporte.lng], 15);
+            L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+                attribution: '&copy; OpenStreetMap contributors'
+            }).addTo(modalMapInstance);
+            L.marker([reporte.lat, reporte.lng]).addTo(modalMapInstance);        }, 150);
+        
+    } catch (error) {
+        alert('Error al cargar el reporte');
+    }
+}
+
+async function cambiarEstado(id, nuevoEstado) {
+    if (!confirm(`¿Cambiar estado a "${nuevoEstado}"?`)) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/reportes/${id}/estado`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ estado: nuevoEstado })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            alert('✅ ' + data.message);
+            cerrarModal();
+            cargarReportes(); // Recargar lista
+            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
+                cargarAnaliticas(); // Actualizar analíticas si está visible
+            }
+        } else {
+            alert('❌ ' + data.error);
+        }
+    } catch (error) {
+        alert('❌ Error al cambiar el estado');
+    }
+}
+
+function rechazarReporte(id) {
+    const razon = prompt('Ingresa la razón del rechazo (mínimo 10 caracteres):');
+    
+    if (!razon) {
+        return; // Cancelado
+    }
+    
+    if (razon.trim().length < 10) {
+        alert('❌ La razón debe tener al menos 10 caracteres');
+        return rechazarReporte(id); // Volver a preguntar
+    }
+    
+    cambiarEstadoConRazon(id, 'Rechazado', razon);
+}
+
+async function cambiarEstadoConRazon(id, nuevoEstado, razon) {
+    try {
+        const response = await fetch(`/api/reportes/${id}/estado`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ 
+                estado: nuevoEstado,
+                razon_rechazo: razon
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            alert('✅ ' + data.message);
+            cerrarModal();
+            cargarReportes();
+            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
+                cargarAnaliticas();
+            }
+        } else {
+            alert('❌ ' + data.error);
+        }
+    } catch (error) {
+        alert('❌ Error al cambiar el estado');
+    }
+}
+
+// ═══════════════════════════════════════════════════════════════════════════
+// ANALÍTICAS (SOLO ADMIN)
+// ═══════════════════════════════════════════════════════════════════════════
+
+async function cargarAnaliticas() {
+    try {
+        // Cargar estadísticas
+        const statsResponse = await fetch('/api/estadisticas');
+        const stats = await statsResponse.json();
+        
+        // Actualizar tarjetas de estadísticas
+        document.getElementById('stat-total').textContent = stats.Total;
+        document.getElementById('stat-pendiente').textContent = stats.Pendiente;
+        document.getElementById('stat-verificando').textContent = stats.Verificando;
+        document.getElementById('stat-solucionado').textContent = stats.Solucionado;
+        document.getElementById('stat-rechazado').textContent = stats.Rechazado;
+        
+        // Actualizar gráfico de barras
+        const total = stats.Total || 1; // Evitar división por cero
+        
+        actualizarBarra('pendiente', stats.Pendiente, total);
+        actualizarBarra('verificando', stats.Verificando, total);
+        actualizarBarra('solucionado', stats.Solucionado, total);
+        actualizarBarra('rechazado', stats.Rechazado, total);
+        
+        // Cargar solo los 6 reportes más recientes
+        const reportesResponse = await fetch(urlReportes('Todos', 6));
+        const { reportes } = await reportesResponse.json();
+        
+        const container = document.getElementById('reportes-recientes');
+        if (reportes.length === 0) {
+            container.innerHTML = '<p class="cargando">No hay reportes aún.</p>';
+        } else {
+            container.innerHTML = '';
+            reportes.forEach(reporte => {
+                const card = crearTarjetaReporte(reporte);
+                container.appendChild(card);
+            });
+        }
+        
+    } catch (error) {
+        console.error('Error al cargar analíticas:', error);
+    }
+}
+
+function actualizarBarra(estado, valor, total) {
+    const porcentaje = total > 0 ? (valor / total) * 100 : 0;
+    
+    document.getElementById(`barra-${estado}`).style.width = `${porcentaje}%`;
+    document.getElementById(`valor-${estado}`).textContent = valor;
+}
+
+// ═══════════════════════════════════════════════════════════════════════════
+// MODAL - FUNCIONES GENERALES
+// ═══════════════════════════════════════════════════════════════════════════
+
+function abrirModal(contenido) {
+    document.getElementById('modal-body').innerHTML = contenido;
+    document.getElementById('modal-reporte').classList.remove('oculto');
+}
+
+function cerrarModal() {
+    if (modalMapInstance) {
+        modalMapInstance.remove();
+        modalMapInstance = null;
+    }
+    document.getElementById('modal-reporte').classList.add('oculto');
+}
+
+// Cerrar modal al hacer clic fuera
+document.addEventListener('click', function(e) {
+    const modal = document.getElementById('modal-reporte');
+    if (e.target === modal) {
+        cerrarModal();
+    }
+});
+
+// ═══════════════════════════════════════════════════════════════════════════
+// FUNCIONES AUXILIARES
+// ═══════════════════════════════════════════════════════════════════════════
+
+function mostrarMensaje(elemento, texto, tipo) {
+    elemento.textContent = texto;
+    elemento.className = `mensaje ${tipo}`;
+    elemento.classList.remove('oculto');
+    
+    // Ocultar después de 5 segundos
+    setTimeout(() => {
+        elemento.classList.add('oculto');
+    }, 5000);
+}
+
+function formatearFecha(fechaString) {
+    const fecha = new Date(fechaString);
+    const ahora = new Date();
+    const diferencia = ahora - fecha;
+    
+    const minutos = Math.floor(diferencia / 60000);
+    const horas = Math.floor(diferencia / 3600000);
+    const dias = Math.floor(diferencia / 86400000);
+    
+    if (minutos < 1) return 'Hace un momento';
+    if (minutos < 60) return `Hace ${minutos} min`;
+    if (horas < 24) return `Hace ${horas} h`;
+    if (dias < 7) return `Hace ${dias} días`;
+    
+    return fecha.toLocaleDateString('es-ES', {
+        day: '2-digit',
+        month: '2-digit',
+        year: 'numeric'
+    });
+}
+
+function escapeHtml(text) {
+    if (text == null) return '';
+    const map = {
+        '&': '&amp;',
+        '<': '&lt;',
+        '>': '&gt;',
+        '"': '&quot;',
+        "'": '&#039;'
+    };
+    return text.replace(/[&<>"']/g, m => map[m]);
+}
+
+async function cambiarCategoria(id) {
+    const nuevaCategoria = document.getElementById('nueva-categoria').value;
+    
+    if (!confirm(`¿Cambiar categoría a "${nuevaCategoria}"?`)) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/reportes/${id}/categoria`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ categoria: nuevaCategoria })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            alert('✅ ' + data.message);
+            cerrarModal();
+            cargarReportes();
+            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
+                cargarAnaliticas();
+            }
+        } else {
+            alert('❌ ' + data.error);
+        }
+    } catch (error) {
+        alert('❌ Error al cambiar la categoría');
+    }
+}
+
+function eliminarReporte(id) {
+    // Primera confirmación
+    if (!confirm('⚠️ ¿ESTÁS SEGURO que deseas ELIMINAR este reporte?\n\nEsta acción NO se puede deshacer.')) {
+        return;
+    }
+    
+    // Solicitar comentario obligatorio
+    const comentario = prompt('Por favor, ingresa el motivo de la eliminación (mínimo 10 caracteres):\n\nEjemplo: "Reporte duplicado del ID #123" o "Contenido inapropiado"');
+    
+    if (!comentario) {
+        return; // Cancelado
+    }
+    
+    if (comentario.trim().length < 10) {
+        alert('❌ El comentario debe tener al menos 10 caracteres');
+        return eliminarReporte(id); // Volver a preguntar
+    }
+    
+    // Segunda confirmación con el comentario
+    if (!confirm(`¿Confirmas la eliminación del reporte?\n\nMotivo: "${comentario}"\n\n⚠️ Esta acción es IRREVERSIBLE`)) {
+        return;
+    }
+    
+    eliminarReporteConfirmado(id, comentario);
+}
+
+async function eliminarReporteConfirmado(id, comentario) {
+    try {
+        const response = await fetch(`/api/reportes/${id}`, {
+            method: 'DELETE',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ 
+                comentario: comentario
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            alert('✅ ' + data.message);
+            cerrarModal();
+            cargarReportes();
+            if (document.getElementById('seccion-analiticas')?.classList.contains('active')) {
+                cargarAnaliticas();
+            }
+        } else {
+            alert('❌ ' + data.error);
+        }
+    } catch (error) {
+        alert('❌ Error al eliminar el reporte');
+    }
+}
+
+function esAdmin() {
+    // Verificar si el elemento de analíticas existe (solo visible para admin)
+    return document.getElementById('seccion-analiticas') !== null;
+}
+
+// Función para obtener dirección desde coordenadas
+async function obtenerDireccionDesdeCoords(lat, lng) {
+    try {
+        const response = await fetch(
+            `https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}&accept-language=es`
+        );
+        const data = await response.json();
+        
+        if (data && data.display_name) {
+            return data.display_name;
+        } else {
+            // Si falla, usar coordenadas como dirección
+            return `Lat: ${parseFloat(lat).toFixed(6)}, Lng: ${parseFloat(lng).toFixed(6)}`;
+        }
+    } catch (error) {
+        console.error('Error obteniendo dirección:', error);
+        // Si falla, usar coordenadas como dirección
+        return `Lat: ${parseFloat(lat).toFixed(6)}, Lng: ${parseFloat(lng).toFixed(6)}`;
+    }
+}
+
+function popupMarcador(reporte) {
+    return `
+        <strong>${obtenerIconoCategoria(reporte.categoria)} ${escapeHtml(reporte.categoria)}</strong><br>
+        <em>Estado: ${escapeHtml(reporte.estado)}</em><br>
+        <a href="#" onclick="verDetalleReporte(${reporte.id}); return false;">Ver detalle</a>
+    `;
+}
+
+function crearMarcadorReporte(reporte) {
+    const marcador = L.marker([reporte.lat, reporte.lng])
+        .addTo(mapaReportes)
+        .bindPopup(popupMarcador(reporte));
+    marcador.reporte = { id: reporte.id, estado: reporte.estado, categoria: reporte.categoria };
+    return marcador;
+}
+
+async function cargarReportesEnMapa() {
+    const carga = ++cargaMapaActual;
+    const b = mapaReportes.getBounds();
+    const bbox = [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].join(',');
+    const zoom = mapaReportes.getZoom();
+
+    try {
+        const response = await fetch(`/api/reportes/mapa?bbox=${bbox}&zoom=${zoom}`);
+        const data = await response.json();
+
+        if (carga !== cargaMapaActual) return;
+
+        // Clusters: se redibujan completos (son pocos, uno por celda visible)
+        capaClusters.clearLayers();
+        data.clusters.forEach(cluster => {
+            const desglose = Object.entries(cluster.estados)
+                .filter(([, cantidad]) => cantidad > 0)
+                .map(([estado, cantidad]) => `${estado}: ${cantidad}`)
+                .join('<br>');
+
+            L.marker([cluster.lat, cluster.lng], {
+                icon: L.divIcon({
+                    className: 'cluster-mapa',
+                    html: `<span>${cluster.cantidad}</span>`,
+                    iconSize: [40, 40]
+                })
+            })
+                .bindTooltip(desglose)
+                .on('click', () => mapaReportes.setView([cluster.lat, cluster.lng], zoom + 2))
+                .addTo(capaClusters);
+        });
+
+        // Reutilizar los marcadores que siguen visibles; quitar los demás
+        const visibles = new Map();
+        data.reportes.forEach(([id, lat, lng, estado, categoria]) => {
+            let marcador = marcadoresReportes.get(id);
+            if (!marcador) {
+                marcador = crearMarcadorReporte({ id, lat, lng, estado, categoria });
+            }
+            visibles.set(id, marcador);
+        });
+
+        marcadoresReportes.forEach((marcador, id) => {
+            if (!visibles.has(id)) mapaReportes.removeLayer(marcador);
+        });
+        marcadoresReportes = visibles;
+
+    } catch (error) {
+        console.error('Error cargando reportes en el mapa', error);
+    }
+}
+
+// ═══════════════════════════════════════════════════════════════════════════
+// EVENTOS EN TIEMPO REAL (Server-Sent Events)
+// ═══════════════════════════════════════════════════════════════════════════
+// /api/eventos avisa cuando se crea, cambia o elimina un reporte. Las
+// tarjetas y los marcadores se actualizan en el lugar, sin recargar la
+// lista. Al reconectar, el navegador envía Last-Event-ID y el servidor
+// manda lo que se perdió. La conexión ocupa un hilo del servidor: solo se
+// abre en la lista o el mapa y con la pestaña visible.
+
+const SECCIONES_CON_EVENTOS = ['lista', 'mapa'];
+let seccionActual = null;
+let fuenteEventos = null;
+let ultimoEvento = null;        // id del último evento recibido
+let reconexionEventos = null;
+let recargaMapaPendiente = null;
+
+function actualizarConexionEventos() {
+    if (document.visibilityState !== 'hidden' && SECCIONES_CON_EVENTOS.includes(seccionActual)) {
+        conectarEventos();
+    } else {
+        desconectarEventos();
+    }
+}
+
+function conectarEventos() {
+    if (!window.EventSource || fuenteEventos || reconexionEventos) return;
+
+    // una conexión nueva no manda Last-Event-ID: se pasa el último id recibido
+    const url = ultimoEvento ? `/api/eventos?desde=${encodeURIComponent(ultimoEvento)}` : '/api/eventos';
+    fuenteEventos = new EventSource(url);
+    const recibir = manejador => e => {
+        if (e.lastEventId) ultimoEvento = e.lastEventId;
+        manejador(JSON.parse(e.data));
+    };
+    fuenteEventos.addEventListener('creado', recibir(reporteCreado));
+    fuenteEventos.addEventListener('estado', recibir(reporteModificado));
+    fuenteEventos.addEventListener('categoria', recibir(reporteModificado));
+    fuenteEventos.addEventListener('eliminado', recibir(datos => reporteEliminado(datos.id)));
+    // Se perdieron demasiados eventos: recargar todo
+    fuenteEventos.addEventListener('recargar', recibir(() => {
+        cargarReportes();
+        if (mapaReportes) cargarReportesEnMapa();
+    }));
+    // solo trae el id actual, para reconectar desde ahí
+    fuenteEventos.addEventListener('conectado', recibir(() => {}));
+    // Servidor ocupado (503): el navegador no reintenta solo; se prueba
+    // de nuevo en unos 30 segundos, repartidos para no llegar todos juntos
+    fuenteEventos.onerror = () => {
+        if (fuenteEventos.readyState !== EventSource.CLOSED) return;
+        desconectarEventos();
+        reconexionEventos = setTimeout(() => {
+            reconexionEventos = null;
+            actualizarConexionEventos();
+        }, 30000 + Math.random() * 15000);
+    };
+}
+
+function desconectarEventos() {
+    clearTimeout(reconexionEventos);
+    reconexionEventos = null;
+    if (fuenteEventos) {
+        fuenteEventos.close();
+        fuenteEventos = null;
+    }
+}
+
+function coincideFiltroEstado(reporte) {
+    const estado = document.getElementById('filtro-estado')?.value || 'Todos';
+    return estado === 'Todos' || estado === reporte.estado;
+}
+
+function tarjetaEnLista(id) {
+    return document.querySelector(`#lista-reportes .reporte-card[data-id="${id}"]`);
+}
+
+function reporteCreado(reporte) {
+    // Lista: arriba de todo, si corresponde al filtro. Los resultados de
+    // una búsqueda van por relevancia y no se tocan.
+    // El mismo evento puede llegar dos veces (reconexión) o el reporte ya
+    // estar en pantalla (lo acaba de crear este usuario): una sola tarjeta
+    // y un solo marcador por id
+    const container = document.getElementById('lista-reportes');
+    if (container && !textoBusqueda() && coincideFiltroEstado(reporte)
+            && !reportesEnLista.has(reporte.id) && !tarjetaEnLista(reporte.id)) {
+        container.querySelector('p.cargando')?.remove();
+        container.prepend(crearTarjetaReporte(reporte));
+        reportesEnLista.set(reporte.id, reporte);
+    }
+
+    // Mapa: marcador nuevo si se ven puntos y cae en pantalla
+    if (!mapaReportes) return;
+    if (capaClusters.getLayers().length > 0) {
+        recargarMapaPronto();
+    } else if (!marcadoresReportes.has(reporte.id)
+            && mapaReportes.getBounds().contains([reporte.lat, reporte.lng])) {
+        marcadoresReportes.set(reporte.id, crearMarcadorReporte(reporte));
+    }
+}
+
+function reporteModificado(cambios) {
+    const reporte = reportesEnLista.get(cambios.id);
+    if (reporte) {
+        Object.assign(reporte, cambios);
+        const card = tarjetaEnLista(cambios.id);
+        if (!coincideFiltroEstado(reporte)) {
+            card?.remove();
+            reportesEnLista.delete(cambios.id);
+        } else if (card) {
+            card.replaceWith(crearTarjetaReporte(reporte));
+        }
+    }
+
+    if (!mapaReportes) return;
+    const marcador = marcadoresReportes.get(cambios.id);
+    if (marcador) {
+        Object.assign(marcador.reporte, cambios);
+        marcador.setPopupContent(popupMarcador(marcador.reporte));
+    }
+    // el desglose por estado de los clusters también cambia
+    if (cambios.estado && capaClusters.getLayers().length > 0) {
+        recargarMapaPronto();
+    }
+}
+
+function reporteEliminado(id) {
+    tarjetaEnLista(id)?.remove();
+    reportesEnLista.delete(id);
+
+    if (!mapaReportes) return;
+    const marcador = marcadoresReportes.get(id);
+    if (marcador) {
+        mapaReportes.removeLayer(marcador);
+        marcadoresReportes.delete(id);
+    }
+    if (capaClusters.getLayers().length > 0) {
+        recargarMapaPronto();
+    }
+}
+
+// Varios eventos seguidos generan una sola recarga de los clusters
+function recargarMapaPronto() {
+    clearTimeout(recargaMapaPendiente);
+    recargaMapaPendiente = setTimeout(cargarReportesEnMapa, 500);
+}
@@ -0,0 +1,177 @@
+"""
+Recepción de fotos en streaming.
+
+Werkzeug llama a Request._get_file_stream por cada archivo del multipart
+y le escribe el contenido en bloques a medida que llega. SubidaFoto
+escribe esos bloques en un temporal dentro de UPLOAD_FOLDER, revisa los
+magic bytes apenas tiene la cabecera y corta la subida en cuanto supera
+el tamaño máximo, sin esperar al resto del cuerpo. Al final el temporal
+se mueve a su nombre definitivo con os.replace (atómico).
+
+Las fotos se guardan por contenido: el nombre es el SHA-256 de los bytes
+(calculado también mientras llegan) en carpetas de dos niveles,
+p. ej. `ab/cd/abcd1234....jpg`. Subir dos veces la misma foto no ocupa
+espacio extra; las referencias se cuentan en la tabla `fotos`.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+
+class FotoNoValida(UnsupportedMediaType):
+    description = 'El archivo no es una imagen JPG, PNG o WebP válida'
+
+
+class FotoDemasiadoGrande(RequestEntityTooLarge):
+    description = 'La foto no debe superar los 25MB'
+
+
+# Bytes necesarios para reconocer todos los formatos permitidos
+LARGO_CABECERA = 12
+
+EXTENSION_TIPO = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp'}
+
+
+def detectar_tipo(cabecera):
+    """Tipo de imagen según los magic bytes, o None si no es permitido."""
+    if cabecera.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if cabecera.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if cabecera[:4] == b'RIFF' and cabecera[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class SubidaFoto:
+    """Archivo temporal que valida tipo y tamaño mientras se escribe."""
+
+    def __init__(self, carpeta, limite):
+        fd, self.ruta = tempfile.mkstemp(dir=carpeta, prefix='.subida_', suffix='.part')
+        self._archivo = os.fdopen(fd, 'w+b')
+        self._limite = limite
+        self._tamano = 0
+        self._cabecera = b''
+        self._hash = hashlib.sha256()
+        self.tipo = None
+
+    def write(self, datos):
+        self._tamano += len(datos)
+        if self._tamano > self._limite:
+            self.close()
+            raise FotoDemasiadoGrande()
+
+        if self.tipo is None and len(self._cabecera) < LARGO_CABECERA:
+            self._cabecera += datos[:LARGO_CABECERA - len(self._cabecera)]
+            if len(self._cabecera) == LARGO_CABECERA:
+                self._validar_cabecera()
+
+        self._hash.update(datos)
+        return self._archivo.write(datos)
+
+    def _validar_cabecera(self):
+        self.tipo = detectar_tipo(self._cabecera)
+        if self.tipo is None:
+            self.close()
+            raise FotoNoValida()
+
+    def seek(self, posicion, desde=0):
+        # el parser hace seek(0) al terminar la parte: archivos muy cortos
+        # no llegaron a completar la cabecera
+        if self.tipo is None:
+            self._validar_cabecera()
+        return self._archivo.seek(posicion, desde)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def read(self, *args):
+        return self._archivo.read(*args)
+
+    def readline(self, *args):
+        return self._archivo.readline(*args)
+
+    def tell(self):
+        return self._archivo.tell()
+
+    def mover_a(self, destino):
+        """Mueve el temporal a `destino` de forma atómica."""
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._archivo.close()
+        os.replace(self.ruta, destino)
+        self.ruta = None
+
+    def close(self):
+        """Cierra y borra el temporal si no se movió (Flask lo llama al final de la petición)."""
+        if not self._archivo.closed:
+            self._archivo.close()
+        if self.ruta and os.path.exists(self.ruta):
+            os.remove(self.ruta)
+        self.ruta = None
+
+    @property
+    def closed(self):
+        return self._archivo.closed
+
+
+class RequestConSubidas(Request):
+    """Request de Flask que recibe los archivos con SubidaFoto."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # parte sin archivo elegido (filename=''): stream común, para que la
+        # ruta responda "No se seleccionó ningún archivo" y no 415
+        if not filename:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return SubidaFoto(current_app.config['UPLOAD_FOLDER'], current_app.config['MAX_FILE_SIZE'])
+
+
+def ruta_por_contenido(archivo):
+    """
+    Ruta relativa (dentro de UPLOAD_FOLDER) según el contenido de la foto:
+    `<h[0:2]>/<h[2:4]>/<sha256>.<ext>`.
+    """
+    stream = archivo.stream
+    if isinstance(stream, SubidaFoto):
+        digest, tipo = stream.sha256, stream.tipo
+    else:
+        stream.seek(0)
+        tipo = detectar_tipo(stream.read(LARGO_CABECERA))
+        if tipo is None:
+            raise FotoNoValida()
+        stream.seek(0)
+        digest = hashlib.file_digest(stream, 'sha256').hexdigest()
+        stream.seek(0)
+    return f'{digest[:2]}/{digest[2:4]}/{digest}.{EXTENSION_TIPO[tipo]}'
+
+
+def guardar_subida(archivo, destino):
+    """
+    Guarda un FileStorage en `destino` sin copiarlo si ya está en disco.
+    Si ya existe un archivo con ese nombre (mismo contenido) descarta la
+    subida. Retorna True si se escribió un archivo nuevo.
+    """
+    if os.path.exists(destino):
+        archivo.stream.close()
+        return False
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if isinstance(archivo.stream, SubidaFoto):
+        archivo.stream.mover_a(destino)
+        return True
+
+    # temporal en la raíz de UPLOAD_FOLDER, como los de SubidaFoto: así
+    # limpiar-fotos los encuentra sin recorrer las subcarpetas
+    fd, temporal = tempfile.mkstemp(dir=current_app.config['UPLOAD_FOLDER'], prefix='.subida_', suffix='.part')
+    os.close(fd)
+    try:
+        archivo.save(temporal)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return True
@@ -0,0 +1,93 @@
+"""
+Worker de la cola de tareas en segundo plano.
+
+Las tareas se guardan en la tabla `tareas` de SQLite (ver database.py),
+así que cualquier proceso puede encolarlas y cualquier worker tomarlas.
+Se ejecuta con:
+
+    flask --app app worker --hilos 2
+"""
+import threading
+import time
+import traceback
+
+from database import tomar_tarea, completar_tarea, fallar_tarea, encolar_tarea
+from imagenes import generar_variantes
+
+
+# ─── TIPOS DE TAREA ────────────────────────────────────────────────────────
+
+def _variantes_foto(datos):
+    # estricto: un error (o la falta de Pillow) marca la tarea como fallida
+    generar_variantes(datos['ruta'], estricto=True)
+
+
+# tipo de tarea -> función que recibe `datos`
+MANEJADORES = {
+    'variantes_foto': _variantes_foto,
+}
+
+
+def encolar_variantes_foto(ruta, reporte_id):
+    """Pide generar miniatura y versión mediana de una foto recién subida."""
+    return encolar_tarea('variantes_foto', {'ruta': ruta}, reporte_id=reporte_id)
+
+
+# ─── WORKER ────────────────────────────────────────────────────────────────
+
+def ejecutar_una():
+    """Toma y ejecuta una tarea. Retorna False si la cola estaba vacía."""
+    tarea = tomar_tarea()
+    if tarea is None:
+        return False
+
+    manejador = MANEJADORES.get(tarea['tipo'])
+    try:
+        if manejador is None:
+            raise ValueError(f"Tipo de tarea desconocido: {tarea['tipo']}")
+        manejador(tarea['datos'])
+    except Exception:
+        fallar_tarea(tarea['id'], traceback.format_exc(limit=3))
+        print(f"✗ Tarea {tarea['id']} ({tarea['tipo']}) falló, intento {tarea['intentos']}")
+    else:
+        completar_tarea(tarea['id'])
+    return True
+
+
+def _bucle(intervalo, detener):
+    while not detener.is_set():
+        try:
+            hubo_tarea = ejecutar_una()
+        except Exception:
+            # un error de la base (o de tomar/cerrar la tarea) no debe
+            # terminar el hilo: se registra y se reintenta tras el intervalo
+            print(f"✗ Error en el worker de tareas:\n{traceback.format_exc(limit=3)}")
+            hubo_tarea = False
+        if not hubo_tarea:
+            detener.wait(intervalo)
+
+
+def correr_worker(hilos=1, intervalo=1.0, una_vez=False):
+    """
+    Procesa la cola con `hilos` hilos. Cuando no hay tareas espera
+    `intervalo` segundos. Con una_vez=True vacía la cola y termina.
+    """
+    if una_vez:
+        while ejecutar_una():
+            pass
+        return
+
+    detener = threading.Event()
+    trabajadores = [
+        threading.Thread(target=_bucle, args=(intervalo, detener), daemon=True)
+        for _ in range(hilos)
+    ]
+    for t in trabajadores:
+        t.start()
+    try:
+        while any(t.is_alive() for t in trabajadores):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        detener.set()
+        for t in trabajadores:
+            t.join()